@@ -1,56 +1,99 @@
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, Optional, List
-from .llm import llm
-import logging
-from prompts.analyzer_agent_prompt import analyzer_agent_prompt
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage
-import asyncio
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger('analyzer_agent')  # Fixed: lowercase 'agent'
-
-prompt = analyzer_agent_prompt
-# Agent state
-class analyzer_agent_state(TypedDict):
-    message: List[BaseMessage]
-    analysis: Optional[str]
-
-
-async def Analyzer_Agent(state: analyzer_agent_state) -> analyzer_agent_state:
-    '''Analyze the result of the searches for key details'''
-    # Get existing messages
-    messages: List[BaseMessage] = list(state.get("message", []))
-    
-    # Add system prompt
-    system_msg = SystemMessage(content=prompt)
-    all_messages = [system_msg] + messages
-
-    try:
-        logger.info('Agent processing research data...')
-        llm_response = await llm.ainvoke(all_messages)
-        
-        # Append AI response as AIMessage
-        messages.append(AIMessage(content=llm_response.content))
-        
-        return {
-            'message': messages, 
-            'analysis': llm_response.content
-        }
-        
-    except Exception as e:
-        logger.exception(f'Error processing input: {e}')
-        error_msg = AIMessage(content=f"I encountered an error: {str(e)}")
-        messages.append(error_msg)
-        
-        return {
-            'message': messages,
-            'analysis': f"Analysis failed: {str(e)}"
-        }
-        
-
-graph = StateGraph(analyzer_agent_state)
-graph.add_node('Analyzer_Agent', Analyzer_Agent)
-graph.set_entry_point('Analyzer_Agent')
-graph.add_edge('Analyzer_Agent', END)
-
-app = graph.compile()
+from langgraph.graph import StateGraph, END
+from typing import TypedDict, Optional, List, AsyncIterator
+from .llm import get_llm
+from .prompt_cache import prompt_cache
+import logging
+from prompts.analyzer_agent_prompt import analyzer_agent_prompt
+from langchain_core.messages import BaseMessage, AIMessage
+import re
+
+logger = logging.getLogger('analyzer_agent')  # Fixed: lowercase 'agent'
+
+prompt = analyzer_agent_prompt
+llm = get_llm('analyzer')
+
+# Analysis sections start at level 1-2 markdown headings
+SECTION_HEADING = re.compile(r'^#{1,2} ', re.MULTILINE)
+# Headings closer together than this stay in one section
+MIN_SECTION_CHARS = 600
+
+
+class SectionSplitter:
+    '''Cuts streamed markdown into sections as soon as the next heading starts'''
+
+    def __init__(self, min_chars: int = MIN_SECTION_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ''
+
+    def feed(self, text: str) -> List[str]:
+        '''Add streamed text and return the sections it completed'''
+        self._buffer += text
+        sections = []
+        while True:
+            cut = next(
+                (m.start() for m in SECTION_HEADING.finditer(self._buffer) if m.start() >= self.min_chars),
+                None
+            )
+            if cut is None:
+                return sections
+            sections.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:]
+
+    def flush(self) -> Optional[str]:
+        '''Return the last, unterminated section'''
+        rest, self._buffer = self._buffer.strip(), ''
+        return rest or None
+
+
+async def stream_sections(messages: List[BaseMessage]) -> AsyncIterator[str]:
+    '''Run the analyzer and yield each section of its analysis as soon as it is complete'''
+    splitter = SectionSplitter()
+    async for chunk in prompt_cache.astream(llm, 'analyzer', prompt, messages):
+        if isinstance(chunk.content, str):
+            for section in splitter.feed(chunk.content):
+                yield section
+    rest = splitter.flush()
+    if rest:
+        yield rest
+
+# Agent state
+class analyzer_agent_state(TypedDict):
+    message: List[BaseMessage]
+    analysis: Optional[str]
+
+
+async def Analyzer_Agent(state: analyzer_agent_state) -> analyzer_agent_state:
+    '''Analyze the result of the searches for key details'''
+    # Get existing messages
+    messages: List[BaseMessage] = list(state.get("message", []))
+    
+    try:
+        logger.info('Agent processing research data...')
+        # The system prompt goes through the provider-side prompt cache
+        llm_response = await prompt_cache.ainvoke(llm, 'analyzer', prompt, messages)
+        
+        # Append AI response as AIMessage
+        messages.append(AIMessage(content=llm_response.content))
+        
+        return {
+            'message': messages, 
+            'analysis': llm_response.content
+        }
+        
+    except Exception as e:
+        logger.exception(f'Error processing input: {e}')
+        error_msg = AIMessage(content=f"I encountered an error: {str(e)}")
+        messages.append(error_msg)
+        
+        return {
+            'message': messages,
+            'analysis': f"Analysis failed: {str(e)}"
+        }
+        
+
+graph = StateGraph(analyzer_agent_state)
+graph.add_node('Analyzer_Agent', Analyzer_Agent)
+graph.set_entry_point('Analyzer_Agent')
+graph.add_edge('Analyzer_Agent', END)
+
+app = graph.compile()
@@ -0,0 +1,250 @@
+"""Record and replay the LLM and Tavily responses of a run.
+
+A cassette holds every model call (``TierClient.ainvoke``/``astream``,
+including tool-call responses) and every Tavily search of one run, with
+their latencies, as gzipped JSON lines. While a cassette is active in the
+current context, recording appends to it and replaying serves responses
+from it instead of calling the network:
+
+    cassette = Cassette.recorder(state)
+    with use_cassette(cassette):
+        await app.ainvoke(state)
+    cassette.save('cassettes/run.jsonl.gz')
+
+    cassette = Cassette.load('cassettes/run.jsonl.gz', latency_scale=1.0)
+    with use_cassette(cassette):
+        await app.ainvoke(cassette.state)
+
+Replayed calls are matched on their channel and request content (system
+prompts and message ids excluded); a request with no exact match gets the
+next unused response of its channel, unless the cassette is strict.
+"""
+import asyncio
+import contextvars
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage, message_to_dict, messages_from_dict
+
+logger = logging.getLogger('cassette')
+
+CASSETTE_VERSION = 1
+
+_active: contextvars.ContextVar[Optional['Cassette']] = contextvars.ContextVar('cassette', default=None)
+
+
+class CassetteMiss(LookupError):
+    """Replay needed a response the cassette does not hold."""
+
+
+def current_cassette() -> Optional['Cassette']:
+    return _active.get()
+
+
+def replaying() -> bool:
+    cassette = _active.get()
+    return cassette is not None and cassette.mode == 'replay'
+
+
+@contextmanager
+def use_cassette(cassette: Optional['Cassette']):
+    """Make ``cassette`` active for this context and the tasks and threads started from it."""
+    token = _active.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active.reset(token)
+
+
+def _request_key(channel: str, request: Any) -> str:
+    if isinstance(request, (list, tuple)) and all(isinstance(m, BaseMessage) for m in request):
+        # System prompts are static per agent and may be sent through a cache handle instead;
+        # message ids are random per run
+        request = [
+            [m.type, m.content, getattr(m, 'tool_calls', None), getattr(m, 'tool_call_id', None)]
+            for m in request if not isinstance(m, SystemMessage)
+        ]
+    payload = json.dumps([channel, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class Cassette:
+    """The recorded responses of one run, in recording or replay mode.
+
+    ``latency_scale`` applies to replay: 1.0 waits as long as the original
+    call took, 0.5 half as long, 0 serves responses immediately.
+    """
+
+    def __init__(self, mode: str, state: Dict = None, entries: List[Dict] = None,
+                 latency_scale: float = 1.0, strict: bool = False, meta: Dict = None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.mode = mode
+        self.state = state or {}
+        self.entries = entries or []
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.meta = meta or {}
+        self.started_at = time.monotonic()
+        self.stats = {'recorded': 0, 'replayed': 0, 'fallbacks': 0}
+        self._lock = threading.Lock()
+        self._used = [False] * len(self.entries)
+        self._by_key = defaultdict(deque)
+        self._by_channel = defaultdict(deque)
+        for i, entry in enumerate(self.entries):
+            self._by_key[entry['key']].append(i)
+            self._by_channel[entry['channel']].append(i)
+
+    @classmethod
+    def recorder(cls, state: Dict = None) -> 'Cassette':
+        """Empty cassette recording a run started from ``state``."""
+        return cls('record', state={k: v for k, v in (state or {}).items() if _is_json(v)},
+                   meta={'recorded_at': time.time()})
+
+    @classmethod
+    def load(cls, path: str, latency_scale: float = 1.0, strict: bool = False) -> 'Cassette':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"{path}: unsupported cassette version {header.get('version')}")
+            entries = [json.loads(line) for line in f if line.strip()]
+        return cls('replay', state=header.get('state'), entries=entries, latency_scale=latency_scale,
+                   strict=strict, meta=header.get('meta'))
+
+    def save(self, path: str, **meta):
+        """Write the cassette atomically; ``meta`` is stored in the header (e.g. the run's wall time)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        header = {'version': CASSETTE_VERSION, 'state': self.state, 'meta': {**self.meta, **meta}}
+        tmp_path = f'{path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for record in [header] + self.entries:
+                f.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+        os.replace(tmp_path, path)
+        logger.info(f'Saved cassette with {len(self.entries)} responses to {path}')
+
+    # Recording
+
+    def _append(self, entry: Dict):
+        with self._lock:
+            entry['at'] = round(time.monotonic() - self.started_at, 4)
+            self.entries.append(entry)
+            self._used.append(True)
+            self.stats['recorded'] += 1
+
+    def record_message(self, channel: str, request, response: BaseMessage, latency: float):
+        self._append({
+            'channel': channel,
+            'key': _request_key(channel, request),
+            'latency': round(latency, 4),
+            'response': message_to_dict(response),
+        })
+
+    def record_stream(self, channel: str, request, chunks: List[BaseMessage], offsets: List[float]):
+        self._append({
+            'channel': channel,
+            'key': _request_key(channel, request),
+            # Seconds from the request to each chunk
+            'offsets': [round(o, 4) for o in offsets],
+            'chunks': [message_to_dict(c) for c in chunks],
+        })
+
+    def record_call(self, channel: str, request: Dict, response: Any, latency: float):
+        self._append({
+            'channel': channel,
+            'key': _request_key(channel, request),
+            'latency': round(latency, 4),
+            'response': response,
+        })
+
+    # Replay
+
+    def _next(self, channel: str, request) -> Dict:
+        key = _request_key(channel, request)
+        with self._lock:
+            for index_queue, fallback in ((self._by_key[key], False), (self._by_channel[channel], True)):
+                while index_queue and self._used[index_queue[0]]:
+                    index_queue.popleft()
+                if not index_queue:
+                    if self.strict:
+                        break
+                    continue
+                if fallback:
+                    logger.warning(f'No recorded response matches this {channel} request; '
+                                   f'serving the next one in recording order')
+                    self.stats['fallbacks'] += 1
+                index = index_queue.popleft()
+                self._used[index] = True
+                self.stats['replayed'] += 1
+                return self.entries[index]
+        raise CassetteMiss(f'Cassette has no {"matching " if self.strict else ""}response left for {channel}')
+
+    def _delay(self, seconds: float) -> float:
+        return max(seconds, 0.0) * self.latency_scale
+
+    async def replay_message(self, channel: str, request) -> BaseMessage:
+        entry = self._next(channel, request)
+        await asyncio.sleep(self._delay(entry['latency']))
+        return messages_from_dict([entry['response']])[0]
+
+    async def replay_stream(self, channel: str, request):
+        entry = self._next(channel, request)
+        previous = 0.0
+        for offset, chunk in zip(entry['offsets'], entry['chunks']):
+            await asyncio.sleep(self._delay(offset - previous))
+            previous = offset
+            yield messages_from_dict([chunk])[0]
+
+    def replay_call(self, channel: str, request: Dict) -> Any:
+        entry = self._next(channel, request)
+        time.sleep(self._delay(entry['latency']))
+        return entry['response']
+
+    def unused(self) -> int:
+        """Recorded responses the replay never asked for."""
+        return self._used.count(False)
+
+
+def _is_json(value) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def cassette_call(channel: str, request: Dict, call: Callable[[], Any]) -> Any:
+    """Run a blocking external call (e.g. a Tavily search) through the active cassette, if any.
+
+    ``request`` identifies the call for replay; ``call`` must return JSON-serializable data.
+    """
+    cassette = _active.get()
+    if cassette is None:
+        return call()
+    if cassette.mode == 'replay':
+        return cassette.replay_call(channel, request)
+    started = time.monotonic()
+    response = call()
+    cassette.record_call(channel, request, response, time.monotonic() - started)
+    return response
+
+
+async def record_run(app, state: Dict, path: str) -> Dict:
+    """Run a graph on ``state`` while recording a cassette, saved to ``path`` even if the run fails."""
+    cassette = Cassette.recorder(state)
+    started = time.monotonic()
+    try:
+        with use_cassette(cassette):
+            return await app.ainvoke(state)
+    finally:
+        try:
+            cassette.save(path, wall_seconds=round(time.monotonic() - started, 3))
+        except OSError as e:
+            logger.warning(f'Could not save cassette {path}: {e}')
@@ -0,0 +1,185 @@
+"""Circuit breakers for the external providers (Gemini, Tavily).
+
+Each provider has one breaker per process. While closed, it tracks the
+outcome of the last ``window`` calls; once at least ``min_calls`` of them are
+in and the share of failures reaches ``error_rate``, the breaker opens and
+every call fails at once with ``CircuitOpenError`` instead of waiting for a
+timeout. After ``open_seconds`` it turns half-open: up to
+``half_open_probes`` trial calls go through, the circuit closes when they all
+succeed and opens again on the first failure. Everything else is still
+rejected while the trials run.
+
+Only provider errors count as failures: the ``failure_types`` a breaker is
+created with, by default connection errors and timeouts. Anything else raised
+inside the guard (a ``TypeError`` from a bad argument, say) is a bug on our
+side and leaves the circuit alone.
+
+    with get_breaker('tavily', failure_types=TAVILY_ERRORS).guard():
+        response = client.search(query)
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from settings.config import (
+    circuit_error_rate,
+    circuit_window,
+    circuit_min_calls,
+    circuit_open_seconds,
+    circuit_half_open_probes,
+)
+
+logger = logging.getLogger('circuit_breaker')
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# Counted against every circuit: connection failures (requests' errors are OSErrors too) and timeouts
+TRANSPORT_ERRORS: Tuple[Type[BaseException], ...] = (OSError, TimeoutError)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail-fast guard around calls to one provider; safe to share between threads and event loops."""
+
+    def __init__(self, name: str, error_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30, half_open_probes: int = 2,
+                 clock: Callable[[], float] = time.monotonic,
+                 failure_types: Tuple[Type[BaseException], ...] = TRANSPORT_ERRORS):
+        self.name = name
+        self.failure_types = failure_types
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=max(window, 1))
+        self.state = CLOSED
+        # Bumped on every state change, so calls admitted under an earlier state are not counted
+        self._generation = 0
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._generation += 1
+        self._outcomes.clear()
+        self._probes_started = self._probes_passed = 0
+        if state == OPEN:
+            self._opened_at = self._clock()
+
+    def _admit(self) -> Tuple[int, bool]:
+        """Let a call through or raise CircuitOpenError; returns (generation, is_probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                waited = self._clock() - self._opened_at
+                if waited < self.open_seconds:
+                    raise CircuitOpenError(self.name, self.open_seconds - waited)
+                self._set_state(HALF_OPEN)
+                logger.info(f"Circuit '{self.name}' half-open: letting {self.half_open_probes} trial calls through")
+            if self.state == HALF_OPEN:
+                if self._probes_started >= self.half_open_probes:
+                    raise CircuitOpenError(self.name, 0)
+                self._probes_started += 1
+                return self._generation, True
+            return self._generation, False
+
+    def _record(self, ticket: Tuple[int, bool], success: bool):
+        generation, probe = ticket
+        with self._lock:
+            if generation != self._generation:
+                return
+            if probe:
+                if not success:
+                    self._set_state(OPEN)
+                    logger.warning(f"Circuit '{self.name}' reopened: trial call failed")
+                    return
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self._set_state(CLOSED)
+                    logger.info(f"Circuit '{self.name}' closed: {self.name} has recovered")
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                calls = len(self._outcomes)
+                self._set_state(OPEN)
+                logger.warning(
+                    f"Circuit '{self.name}' opened: {failures}/{calls} recent calls failed; "
+                    f"failing fast for {self.open_seconds:.0f}s"
+                )
+
+    def _release(self, ticket: Tuple[int, bool]):
+        """Give back a trial slot whose call ended without a verdict (cancelled, abandoned, or failed on our side)."""
+        generation, probe = ticket
+        with self._lock:
+            if probe and generation == self._generation:
+                self._probes_started -= 1
+
+    def _settle(self, ticket: Tuple[int, bool], success: bool, abandoned: Optional[threading.Event]):
+        if abandoned is not None and abandoned.is_set():
+            self._release(ticket)
+        else:
+            self._record(ticket, success)
+
+    @contextmanager
+    def guard(self, abandoned: Optional[threading.Event] = None):
+        """Run the block as one call to the provider; only ``failure_types`` count as failures.
+
+        A call its caller gave up on (``abandoned`` set by the time it ends,
+        e.g. a search thread that outlived its timeout) counts neither way.
+        """
+        ticket = self._admit()
+        try:
+            yield
+        except self.failure_types:
+            self._settle(ticket, False, abandoned)
+            raise
+        except BaseException:
+            self._release(ticket)
+            raise
+        self._settle(ticket, True, abandoned)
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open, or half-open with its trials taken)."""
+        with self._lock:
+            if self.state == OPEN:
+                return self._clock() - self._opened_at < self.open_seconds
+            return self.state == HALF_OPEN and self._probes_started >= self.half_open_probes
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, failure_types: Tuple[Type[BaseException], ...] = TRANSPORT_ERRORS) -> CircuitBreaker:
+    """The process-wide breaker for a provider, created with the configured thresholds.
+
+    ``failure_types`` applies when the breaker is created, so every caller of
+    one provider should pass the same errors.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                error_rate=circuit_error_rate,
+                window=circuit_window,
+                min_calls=circuit_min_calls,
+                open_seconds=circuit_open_seconds,
+                half_open_probes=circuit_half_open_probes,
+                failure_types=failure_types,
+            )
+        return _breakers[name]
+
@@ -1,9 +1,244 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from settings.config import  google_key
-
-llm = ChatGoogleGenerativeAI(
-    api_key=google_key,
-    model="gemini-2.5-flash",   
-    temperature=0.3,
-    max_output_tokens=1024,
-)
+"""Chat model tiers and the per-agent client registry.
+
+Each agent asks for its client with ``get_llm(agent)``. The agent maps to a
+named tier (model, output cap, timeout, concurrency limit), so the one-word
+classifier and the long-form writer no longer share one configuration.
+
+Tiers can be swapped for local fake models in tests:
+
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    with override_tiers({'fast': FakeListChatModel(responses=['quick_research'])}):
+        ...
+"""
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+import httpx
+from google.genai.errors import APIError
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai.chat_models import ChatGoogleGenerativeAIError
+from settings.config import google_key, llm_agent_tiers
+from profiling import span
+from .cassette import current_cassette
+from .circuit_breaker import TRANSPORT_ERRORS, get_breaker
+
+logger = logging.getLogger('llm')
+
+# Errors that count against Gemini's circuit; anything else raised by a call is our bug, not an outage
+GEMINI_ERRORS = TRANSPORT_ERRORS + (httpx.HTTPError, APIError, ChatGoogleGenerativeAIError)
+
+# Named model configurations. timeout is seconds per call; max_concurrency is
+# the number of calls a tier may have in flight per event loop.
+MODEL_TIERS: Dict[str, Dict[str, Any]] = {
+    'fast': {
+        'model': 'gemini-2.5-flash-lite',
+        'temperature': 0.0,
+        'max_output_tokens': 64,
+        'timeout': 15,
+        'max_concurrency': 8,
+    },
+    'standard': {
+        'model': 'gemini-2.5-flash',
+        'temperature': 0.3,
+        'max_output_tokens': 2048,
+        'timeout': 60,
+        'max_concurrency': 4,
+    },
+    'long_form': {
+        'model': 'gemini-2.5-flash',
+        'temperature': 0.5,
+        'max_output_tokens': 8192,
+        'timeout': 120,
+        'max_concurrency': 4,
+    },
+}
+
+# Tier used by each agent; LLM_AGENT_TIERS overrides entries
+AGENT_TIERS: Dict[str, str] = {
+    'classifier': 'fast',
+    'research': 'standard',
+    'analyzer': 'standard',
+    'writer': 'long_form',
+    'writer_outline': 'standard',
+}
+
+
+def _apply_agent_tiers(overrides: Dict[str, str]) -> None:
+    """Move agents to other tiers, rejecting unknown agents and tiers so a typo cannot go unnoticed."""
+    for agent, tier in overrides.items():
+        if agent not in AGENT_TIERS:
+            raise ValueError(f"LLM_AGENT_TIERS: unknown agent '{agent}' (known: {', '.join(AGENT_TIERS)})")
+        if tier not in MODEL_TIERS:
+            raise ValueError(
+                f"LLM_AGENT_TIERS: unknown tier '{tier}' for agent '{agent}' (known: {', '.join(MODEL_TIERS)})"
+            )
+    AGENT_TIERS.update(overrides)
+
+
+_apply_agent_tiers(llm_agent_tiers)
+
+
+class TierClient:
+    """Chat model of one tier, called under the tier's timeout and concurrency limit
+    and behind Gemini's circuit breaker.
+
+    The underlying model is built on first use, and tool bindings are applied
+    at call time, so a tier's model can be replaced after agents have bound
+    their tools.
+    """
+
+    def __init__(self, tier: str, config: Dict[str, Any], bindings: tuple = None,
+                 shared: 'TierClient' = None):
+        self.tier = tier
+        self.config = config
+        self._bindings = bindings
+        # Clients created by bind_tools share the model and limits of their tier
+        self._shared = shared or self
+        if shared is None:
+            self._model = None
+            self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def model(self):
+        root = self._shared
+        if root._model is None:
+            root._model = ChatGoogleGenerativeAI(
+                api_key=google_key,
+                model=self.config['model'],
+                temperature=self.config['temperature'],
+                max_output_tokens=self.config['max_output_tokens'],
+                timeout=self.config['timeout'],
+            )
+        return root._model
+
+    def _runnable(self):
+        if self._bindings is None:
+            return self.model
+        tools, kwargs = self._bindings
+        try:
+            return self.model.bind_tools(tools, **kwargs)
+        except NotImplementedError:
+            # Fake models have no tool support; they just answer in text
+            return self.model
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one loop; keep one limit per running loop
+        semaphores = self._shared._semaphores
+        loop = asyncio.get_running_loop()
+        if loop not in semaphores:
+            semaphores[loop] = asyncio.Semaphore(self.config['max_concurrency'])
+        return semaphores[loop]
+
+    def bind_tools(self, tools, **kwargs) -> 'TierClient':
+        return TierClient(self.tier, self.config, (tools, kwargs), shared=self._shared)
+
+    async def _acquire(self) -> asyncio.Semaphore:
+        semaphore = self._semaphore()
+        with span(f'llm_queue:{self.tier}'):
+            await semaphore.acquire()
+        return semaphore
+
+    def _guard(self, cassette):
+        # Checked before queueing for the tier, so an open circuit fails at once; replays never reach Gemini
+        if cassette is not None and cassette.mode == 'replay':
+            return nullcontext()
+        return get_breaker('gemini', failure_types=GEMINI_ERRORS).guard()
+
+    async def ainvoke(self, input, config: Optional[dict] = None, **kwargs):
+        cassette = current_cassette()
+        channel = f'llm:{self.tier}'
+        with self._guard(cassette):
+            semaphore = await self._acquire()
+            try:
+                with span(channel):
+                    if cassette is not None and cassette.mode == 'replay':
+                        return await cassette.replay_message(channel, input)
+                    started = time.monotonic()
+                    response = await asyncio.wait_for(
+                        self._runnable().ainvoke(input, config, **kwargs),
+                        timeout=self.config['timeout']
+                    )
+                if cassette is not None:
+                    cassette.record_message(channel, input, response, time.monotonic() - started)
+                return response
+            finally:
+                semaphore.release()
+
+    async def astream(self, input, config: Optional[dict] = None, **kwargs):
+        """Stream message chunks; the tier's timeout covers the whole stream."""
+        cassette = current_cassette()
+        channel = f'llm:{self.tier}:stream'
+        with self._guard(cassette):
+            semaphore = await self._acquire()
+            # Profiled stream time runs until the last chunk, including time the consumer spends between chunks
+            try:
+                with span(channel):
+                    if cassette is not None and cassette.mode == 'replay':
+                        async for chunk in cassette.replay_stream(channel, input):
+                            yield chunk
+                        return
+                    loop = asyncio.get_running_loop()
+                    started = loop.time()
+                    deadline = started + self.config['timeout']
+                    chunks, offsets = [], []
+                    stream = self._runnable().astream(input, config, **kwargs).__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout=deadline - loop.time())
+                        except StopAsyncIteration:
+                            break
+                        if cassette is not None:
+                            chunks.append(chunk)
+                            offsets.append(loop.time() - started)
+                        yield chunk
+                if cassette is not None:
+                    cassette.record_stream(channel, input, chunks, offsets)
+            finally:
+                semaphore.release()
+
+    def invoke(self, input, config: Optional[dict] = None, **kwargs):
+        return self._runnable().invoke(input, config, **kwargs)
+
+
+_clients: Dict[str, TierClient] = {}
+
+
+def get_tier(tier: str) -> TierClient:
+    """Client for a named tier."""
+    if tier not in MODEL_TIERS:
+        raise KeyError(f"Unknown model tier '{tier}' (known: {', '.join(MODEL_TIERS)})")
+    if tier not in _clients:
+        _clients[tier] = TierClient(tier, MODEL_TIERS[tier])
+    return _clients[tier]
+
+
+def get_llm(agent: str) -> TierClient:
+    """Client for an agent, using the agent's tier (standard if it has none)."""
+    return get_tier(AGENT_TIERS.get(agent, 'standard'))
+
+
+def set_tier_model(tier: str, model) -> None:
+    """Replace the chat model behind a tier (e.g. a langchain fake model); None restores the default."""
+    get_tier(tier)._model = model
+    logger.info(f"Model for tier '{tier}' set to {type(model).__name__ if model else 'default'}")
+
+
+@contextmanager
+def override_tiers(models: Dict[str, Any]):
+    """Temporarily replace the models of several tiers."""
+    previous = {tier: get_tier(tier)._model for tier in models}
+    try:
+        for tier, model in models.items():
+            set_tier_model(tier, model)
+        yield
+    finally:
+        for tier, model in previous.items():
+            get_tier(tier)._model = model
+
+
+# Default client, kept for existing imports
+llm = get_tier('standard')
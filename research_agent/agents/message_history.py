@@ -0,0 +1,144 @@
+from typing import List, Optional
+import logging
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage, ToolMessage
+
+logger = logging.getLogger("message_history")
+
+# Rough characters-per-token ratio for Gemini on English text
+CHARS_PER_TOKEN = 4
+# How much of each source's content survives in a digest
+DIGEST_CONTENT_CHARS = 240
+TRUNCATION_NOTE = "\n[... truncated to fit the context budget]"
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Cheap token estimate for a list of messages (no tokenizer round-trip)."""
+    chars = 0
+    for m in messages:
+        chars += len(m.content) if isinstance(m.content, str) else len(str(m.content))
+        for tc in getattr(m, "tool_calls", None) or []:
+            chars += len(str(tc.get("args", "")))
+    return chars // CHARS_PER_TOKEN
+
+
+def digest_tool_output(content: str, content_chars: int = DIGEST_CONTENT_CHARS) -> str:
+    """Compact a research_tool dump to title, URL and the start of each snippet."""
+    entries = []
+    for block in content.split("\n---\n"):
+        fields = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition(": ")
+            if sep and key in ("Title", "Content", "URL"):
+                fields[key] = value
+            elif "Content" in fields and "URL" not in fields:
+                # multi-line snippet
+                fields["Content"] += " " + line.strip()
+        if not fields:
+            # Not in research_tool format (errors, budget notes) - keep the head
+            entries.append(block[:content_chars])
+            continue
+        snippet = fields.get("Content", "")
+        if len(snippet) > content_chars:
+            snippet = snippet[:content_chars].rsplit(" ", 1)[0] + "..."
+        entry = f"Title: {fields.get('Title', 'N/A')}\nURL: {fields.get('URL', 'N/A')}"
+        if content_chars and snippet:
+            entry += f"\nGist: {snippet}"
+        entries.append(entry)
+    return "[Digest of earlier search]\n" + "\n---\n".join(entries)
+
+
+def _rounds(history: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Split messages into rounds: an AI tool-call message plus the tool results answering it."""
+    rounds: List[List[BaseMessage]] = []
+    for m in history:
+        if isinstance(m, ToolMessage) and rounds:
+            rounds[-1].append(m)
+        else:
+            rounds.append([m])
+    return rounds
+
+
+def _digest_round(round_msgs: List[BaseMessage], content_chars: int) -> List[BaseMessage]:
+    return [
+        m.model_copy(update={"content": digest_tool_output(m.content, content_chars)})
+        if isinstance(m, ToolMessage) and isinstance(m.content, str) else m
+        for m in round_msgs
+    ]
+
+
+def _truncate_round(round_msgs: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Cut the tool outputs of a round evenly so the round fits in max_tokens.
+
+    Each output keeps at least 200 characters, so a budget too small for that
+    can still be exceeded.
+    """
+    tool_msgs = [m for m in round_msgs if isinstance(m, ToolMessage)]
+    if not tool_msgs:
+        return round_msgs
+    # What the round's other messages and the truncation notes take is not available to the outputs
+    other = estimate_tokens([m for m in round_msgs if not isinstance(m, ToolMessage)])
+    chars = (max_tokens - other) * CHARS_PER_TOKEN - len(TRUNCATION_NOTE) * len(tool_msgs)
+    per_msg_chars = max(chars // len(tool_msgs), 200)
+    return [
+        m.model_copy(update={"content": m.content[:per_msg_chars] + TRUNCATION_NOTE})
+        if isinstance(m, ToolMessage) and isinstance(m.content, str) and len(m.content) > per_msg_chars else m
+        for m in round_msgs
+    ]
+
+
+def build_prompt_messages(messages: List[BaseMessage], system_prompt: str,
+                          token_budget: int) -> List[BaseMessage]:
+    """Build the messages to send for this turn, keeping them within token_budget.
+
+    The system prompt and the user question are always kept. The latest round
+    of tool results is kept in full when it fits; earlier tool outputs are
+    replaced by digests, and the oldest rounds are dropped if that is still
+    not enough.
+    """
+    history = [m for m in messages if not isinstance(m, SystemMessage)]
+    head: List[BaseMessage] = [SystemMessage(content=system_prompt)]
+    question: Optional[BaseMessage] = None
+    if history and isinstance(history[0], HumanMessage):
+        question, history = history[0], history[1:]
+        head.append(question)
+
+    rounds = _rounds(history)
+    if not rounds:
+        return head
+
+    def fits(candidate: List[List[BaseMessage]]) -> bool:
+        return estimate_tokens(head + [m for r in candidate for m in r]) <= token_budget
+
+    if fits(rounds):
+        return head + [m for r in rounds for m in r]
+
+    # 1. Digest every round but the latest, then digest harder (title + URL only)
+    for content_chars in (DIGEST_CONTENT_CHARS, 0):
+        rounds = [_digest_round(r, content_chars) for r in rounds[:-1]] + [rounds[-1]]
+        if fits(rounds):
+            return head + [m for r in rounds for m in r]
+
+    # 2. Drop the oldest rounds
+    while len(rounds) > 1 and not fits(rounds):
+        rounds.pop(0)
+
+    # 3. Last resort: cut the latest round's raw results to what is left of the budget
+    if not fits(rounds):
+        left = token_budget - estimate_tokens(head)
+        rounds[-1] = _truncate_round(rounds[-1], left)
+
+    return head + [m for r in rounds for m in r]
+
+
+def log_token_usage(turn: int, full_messages: List[BaseMessage], sent_messages: List[BaseMessage],
+                    response: Optional[AIMessage]) -> None:
+    """Log estimated and provider-reported token usage for one agent turn."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    logger.info(
+        "Turn %d tokens: full history ~%d, sent ~%d, provider input=%s output=%s",
+        turn,
+        estimate_tokens(full_messages),
+        estimate_tokens(sent_messages),
+        usage.get("input_tokens", "n/a"),
+        usage.get("output_tokens", "n/a"),
+    )
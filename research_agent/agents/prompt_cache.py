@@ -0,0 +1,256 @@
+"""Provider-side caching of the large static system prompts.
+
+The analyzer and writer prompts are registered once as cached context
+handles (Gemini ``cachedContents``) and later calls send only the user
+messages plus the handle. Handles are refreshed when they are close to
+expiring and recreated when the prompt text changes. Whenever caching is
+off, unsupported or failing, calls fall back to sending the prompt in full.
+
+``LocalCacheBackend`` simulates the provider (handles, expiry, billed input
+tokens) so the layer can be exercised without network access:
+
+    backend = LocalCacheBackend()
+    cache = PromptCache(backend, min_tokens=0)
+    set_tier_model('long_form', backend.chat_model())
+"""
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from settings.config import google_key, prompt_cache_backend, prompt_cache_ttl_seconds
+from .cassette import replaying
+from .circuit_breaker import CircuitOpenError
+from .message_history import estimate_tokens
+
+logger = logging.getLogger('prompt_cache')
+
+# Gemini refuses to cache less than this many tokens
+MIN_CACHE_TOKENS = 1024
+
+
+class GeminiCacheBackend:
+    """Creates and extends Gemini cachedContents holding a system instruction."""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._client = None
+
+    def _genai(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    async def create(self, model: str, system_prompt: str, ttl_seconds: int) -> Tuple[str, float]:
+        from google.genai import types
+        cache = await self._genai().aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_prompt,
+                ttl=f'{ttl_seconds}s',
+                display_name='research-agent-prompt'
+            )
+        )
+        return cache.name, _expiry(cache, ttl_seconds)
+
+    async def refresh(self, name: str, ttl_seconds: int) -> float:
+        from google.genai import types
+        cache = await self._genai().aio.caches.update(
+            name=name,
+            config=types.UpdateCachedContentConfig(ttl=f'{ttl_seconds}s')
+        )
+        return _expiry(cache, ttl_seconds)
+
+
+def _expiry(cache, ttl_seconds: int) -> float:
+    return cache.expire_time.timestamp() if cache.expire_time else time.time() + ttl_seconds
+
+
+class LocalCacheBackend:
+    """Stand-in for provider caching: simulated handles with expiry and billed token counts.
+
+    Cached prompt tokens are billed at ``cached_token_rate`` of the normal
+    input price, as with Gemini's cached-token discount.
+    """
+
+    def __init__(self, cached_token_rate: float = 0.25, clock: Callable[[], float] = time.time):
+        self.cached_token_rate = cached_token_rate
+        self.clock = clock
+        self.handles: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self.stats = {
+            'created': 0,
+            'refreshed': 0,
+            'cached_calls': 0,
+            'uncached_calls': 0,
+            'billed_input_tokens': 0.0,
+        }
+
+    async def create(self, model: str, system_prompt: str, ttl_seconds: int) -> Tuple[str, float]:
+        name = f'cachedContents/local-{next(self._ids)}'
+        expires_at = self.clock() + ttl_seconds
+        self.handles[name] = {
+            'model': model,
+            'tokens': estimate_tokens([SystemMessage(content=system_prompt)]),
+            'expires_at': expires_at
+        }
+        self.stats['created'] += 1
+        return name, expires_at
+
+    async def refresh(self, name: str, ttl_seconds: int) -> float:
+        self._live_handle(name)
+        self.handles[name]['expires_at'] = self.clock() + ttl_seconds
+        self.stats['refreshed'] += 1
+        return self.handles[name]['expires_at']
+
+    def _live_handle(self, name: str) -> Dict[str, Any]:
+        handle = self.handles.get(name)
+        if handle is None or handle['expires_at'] <= self.clock():
+            raise ValueError(f'Cached content {name} not found or expired')
+        return handle
+
+    def bill(self, messages: List[BaseMessage], cached_content: str = None):
+        """Count the input tokens a provider would bill for this call."""
+        tokens = estimate_tokens(messages)
+        if cached_content:
+            handle = self._live_handle(cached_content)
+            if any(isinstance(m, SystemMessage) for m in messages):
+                # Gemini rejects a system instruction next to cached content
+                raise ValueError('system instruction cannot be sent with cached content')
+            tokens += handle['tokens'] * self.cached_token_rate
+            self.stats['cached_calls'] += 1
+        else:
+            self.stats['uncached_calls'] += 1
+        self.stats['billed_input_tokens'] += tokens
+
+    def chat_model(self, reply: str = 'ok') -> '_LocalChatModel':
+        """Chat model stand-in that accepts ``cached_content`` and bills through this backend."""
+        return _LocalChatModel(self, reply)
+
+
+class _LocalChatModel:
+    def __init__(self, backend: LocalCacheBackend, reply: str):
+        self.backend = backend
+        self.reply = reply
+
+    def bind_tools(self, tools, **kwargs):
+        raise NotImplementedError
+
+    def invoke(self, input, config: Optional[dict] = None, cached_content: str = None, **kwargs):
+        self.backend.bill(list(input), cached_content)
+        return AIMessage(content=self.reply)
+
+    async def ainvoke(self, input, config: Optional[dict] = None, cached_content: str = None, **kwargs):
+        return self.invoke(input, config, cached_content=cached_content)
+
+    async def astream(self, input, config: Optional[dict] = None, cached_content: str = None, **kwargs):
+        yield self.invoke(input, config, cached_content=cached_content)
+
+
+class PromptCache:
+    """Maps static system prompts to provider cache handles and calls models with them."""
+
+    def __init__(self, backend=None, ttl_seconds: int = 3600, refresh_margin_seconds: int = 300,
+                 retry_after_seconds: int = 600, min_tokens: int = MIN_CACHE_TOKENS,
+                 clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.min_tokens = min_tokens
+        self.clock = clock
+        # (name, model, prompt hash) -> {'name': handle, 'expires_at': epoch seconds}
+        self._handles: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        # Prompts whose caching failed are sent in full until this time
+        self._disabled_until: Dict[Tuple[str, str, str], float] = {}
+        self._locks = weakref.WeakKeyDictionary()
+
+    def _lock(self, key) -> asyncio.Lock:
+        locks = self._locks.setdefault(asyncio.get_running_loop(), {})
+        return locks.setdefault(key, asyncio.Lock())
+
+    async def get_handle(self, name: str, model: str, prompt: str) -> Optional[str]:
+        """Cache handle for a prompt, registering or refreshing it as needed; None to send it in full."""
+        if self.backend is None or estimate_tokens([SystemMessage(content=prompt)]) < self.min_tokens:
+            return None
+        if replaying():
+            # Replayed calls never reach the provider
+            return None
+        key = (name, model, hashlib.sha256(prompt.encode()).hexdigest())
+        if self._disabled_until.get(key, 0) > self.clock():
+            return None
+
+        async with self._lock(key):
+            handle = self._handles.get(key)
+            try:
+                if handle and handle['expires_at'] - self.clock() > self.refresh_margin_seconds:
+                    return handle['name']
+                if handle and handle['expires_at'] > self.clock():
+                    handle['expires_at'] = await self.backend.refresh(handle['name'], self.ttl_seconds)
+                    logger.info(f"Refreshed cached prompt '{name}' ({handle['name']})")
+                    return handle['name']
+                handle_name, expires_at = await self.backend.create(model, prompt, self.ttl_seconds)
+                self._handles[key] = {'name': handle_name, 'expires_at': expires_at}
+                logger.info(f"Cached prompt '{name}' for {model} as {handle_name}")
+                return handle_name
+            except Exception as e:
+                self._handles.pop(key, None)
+                self._disabled_until[key] = self.clock() + self.retry_after_seconds
+                logger.warning(f"Prompt caching unavailable for '{name}', sending it in full: {e}")
+                return None
+
+    def invalidate(self, handle_name: str):
+        """Forget a handle the provider no longer accepts."""
+        for key, handle in list(self._handles.items()):
+            if handle['name'] == handle_name:
+                del self._handles[key]
+
+    async def ainvoke(self, client, name: str, prompt: str, messages: List[BaseMessage], **kwargs):
+        """Call ``client`` with ``prompt`` as system prompt, through its cache handle when possible."""
+        handle = await self.get_handle(name, client.config['model'], prompt)
+        if handle:
+            try:
+                return await client.ainvoke(messages, cached_content=handle, **kwargs)
+            except (asyncio.TimeoutError, CircuitOpenError):
+                raise
+            except Exception as e:
+                # Most likely the handle was evicted; retry once without it
+                logger.warning(f"Call with cached prompt '{name}' failed, retrying uncached: {e}")
+                self.invalidate(handle)
+        return await client.ainvoke([SystemMessage(content=prompt)] + list(messages), **kwargs)
+
+    async def astream(self, client, name: str, prompt: str, messages: List[BaseMessage], **kwargs):
+        """Streaming version of ainvoke; falls back to the full prompt only before the first chunk."""
+        handle = await self.get_handle(name, client.config['model'], prompt)
+        if handle:
+            started = False
+            try:
+                async for chunk in client.astream(messages, cached_content=handle, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except (asyncio.TimeoutError, CircuitOpenError):
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                logger.warning(f"Stream with cached prompt '{name}' failed, retrying uncached: {e}")
+                self.invalidate(handle)
+        async for chunk in client.astream([SystemMessage(content=prompt)] + list(messages), **kwargs):
+            yield chunk
+
+
+def _default_backend():
+    if prompt_cache_backend == 'gemini':
+        return GeminiCacheBackend(google_key)
+    if prompt_cache_backend == 'local':
+        return LocalCacheBackend()
+    return None
+
+
+prompt_cache = PromptCache(_default_backend(), ttl_seconds=prompt_cache_ttl_seconds)
@@ -1,108 +1,298 @@
-from typing import TypedDict, List, Optional,Annotated
-import logging
-from langgraph.graph import StateGraph, END, add_messages
-from langchain_core.tools import tool
-from tavily import TavilyClient
-from settings.config import tavily_key
-from .llm import llm
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage
-from langgraph.prebuilt import ToolNode
- 
-from prompts.reasearch_agent_prompt import research_agent_prompt
-          
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("research_agent")
-
-prompt = research_agent_prompt
-
-
-# Agent state - Use add_messages reducer
-class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], add_messages]
-    research_result: Optional[str]
-
-
-# The provided tool
-@tool
-def research_tool(query: str) -> str:
-    """Search the web for information about a topic using Tavily and return aggregated text."""
-    if not query:
-        raise ValueError("Please provide a non-empty query.")
-    tavily_client = TavilyClient(api_key=tavily_key)
-    try:
-        response = tavily_client.search(query, max_results=5)
-        results = []
-        for r in response.get("results", []):
-            results.append(
-                "Title: {}\nContent: {}\nURL: {}".format(
-                    r.get("title", "N/A"),
-                    r.get("content", "N/A"),
-                    r.get("url", "N/A"),
-                )
-            )
-        return "\n---\n".join(results) if results else "No results found."
-    except Exception as e:
-        logger.exception("Error using research tool")
-        raise RuntimeError(f"Tavily search failed: {e}")
-
-
-# Give the LLM the available tools
-tools = [research_tool]
-llm_with_tools = llm.bind_tools(tools)
-
-
-# The agent node
-async def research_agent(state: AgentState) -> dict:
-    """Calls the LLM with tools."""
-    messages = state.get("messages", [])
-    
-    # Add system message at the start if not present
-    if not messages or not isinstance(messages[0], SystemMessage):
-        system_msg = SystemMessage(content=prompt)
-        messages = [system_msg] + messages
-    
-    try:
-        logger.info("Agent processing query...")
-        llm_response = await llm_with_tools.ainvoke(messages)
-        logger.info("Agent response type: %s", type(llm_response))
-
-        # If the LLM requested tools, return the response
-        if hasattr(llm_response, "tool_calls") and llm_response.tool_calls:
-            logger.info("LLM requested tools: %s", llm_response.tool_calls)
-            return {"messages": messages + [llm_response]}
-
-        return {"messages": messages + [llm_response], "research_result": llm_response.content}
-
-    except Exception as e:
-        logger.exception("Error in research_agent")
-        error_msg = AIMessage(content=f"I encountered an error: {e}")
-        return {"messages": [error_msg], "research_result": str(e)}
-
-
-# Routing logic
-def should_continue(state: AgentState) -> str:
-    """Return 'continue' if the last message requested tools, otherwise 'end'."""
-    messages = state.get("messages", [])
-    if not messages:
-        logger.info("No messages in state; ending.")
-        return "end"
-    
-    last_message = messages[-1]
-    
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        logger.info("Routing to tools")
-        return "continue"
-    
-    logger.info("Routing to end")
-    return "end"
-
-
-# Build the graph
-graph = StateGraph(AgentState)
-graph.add_node("agent", research_agent)
-graph.add_node("tools", ToolNode(tools))  # ← Pass tools directly
-graph.set_entry_point("agent")
-graph.add_conditional_edges("agent", should_continue, {"continue": "tools", "end": END})
-graph.add_edge("tools", "agent")
-
+from typing import TypedDict, List, Optional,Annotated, Tuple
+import asyncio
+import contextvars
+import math
+import operator
+import logging
+import threading
+import time
+from langgraph.graph import StateGraph, END, add_messages
+from langchain_core.tools import tool
+from tavily import TavilyClient
+from settings.config import (
+    tavily_key,
+    research_max_turns,
+    research_max_searches,
+    research_time_budget_seconds,
+    research_history_token_budget,
+)
+from .cassette import cassette_call
+from .circuit_breaker import TRANSPORT_ERRORS, get_breaker
+from .llm import get_llm
+from .message_history import build_prompt_messages, log_token_usage
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage, ToolMessage
+ 
+from prompts.reasearch_agent_prompt import research_agent_prompt
+from profiling import span
+          
+logger = logging.getLogger("research_agent")
+
+prompt = research_agent_prompt
+llm = get_llm("research")
+
+
+# Agent state - Use add_messages reducer
+class AgentState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    research_result: Optional[str]
+    # Every distinct search hit (url, title, content) seen in this run
+    sources: Annotated[List[dict], operator.add]
+    # Loop bookkeeping
+    turns: int
+    searches: int
+    started_at: Optional[float]
+    # Optional per-invocation budget overrides (defaults come from settings)
+    max_turns: Optional[int]
+    max_searches: Optional[int]
+    time_budget_s: Optional[float]
+
+
+FINALIZE_PROMPT = (
+    "Your research budget is used up. Do not call any more tools. "
+    "Write your final research summary now, using only the information gathered so far."
+)
+
+
+def _format_results(hits: List[dict]) -> str:
+    return "\n---\n".join(
+        "Title: {}\nContent: {}\nURL: {}".format(
+            r.get("title", "N/A"),
+            r.get("content", "N/A"),
+            r.get("url", "N/A"),
+        )
+        for r in hits
+    )
+
+
+# Errors that count against Tavily's circuit: the client's HTTP errors are requests
+# exceptions, which are OSErrors, so transport failures and timeouts cover them
+TAVILY_ERRORS = TRANSPORT_ERRORS
+
+
+# Set by tools_node for each tool call: the Tavily request timeout (seconds) and
+# an event set once the call has been given up on
+_search_call: contextvars.ContextVar[Optional[Tuple[int, threading.Event]]] = contextvars.ContextVar(
+    "search_call", default=None
+)
+
+
+def _search(query: str) -> dict:
+    timeout, abandoned = _search_call.get() or (None, None)
+    options = {"max_results": 5}
+    if timeout is not None:
+        options["timeout"] = timeout
+    # Fails fast with CircuitOpenError while Tavily's circuit is open
+    with get_breaker("tavily", failure_types=TAVILY_ERRORS).guard(abandoned=abandoned):
+        return TavilyClient(api_key=tavily_key).search(query, **options)
+
+
+# The provided tool
+@tool(response_format="content_and_artifact")
+def research_tool(query: str) -> tuple:
+    """Search the web for information about a topic using Tavily and return aggregated text."""
+    if not query:
+        raise ValueError("Please provide a non-empty query.")
+    try:
+        with span("tavily"):
+            response = cassette_call(
+                "tavily",
+                {"query": query, "max_results": 5},
+                lambda: _search(query),
+            )
+        # The raw hits travel as the tool artifact so sources can be stored individually
+        hits = [
+            {"url": r.get("url"), "title": r.get("title"), "content": r.get("content")}
+            for r in response.get("results", [])
+        ]
+        return (_format_results(hits) if hits else "No results found."), hits
+    except Exception as e:
+        logger.exception("Error using research tool")
+        raise RuntimeError(f"Tavily search failed: {e}")
+
+
+# Give the LLM the available tools
+tools = [research_tool]
+tools_by_name = {t.name: t for t in tools}
+llm_with_tools = llm.bind_tools(tools)
+# Same tool schema but tool calls disabled, used to force the final answer
+llm_final = llm.bind_tools(tools, tool_choice="none")
+
+
+def _budget(state: AgentState, key: str, default):
+    value = state.get(key)
+    return default if value is None else value
+
+
+def _time_left(state: AgentState) -> float:
+    """Seconds left in the wall-clock budget for this research run."""
+    started_at = state.get("started_at") or time.monotonic()
+    budget = _budget(state, "time_budget_s", research_time_budget_seconds)
+    return budget - (time.monotonic() - started_at)
+
+
+def budget_exhausted(state: AgentState) -> Optional[str]:
+    """Return the name of the exhausted budget, or None if there is room left.
+
+    The turn about to start counts: on the last allowed turn the agent has to
+    answer, so max_turns bounds every LLM call, the final answer included.
+    """
+    if state.get("turns", 0) + 1 >= _budget(state, "max_turns", research_max_turns):
+        return "turns"
+    if state.get("searches", 0) >= _budget(state, "max_searches", research_max_searches):
+        return "searches"
+    if _time_left(state) <= 0:
+        return "time"
+    return None
+
+
+# The agent node
+async def research_agent(state: AgentState) -> dict:
+    """Calls the LLM with tools, or forces a final answer once the budget is used up."""
+    history = state.get("messages", [])
+    started_at = state.get("started_at") or time.monotonic()
+    turns = state.get("turns", 0) + 1
+
+    # Only a bounded view of the transcript is sent; the state keeps the full history
+    messages = build_prompt_messages(history, prompt, research_history_token_budget)
+    full_messages = [SystemMessage(content=prompt)] + history
+
+    exhausted = budget_exhausted({**state, "started_at": started_at})
+    
+    try:
+        if exhausted:
+            logger.info("Research budget exhausted (%s); forcing final answer", exhausted)
+            messages = messages + [HumanMessage(content=FINALIZE_PROMPT)]
+            llm_response = await llm_final.ainvoke(messages)
+            log_token_usage(turns, full_messages, messages, llm_response)
+            return {
+                "messages": [llm_response],
+                "research_result": llm_response.content,
+                "turns": turns,
+                "started_at": started_at,
+            }
+
+        logger.info("Agent processing query (turn %d)...", turns)
+        llm_response = await llm_with_tools.ainvoke(messages)
+        log_token_usage(turns, full_messages, messages, llm_response)
+        logger.debug("Agent response type: %s", type(llm_response))
+
+        # If the LLM requested tools, return the response
+        if hasattr(llm_response, "tool_calls") and llm_response.tool_calls:
+            logger.info("LLM requested %d tool calls", len(llm_response.tool_calls))
+            logger.debug("Tool calls: %s", llm_response.tool_calls)
+            return {"messages": [llm_response], "turns": turns, "started_at": started_at}
+
+        return {
+            "messages": [llm_response],
+            "research_result": llm_response.content,
+            "turns": turns,
+            "started_at": started_at,
+        }
+
+    except Exception as e:
+        logger.exception("Error in research_agent")
+        error_msg = AIMessage(content=f"I encountered an error: {e}")
+        return {"messages": [error_msg], "research_result": f"Research failed: {e}"}
+
+
+async def _run_tool_call(tool_call: dict, timeout: int, abandoned: threading.Event) -> ToolMessage:
+    """Run one tool call in a worker thread (Tavily's client is blocking)."""
+    # This task runs in its own copy of the context, which to_thread hands to the thread
+    _search_call.set((timeout, abandoned))
+    try:
+        selected_tool = tools_by_name[tool_call["name"]]
+        # Invoking with the full tool call returns a ToolMessage carrying the artifact
+        return await asyncio.to_thread(selected_tool.invoke, {**tool_call, "type": "tool_call"})
+    except Exception as e:
+        return ToolMessage(
+            content=f"Error: {e}", tool_call_id=tool_call["id"], name=tool_call["name"], status="error"
+        )
+
+
+# The tools node
+async def tools_node(state: AgentState) -> dict:
+    """Runs every tool call of the last message concurrently, within the search and time budgets.
+
+    Calls still running when the time budget runs out are answered with a
+    timeout message. Cancelling them is best-effort: their threads cannot be
+    stopped, but Tavily's request timeout (the time left) bounds them, and
+    their late results are not reported to the circuit breaker.
+    """
+    tool_calls = state["messages"][-1].tool_calls
+    searches = state.get("searches", 0)
+    remaining = max(_budget(state, "max_searches", research_max_searches) - searches, 0)
+    allowed, skipped = tool_calls[:remaining], tool_calls[remaining:]
+
+    logger.info("Running %d tool calls concurrently (%d over budget)", len(allowed), len(skipped))
+    time_left = max(_time_left(state), 0)
+    abandoned = threading.Event()
+    tasks = [asyncio.create_task(_run_tool_call(tc, max(math.ceil(time_left), 1), abandoned)) for tc in allowed]
+    done, pending = await asyncio.wait(tasks, timeout=time_left) if tasks else (set(), set())
+    if pending:
+        abandoned.set()
+    for task in pending:
+        task.cancel()
+
+    # Every tool call needs an answer, in the order the LLM asked for them
+    results = []
+    seen = {(s.get("url"), s.get("content")) for s in state.get("sources") or []}
+    new_sources = []
+    for tc, task in zip(allowed, tasks):
+        if task in done:
+            message = task.result()
+            hits = message.artifact if isinstance(getattr(message, "artifact", None), list) else []
+            fresh = [h for h in hits if (h.get("url"), h.get("content")) not in seen]
+            if len(fresh) < len(hits):
+                # Don't resend snippets the agent has already read in this run
+                repeated = [h.get("url", "N/A") for h in hits if h not in fresh]
+                content = _format_results(fresh) if fresh else "No new results."
+                content += "\n---\nAlready retrieved earlier: " + ", ".join(repeated)
+                message = message.model_copy(update={"content": content})
+            seen.update((h.get("url"), h.get("content")) for h in fresh)
+            new_sources.extend(fresh)
+            results.append(message)
+        else:
+            results.append(ToolMessage(
+                content="Search timed out: research time budget exceeded.",
+                tool_call_id=tc["id"], name=tc["name"], status="error"
+            ))
+    for tc in skipped:
+        results.append(ToolMessage(
+            content="Search skipped: research search budget exceeded.",
+            tool_call_id=tc["id"], name=tc["name"], status="error"
+        ))
+
+    return {"messages": results, "searches": searches + len(allowed), "sources": new_sources}
+
+
+# Routing logic
+def should_continue(state: AgentState) -> str:
+    """Return 'continue' if the last message requested tools, otherwise 'end'."""
+    messages = state.get("messages", [])
+    if not messages:
+        logger.debug("No messages in state; ending.")
+        return "end"
+    
+    last_message = messages[-1]
+
+    if state.get("research_result") is not None:
+        logger.debug("Research result produced; ending")
+        return "end"
+    
+    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+        logger.debug("Routing to tools")
+        return "continue"
+    
+    logger.debug("Routing to end")
+    return "end"
+
+
+# Build the graph
+graph = StateGraph(AgentState)
+graph.add_node("agent", research_agent)
+graph.add_node("tools", tools_node)
+graph.set_entry_point("agent")
+graph.add_conditional_edges("agent", should_continue, {"continue": "tools", "end": END})
+graph.add_edge("tools", "agent")
+
 app = graph.compile()
\ No newline at end of file
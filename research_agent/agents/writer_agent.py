@@ -1,54 +1,212 @@
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, Optional, List
-from .llm import llm
-import logging
-from prompts.writer_agent_prompt import writer_agent_prompt as prompt
-from langchain_core.messages import SystemMessage, BaseMessage, AIMessage, HumanMessage
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger('writer_agent') 
-
- 
-
-# Agent state
-class writer_agent_state(TypedDict):
-    message: List[BaseMessage]
-    article: Optional[str]
-
-async def writing_agent(state: writer_agent_state) -> writer_agent_state:
-    '''Creates a comprehensive article or summary from the analysis'''  
-    messages: List[BaseMessage] = list(state.get("message", []))
-    
-    # Add system prompt
-    system_msg = SystemMessage(content=prompt)
-    all_messages = [system_msg] + messages
-    
-    try:
-        logger.info('Agent processing analysis data...')
-        llm_response = await llm.ainvoke(all_messages)
-        
-        # Append AI response as AIMessage
-        messages.append(AIMessage(content=llm_response.content))
-        
-        return {
-            'message': messages, 
-            'article': llm_response.content
-        }
-        
-    except Exception as e:
-        logger.exception(f'Error processing input: {e}')
-        error_msg = AIMessage(content=f"I encountered an error: {str(e)}")
-        messages.append(error_msg)
-        
-        return {
-            'message': messages,
-            'article': f"Writing failed: {str(e)}" 
-        }
-
-# Fixed: Remove space and quotes
-graph = StateGraph(writer_agent_state)
-graph.add_node('writing_agent', writing_agent)
-graph.set_entry_point('writing_agent')
-graph.add_edge('writing_agent', END)
-
-app = graph.compile()
+from langgraph.graph import StateGraph, END
+from typing import TypedDict, Optional, List
+import asyncio
+import json
+import re
+from .llm import get_llm
+from .prompt_cache import prompt_cache
+import logging
+from prompts.writer_agent_prompt import writer_agent_prompt as prompt
+from settings.config import writer_mode, writer_section_concurrency, writer_max_sections
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+
+logger = logging.getLogger('writer_agent') 
+
+llm = get_llm('writer')
+outline_llm = get_llm('writer_outline')
+
+# Per-part instructions used when the article is written in pieces
+SECTION_INSTRUCTIONS = {
+    'opening': (
+        "Write only the title (# heading) and the introduction (2-3 paragraphs) of the article, "
+        "based on the summary below. Do not write any other section."
+    ),
+    'body': (
+        "Write only one body section of the article from the analysis excerpt below: "
+        "a ## subheading and 2-4 paragraphs. No title, introduction or conclusion."
+    ),
+    'conclusion': (
+        "Write only the conclusion of the article (## Conclusion, 1-2 paragraphs), "
+        "based on the summary and the sections it covers below."
+    ),
+}
+
+# LLM calls writing article text carry this tag, plus "article:<n>" with the part's position in the article
+ARTICLE_TAG = 'article'
+
+OUTLINE_INSTRUCTIONS = """Plan an article based on the material below. Reply with JSON only, in this form:
+{"title": "...", "sections": [{"heading": "...", "points": ["...", "..."]}]}
+The first section is the introduction and the last one the conclusion, with 3-5 body sections in between.
+Points are short notes on what each section covers, taken from the material."""
+
+
+def article_config(part: int = 0) -> dict:
+    '''Run config tagging an LLM call as article text, so its streamed tokens can be shown in place'''
+    return {'tags': [ARTICLE_TAG, f'{ARTICLE_TAG}:{part}']}
+
+
+def article_part(tags: Optional[List[str]]) -> Optional[int]:
+    '''Position of the article part written by an LLM call with these tags; None if it is not article text'''
+    prefix = f'{ARTICLE_TAG}:'
+    for tag in tags or []:
+        if tag.startswith(prefix):
+            return int(tag[len(prefix):])
+    return None
+
+
+# Agent state
+class writer_agent_state(TypedDict):
+    message: List[BaseMessage]
+    article: Optional[str]
+    # Sectioned mode: {'title': str, 'sections': [{'heading': str, 'points': [str]}]}
+    outline: Optional[dict]
+    sections: Optional[List[str]]
+
+async def writing_agent(state: writer_agent_state) -> writer_agent_state:
+    '''Creates a comprehensive article or summary from the analysis'''  
+    messages: List[BaseMessage] = list(state.get("message", []))
+    
+    try:
+        logger.info('Agent processing analysis data...')
+        # The system prompt goes through the provider-side prompt cache
+        llm_response = await prompt_cache.ainvoke(llm, 'writer', prompt, messages, config=article_config())
+        
+        # Append AI response as AIMessage
+        messages.append(AIMessage(content=llm_response.content))
+        
+        return {
+            'message': messages, 
+            'article': llm_response.content
+        }
+        
+    except Exception as e:
+        logger.exception(f'Error processing input: {e}')
+        error_msg = AIMessage(content=f"I encountered an error: {str(e)}")
+        messages.append(error_msg)
+        
+        return {
+            'message': messages,
+            'article': f"Writing failed: {str(e)}" 
+        }
+
+async def write_section(topic: str, material: str, role: str = 'body', part: int = 0) -> str:
+    '''Writes one part of the article (opening, body section or conclusion) from part of the analysis
+
+    ``part`` is the position of the part in the assembled article.
+    '''
+    content = f"{SECTION_INSTRUCTIONS[role]}\n\nArticle topic: {topic}\n\n{material}"
+    llm_response = await prompt_cache.ainvoke(llm, 'writer', prompt, [HumanMessage(content=content)],
+                                              config=article_config(part))
+    return llm_response.content.strip()
+
+def _parse_outline(text: str) -> Optional[dict]:
+    '''Read the outline JSON (possibly inside a code fence); None if it is unusable'''
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        outline = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    sections = [
+        {'heading': str(s['heading']).strip(), 'points': [str(p) for p in s.get('points', [])]}
+        for s in outline.get('sections', [])
+        if isinstance(s, dict) and s.get('heading')
+    ]
+    if not outline.get('title') or len(sections) < 2:
+        return None
+    # Keep the introduction and conclusion when trimming
+    if len(sections) > writer_max_sections:
+        sections = sections[:writer_max_sections - 1] + sections[-1:]
+    return {'title': str(outline['title']).strip(), 'sections': sections}
+
+
+async def outline_agent(state: writer_agent_state) -> dict:
+    '''Plans the article as a title and a list of sections'''
+    messages: List[BaseMessage] = list(state.get("message", []))
+    material = "\n\n".join(m.content for m in messages if isinstance(m.content, str))
+    try:
+        logger.info('Outlining article...')
+        response = await outline_llm.ainvoke([HumanMessage(content=f"{OUTLINE_INSTRUCTIONS}\n\n{material}")])
+        outline = _parse_outline(response.content)
+    except Exception as e:
+        logger.warning(f'Outline failed, writing in a single call: {e}')
+        outline = None
+    if outline is None:
+        logger.info('No usable outline, writing in a single call')
+    return {'outline': outline}
+
+
+async def expand_sections(state: writer_agent_state) -> dict:
+    '''Writes every outlined section concurrently (at most writer_section_concurrency at a time)'''
+    outline = state['outline']
+    material = "\n\n".join(m.content for m in state.get("message", []) if isinstance(m.content, str))
+    plan = "\n".join(f"{i + 1}. {s['heading']}" for i, s in enumerate(outline['sections']))
+    total = len(outline['sections'])
+    semaphore = asyncio.Semaphore(writer_section_concurrency)
+
+    async def expand(index: int, section: dict) -> str:
+        if index == 0:
+            layout = f"Start with the title '# {outline['title']}', then write the introduction without a subheading."
+        else:
+            layout = f"Start with the subheading '## {section['heading']}'."
+        content = (
+            f"Write only section {index + 1} of {total}, \"{section['heading']}\", "
+            f"of the article \"{outline['title']}\". {layout}\n"
+            f"Cover: {'; '.join(section['points']) or section['heading']}\n\n"
+            f"Full outline, for context only:\n{plan}\n\n"
+            f"Material:\n{material}"
+        )
+        async with semaphore:
+            llm_response = await prompt_cache.ainvoke(llm, 'writer', prompt, [HumanMessage(content=content)],
+                                                      config=article_config(index))
+        return llm_response.content
+
+    try:
+        logger.info(f'Writing {total} sections...')
+        sections = await asyncio.gather(*(expand(i, s) for i, s in enumerate(outline['sections'])))
+        return {'sections': list(sections)}
+    except Exception as e:
+        logger.exception(f'Error writing sections: {e}')
+        return {'sections': None, 'article': f"Writing failed: {str(e)}"}
+
+
+def stitch_article(state: writer_agent_state) -> dict:
+    '''Assembles the sections in outline order with consistent headings (no LLM call)'''
+    outline = state['outline']
+    parts = []
+    for index, (section, text) in enumerate(zip(outline['sections'], state['sections'])):
+        lines = [line for line in text.strip().splitlines() if not (index and re.match(r'#\s', line))]
+        body = "\n".join(lines).strip()
+        if index == 0 and not body.startswith('# '):
+            body = f"# {outline['title']}\n\n{body}"
+        elif index and not body.startswith('## '):
+            body = f"## {section['heading']}\n\n{body}"
+        parts.append(body)
+    article = "\n\n".join(parts)
+    messages = list(state.get("message", [])) + [AIMessage(content=article)]
+    return {'message': messages, 'article': article}
+
+
+def route_after_outline(state: writer_agent_state) -> str:
+    return 'expand_sections' if state.get('outline') else 'writing_agent'
+
+
+def route_after_expand(state: writer_agent_state) -> str:
+    return 'stitch_article' if state.get('sections') else END
+
+
+# Fixed: Remove space and quotes
+graph = StateGraph(writer_agent_state)
+graph.add_node('writing_agent', writing_agent)
+graph.add_node('outline_agent', outline_agent)
+graph.add_node('expand_sections', expand_sections)
+graph.add_node('stitch_article', stitch_article)
+# sectioned: outline, then expand the sections concurrently; single: one call
+graph.set_entry_point('outline_agent' if writer_mode == 'sectioned' else 'writing_agent')
+graph.add_conditional_edges('outline_agent', route_after_outline, ['expand_sections', 'writing_agent'])
+graph.add_conditional_edges('expand_sections', route_after_expand, ['stitch_article', END])
+graph.add_edge('stitch_article', END)
+graph.add_edge('writing_agent', END)
+
+app = graph.compile()
@@ -0,0 +1,254 @@
+"""Refresh the cached articles of the most requested queries off-peak.
+
+    python cache_warmer.py plan                 # candidates and expected hit-rate gain, no spend
+    python cache_warmer.py run                  # warm inside CACHE_WARM_WINDOW, within budget
+    python cache_warmer.py run --ignore-window --max-queries 5
+    python cache_warmer.py run --tenant acme    # a tenant's own demand and cache
+
+Users' queries are grouped as the cache keys them (lowercased, trimmed) and
+then by a looser normal form (whitespace and trailing punctuation), so
+spelling variants of one question share a single run. Groups are ranked by
+expected requests per day, which blends their rate over the lookback window
+with their rate over the last day so trending queries move up. A group is
+warmed when it has no cached article or the article is older than
+CACHE_WARM_REFRESH_HOURS; the new article is cached under every variant.
+
+Warm runs go through the orchestrator with ``bypass_cache`` and
+``origin='cache_warmer'`` (not counted as demand). Demand is mined from, and
+variants are cached in, the orchestrator's own memory, the one its runs
+write to; ``--tenant`` selects a tenant's database (default: requests
+without a tenant). Their LLM calls and
+Tavily searches are counted with a recording cassette and the run stops
+before the next query could exceed the budget.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from statistics import mean
+from typing import Dict, List, Optional, Tuple
+
+from agents.cassette import Cassette, use_cassette
+from database.backend import MemoryBackend
+from settings.logging_config import configure_logging
+from settings.config import (
+    cache_warm_window,
+    cache_warm_max_queries,
+    cache_warm_max_llm_calls,
+    cache_warm_max_searches,
+    cache_warm_lookback_days,
+    cache_warm_refresh_hours,
+    research_max_searches,
+    research_max_turns,
+)
+
+logger = logging.getLogger('cache_warmer')
+
+ORIGIN = 'cache_warmer'
+# Window for the trending rate (hours)
+RECENT_HOURS = 24
+# Queries asked fewer times than this in the lookback window are not worth a run
+MIN_REQUESTS = 2
+# Spend assumed for the first run, before any warm run has been measured
+DEFAULT_RUN_COST = {'llm_calls': research_max_turns + 4, 'searches': research_max_searches}
+
+
+def normalize_query(query: str) -> str:
+    """Looser form than the cache key: case, inner whitespace and trailing punctuation ignored."""
+    return re.sub(r'\s+', ' ', query.lower()).strip().rstrip('?!. ')
+
+
+def mine_candidates(memory: MemoryBackend, lookback_days: float, refresh_hours: float,
+                    min_requests: int = MIN_REQUESTS) -> Tuple[List[Dict], Dict]:
+    """Rank query groups by expected demand; returns (groups needing a run, demand totals)."""
+    groups: Dict[str, Dict] = {}
+    totals = {'requests': 0, 'hits': 0, 'misses': 0}
+    for row in memory.get_query_demand(days=lookback_days, recent_hours=RECENT_HOURS):
+        for key in totals:
+            totals[key] += row[key]
+        group = groups.setdefault(normalize_query(row['cache_key']), {
+            'variants': [], 'requests': 0, 'recent_requests': 0, 'hits': 0, 'misses': 0
+        })
+        group['variants'].append(row)
+        for key in ('requests', 'recent_requests', 'hits', 'misses'):
+            group[key] += row[key]
+
+    candidates = []
+    for normalized, group in groups.items():
+        if group['requests'] < min_requests:
+            continue
+        window_rate = group['requests'] / lookback_days
+        recent_rate = group['recent_requests'] * 24 / RECENT_HOURS
+        # Most asked variant is the one actually run
+        variants = sorted(group['variants'], key=lambda v: v['requests'], reverse=True)
+        ages = [memory.get_cache_entry(v['cache_key']) for v in variants]
+        fresh = [a for a in ages if a and a['age_hours'] is not None and a['age_hours'] < refresh_hours]
+        if len(fresh) == len(variants):
+            continue
+        cached = [a for a in ages if a]
+        candidates.append({
+            'query': variants[0]['query'],
+            'normalized': normalized,
+            'variants': [v['query'] for v in variants],
+            'requests': group['requests'],
+            'recent_requests': group['recent_requests'],
+            'misses': group['misses'],
+            'expected_requests_per_day': round((window_rate + recent_rate) / 2, 2),
+            'trend': round(recent_rate / window_rate, 2) if window_rate else None,
+            'reason': 'stale' if cached else 'missing',
+            'cache_age_hours': round(min(a['age_hours'] for a in cached), 1) if cached else None,
+        })
+    candidates.sort(key=lambda c: c['expected_requests_per_day'], reverse=True)
+    return candidates, totals
+
+
+def hit_rate_report(candidates: List[Dict], totals: Dict, lookback_days: float) -> Dict:
+    """Observed hit rate and what it would have been with these groups warmed.
+
+    Every miss of a warmed group in the lookback window is assumed to become
+    a hit, so the gain is an upper bound for demand that repeats.
+    """
+    requests = totals['requests']
+    if not requests:
+        return {'requests': 0, 'current_hit_rate': None, 'expected_hit_rate': None, 'expected_gain': None}
+    avoided = sum(c['misses'] for c in candidates)
+    return {
+        'requests': requests,
+        'requests_per_day': round(requests / lookback_days, 2),
+        'current_hit_rate': round(totals['hits'] / requests, 3),
+        'expected_hit_rate': round((totals['hits'] + avoided) / requests, 3),
+        'expected_gain': round(avoided / requests, 3),
+        'misses_avoided': avoided,
+    }
+
+
+def parse_window(window: str) -> Tuple[int, int]:
+    """'01:00-06:00' -> minutes since midnight (start, end); the window may wrap past midnight."""
+    start, end = (datetime.strptime(part.strip(), '%H:%M') for part in window.split('-'))
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def in_window(window: str, now: datetime = None) -> bool:
+    start, end = parse_window(window)
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    return start <= minute < end if start <= end else minute >= start or minute < end
+
+
+def _run_cost(cassette: Cassette) -> Dict[str, int]:
+    channels = [entry['channel'] for entry in cassette.entries]
+    return {
+        'llm_calls': sum(c.startswith('llm:') for c in channels),
+        'searches': sum(c == 'tavily' for c in channels),
+    }
+
+
+async def warm(candidates: List[Dict], memory: MemoryBackend, budget: Dict[str, int],
+               window: Optional[str], tenant_id: str = None) -> Dict:
+    """Run the orchestrator for candidates in order until the budget or the window runs out.
+
+    ``memory`` must be the backend the orchestrator routes ``tenant_id`` to.
+    """
+    from orchestrator import app, FAILURE_PREFIXES
+    from worker import initial_state
+
+    spent = {'llm_calls': 0, 'searches': 0}
+    costs: List[Dict[str, int]] = []
+    warmed, failed = [], []
+    stop_reason = 'done'
+
+    for candidate in candidates:
+        if len(warmed) + len(failed) >= budget['max_queries']:
+            stop_reason = 'max_queries'
+            break
+        if window and not in_window(window):
+            stop_reason = 'window closed'
+            break
+        expected = {k: mean(c[k] for c in costs) if costs else DEFAULT_RUN_COST[k] for k in spent}
+        if spent['llm_calls'] + expected['llm_calls'] > budget['max_llm_calls']:
+            stop_reason = 'llm budget'
+            break
+        if spent['searches'] + expected['searches'] > budget['max_searches']:
+            stop_reason = 'search budget'
+            break
+
+        # The cassette only counts this run's calls; it is never saved
+        cassette = Cassette.recorder()
+        started = time.monotonic()
+        try:
+            with use_cassette(cassette):
+                result = await app.ainvoke(initial_state({
+                    'user_query': candidate['query'], 'bypass_cache': True, 'origin': ORIGIN,
+                    'tenant_id': tenant_id
+                }))
+            article = result.get('final_article') or ''
+            if result.get('served_stale'):
+                article = 'Writing failed: served a stale fallback'
+        except Exception as e:
+            logger.exception(f"Warming '{candidate['query'][:60]}' failed")
+            article = f'Writing failed: {e}'
+        cost = _run_cost(cassette)
+        costs.append(cost)
+        for key in spent:
+            spent[key] += cost[key]
+
+        entry = {'query': candidate['query'], 'seconds': round(time.monotonic() - started, 1), **cost}
+        if not article or article.startswith(FAILURE_PREFIXES):
+            failed.append(entry)
+            continue
+        # The orchestrator cached it under the query it ran; the other variants share the article
+        for variant in candidate['variants'][1:]:
+            await asyncio.to_thread(memory.cache_result, variant, article)
+        warmed.append({**entry, 'expected_requests_per_day': candidate['expected_requests_per_day']})
+        logger.info(f"Warmed '{candidate['query'][:60]}' ({cost['llm_calls']} LLM calls, {cost['searches']} searches)")
+
+    return {'warmed': warmed, 'failed': failed, 'spent': spent, 'stopped': stop_reason}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Warm the query cache with popular queries')
+    parser.add_argument('command', choices=('plan', 'run'))
+    parser.add_argument('--tenant', help='Warm this tenant\'s cache (default: requests without a tenant)')
+    parser.add_argument('--lookback-days', type=float, default=cache_warm_lookback_days)
+    parser.add_argument('--refresh-hours', type=float, default=cache_warm_refresh_hours,
+                        help='Refresh cached articles older than this')
+    parser.add_argument('--window', default=cache_warm_window, help='Off-peak window, local time HH:MM-HH:MM')
+    parser.add_argument('--ignore-window', action='store_true', help='Run now even outside the window')
+    parser.add_argument('--max-queries', type=int, default=cache_warm_max_queries)
+    parser.add_argument('--max-llm-calls', type=int, default=cache_warm_max_llm_calls)
+    parser.add_argument('--max-searches', type=int, default=cache_warm_max_searches)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # Imported here so --help stays fast; the store the warm runs write to
+    from orchestrator import tenants
+    memory = tenants.for_tenant(args.tenant)
+    candidates, totals = mine_candidates(memory, args.lookback_days, args.refresh_hours)
+
+    if args.command == 'plan':
+        selected = candidates[:args.max_queries]
+        print(json.dumps({
+            'candidates': selected,
+            'hit_rate': hit_rate_report(selected, totals, args.lookback_days),
+        }, indent=2))
+        return
+
+    window = None if args.ignore_window else args.window
+    if window and not in_window(window):
+        print(f'Outside the off-peak window {window}; nothing to do (use --ignore-window to run anyway)')
+        return
+    budget = {'max_queries': args.max_queries, 'max_llm_calls': args.max_llm_calls,
+              'max_searches': args.max_searches}
+    outcome = asyncio.run(warm(candidates, memory, budget, window, args.tenant))
+    warmed = {c['query'] for c in outcome['warmed']}
+    print(json.dumps({
+        **outcome,
+        'hit_rate': hit_rate_report([c for c in candidates if c['query'] in warmed], totals, args.lookback_days),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,494 +1,1117 @@
-import sqlite3
-import json
-import hashlib
-import re
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from pathlib import Path
-import logging
-
-logger = logging.getLogger("agent_memory")
-if not logger.handlers:
-    # library should not configure root logging; attach a NullHandler by default
-    logger.addHandler(logging.NullHandler())
-
-
-class MemoryManager:
-    """Manages the memory for the Research Using SQLites"""
-    def __init__(self, db_path: str = 'memory/agent_memory.db'):
-        """Initialize the memory manager"""
-        self.db_path = db_path
-        # ensure the db directory exists
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-
-        # initialize the database tables
-        self._init_database()
-        logger.info(f"Memory manager initialized with database: {db_path}")
-
-    def _init_database(self):
-        """Create database tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            # Conversations table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_query TEXT NOT NULL,
-                    task_type TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    user_provided_data TEXT,
-                    agents_used TEXT,
-                    success INTEGER DEFAULT 1
-                )
-            """)
-
-            # Research results table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS research_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id INTEGER,
-                    query TEXT NOT NULL,
-                    results TEXT NOT NULL,
-                    sources TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Analyses table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS analyses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id INTEGER,
-                    analysis TEXT NOT NULL,
-                    key_insights TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Articles table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS articles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id INTEGER,
-                    article TEXT NOT NULL,
-                    quality_score REAL,
-                    word_count INTEGER,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Learnings table - for agent improvements
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS learnings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    agent_name TEXT NOT NULL,
-                    lesson TEXT NOT NULL,
-                    context TEXT,
-                    success_pattern INTEGER,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Similar queries cache - for faster responses
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS query_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    query_hash TEXT UNIQUE NOT NULL,
-                    query TEXT NOT NULL,
-                    result TEXT NOT NULL,
-                    hit_count INTEGER DEFAULT 0,
-                    last_accessed DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            conn.commit()
-            logger.info("Database tables initialized")
-
-    def start_conversation(self, user_query: str, task_type: str = None, user_provided_data: str = None) -> int:
-        """Start and record a new conversation, return its id."""
-        # Allow being called on the class (MemoryManager.start_conversation(...))
-        # by instantiating a default manager and forwarding the call.
-        if isinstance(self, type):
-            return MemoryManager().start_conversation(user_query, task_type, user_provided_data)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO conversations (user_query, task_type, user_provided_data)
-                VALUES (?, ?, ?)
-            """, (user_query, task_type, user_provided_data))
-            conn.commit()
-            conv_id = cursor.lastrowid
-            logger.info(f"Started conversation {conv_id}")
-            return conv_id
-
-    def end_conversation(self, conversation_id: int, agents_used: List[str], success: bool = True):
-        """Mark a conversation as complete."""
-        # Allow being called as MemoryManager.end_conversation(...)
-        if isinstance(self, type):
-            return MemoryManager().end_conversation(conversation_id, agents_used, success)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE conversations
-                SET agents_used = ?, success = ?
-                WHERE id = ?
-            """, (json.dumps(agents_used), 1 if success else 0, conversation_id))
-            conn.commit()
-            logger.info(f"Ended conversation {conversation_id}")
-
-    def save_research(self, conversation_id: int, query: str, results: str, sources: List[str] = None):
-        """Save research results."""
-        if isinstance(self, type):
-            return MemoryManager().save_research(conversation_id, query, results, sources)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO research_results (conversation_id, query, results, sources)
-                VALUES (?, ?, ?, ?)
-            """, (conversation_id, query, results, json.dumps(sources) if sources else None))
-            conn.commit()
-            logger.info(f"Saved research for conversation {conversation_id}")
-
-    def get_similar_research(self, query: str, limit: int = 5) -> List[Dict]:
-        """Find similar past research (simple keyword matching)."""
-        if isinstance(self, type):
-            return MemoryManager().get_similar_research(query, limit)
-        
-        if not query or not query.strip():
-            return []
-
-        # Extract word tokens (alphanumeric), prefer longer keywords, limit overall results
-        tokens = re.findall(r'\w+', query.lower())
-        keywords = [t for t in tokens if len(t) > 2][:5] or tokens[:3]
-
-        results: List[Dict] = []
-        seen = set()
-
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            for kw in keywords:
-                cursor.execute("""
-                    SELECT query, results, timestamp
-                    FROM research_results
-                    WHERE LOWER(query) LIKE ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (f'%{kw}%', limit))
-
-                for row in cursor.fetchall():
-                    key = (row[0], row[2])
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    results.append({'query': row[0], 'results': row[1], 'timestamp': row[2]})
-                    if len(results) >= limit:
-                        break
-
-                if len(results) >= limit:
-                    break
-
-        return results
-
-    # ============================================
-    # ANALYSIS MEMORY
-    # ============================================
-    
-    def save_analysis(self, conversation_id: int, analysis: str, 
-                     key_insights: List[str] = None):
-        """Save analysis results."""
-        if isinstance(self, type):
-            return MemoryManager().save_analysis(conversation_id, analysis, key_insights)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO analyses (conversation_id, analysis, key_insights)
-                VALUES (?, ?, ?)
-            """, (conversation_id, analysis, 
-                  json.dumps(key_insights) if key_insights else None))
-            conn.commit()
-            logger.info(f"Saved analysis for conversation {conversation_id}")
-    
-    def get_past_analyses(self, topic: str, limit: int = 5) -> List[Dict]:
-        """Get past analyses on similar topics."""
-        if isinstance(self, type):
-            return MemoryManager().get_past_analyses(topic, limit)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT a.analysis, a.key_insights, a.timestamp, c.user_query
-                FROM analyses a
-                JOIN conversations c ON a.conversation_id = c.id
-                WHERE LOWER(c.user_query) LIKE ?
-                ORDER BY a.timestamp DESC
-                LIMIT ?
-            """, (f'%{topic.lower()}%', limit))
-            
-            return [
-                {
-                    'analysis': r[0],
-                    'key_insights': json.loads(r[1]) if r[1] else [],
-                    'timestamp': r[2],
-                    'original_query': r[3]
-                }
-                for r in cursor.fetchall()
-            ]
-    
-    # ============================================
-    # ARTICLE MEMORY
-    # ============================================
-    
-    def save_article(self, conversation_id: int, article: str, 
-                    quality_score: float = None):
-        """Save generated article."""
-        if isinstance(self, type):
-            return MemoryManager().save_article(conversation_id, article, quality_score)
-        
-        word_count = len(article.split())
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO articles (conversation_id, article, quality_score, word_count)
-                VALUES (?, ?, ?, ?)
-            """, (conversation_id, article, quality_score, word_count))
-            conn.commit()
-            logger.info(f"Saved article for conversation {conversation_id}")
-    
-    def get_best_articles(self, topic: str = None, limit: int = 10) -> List[Dict]:
-        """Get highest quality articles, optionally filtered by topic."""
-        if isinstance(self, type):
-            return MemoryManager().get_best_articles(topic, limit)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            if topic:
-                cursor.execute("""
-                    SELECT a.article, a.quality_score, a.word_count, 
-                           a.timestamp, c.user_query
-                    FROM articles a
-                    JOIN conversations c ON a.conversation_id = c.id
-                    WHERE LOWER(c.user_query) LIKE ?
-                    ORDER BY a.quality_score DESC, a.timestamp DESC
-                    LIMIT ?
-                """, (f'%{topic.lower()}%', limit))
-            else:
-                cursor.execute("""
-                    SELECT a.article, a.quality_score, a.word_count, 
-                           a.timestamp, c.user_query
-                    FROM articles a
-                    JOIN conversations c ON a.conversation_id = c.id
-                    ORDER BY a.quality_score DESC, a.timestamp DESC
-                    LIMIT ?
-                """, (limit,))
-            
-            return [
-                {
-                    'article': r[0],
-                    'quality_score': r[1],
-                    'word_count': r[2],
-                    'timestamp': r[3],
-                    'original_query': r[4]
-                }
-                for r in cursor.fetchall()
-            ]
-    
-    # ============================================
-    # LEARNING & IMPROVEMENT
-    # ============================================
-    
-    def save_learning(self, agent_name: str, lesson: str, 
-                     context: str = None, success_pattern: bool = True):
-        """Save a learning for future improvement."""
-        if isinstance(self, type):
-            return MemoryManager().save_learning(agent_name, lesson, context, success_pattern)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO learnings (agent_name, lesson, context, success_pattern)
-                VALUES (?, ?, ?, ?)
-            """, (agent_name, lesson, context, 1 if success_pattern else 0))
-            conn.commit()
-            logger.info(f"Saved learning for {agent_name}")
-    
-    def get_learnings(self, agent_name: str = None, 
-                     success_only: bool = True, limit: int = 20) -> List[Dict]:
-        """Retrieve learnings for an agent."""
-        if isinstance(self, type):
-            return MemoryManager().get_learnings(agent_name, success_only, limit)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            if agent_name:
-                if success_only:
-                    cursor.execute("""
-                        SELECT lesson, context, timestamp
-                        FROM learnings
-                        WHERE agent_name = ? AND success_pattern = 1
-                        ORDER BY timestamp DESC
-                        LIMIT ?
-                    """, (agent_name, limit))
-                else:
-                    cursor.execute("""
-                        SELECT lesson, context, timestamp, success_pattern
-                        FROM learnings
-                        WHERE agent_name = ?
-                        ORDER BY timestamp DESC
-                        LIMIT ?
-                    """, (agent_name, limit))
-            else:
-                # return same column order (lesson, context, timestamp) for consistency
-                cursor.execute("""
-                    SELECT lesson, context, timestamp
-                    FROM learnings
-                    WHERE success_pattern = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (1 if success_only else 0, limit))
-            
-            return [
-                {
-                    'lesson': r[0],
-                    'context': r[1] if len(r) > 1 else None,
-                    'timestamp': r[2] if len(r) > 2 else None,
-                    'success_pattern': r[3] if len(r) > 3 else None
-                }
-                for r in cursor.fetchall()
-            ]
-    
-    # ============================================
-    # QUERY CACHING
-    # ============================================
-    
-    def get_cached_result(self, query: str) -> Optional[str]:
-        """Check if we have a cached result for this query."""
-        if isinstance(self, type):
-            return MemoryManager().get_cached_result(query)
-        
-        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT result FROM query_cache WHERE query_hash = ?
-            """, (query_hash,))
-            
-            result = cursor.fetchone()
-            if result:
-                # Update hit count and last accessed
-                cursor.execute("""
-                    UPDATE query_cache 
-                    SET hit_count = hit_count + 1, 
-                        last_accessed = CURRENT_TIMESTAMP
-                    WHERE query_hash = ?
-                """, (query_hash,))
-                conn.commit()
-                logger.info(f"Cache hit for query: {query[:50]}...")
-                return result[0]
-            
-            return None
-    
-    def cache_result(self, query: str, result: str):
-        """Cache a result for future use."""
-        if isinstance(self, type):
-            return MemoryManager().cache_result(query, result)
-        
-        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            # Upsert: insert new or update existing result + last_accessed
-            cursor.execute("""
-                INSERT INTO query_cache (query_hash, query, result, hit_count, last_accessed, created_at)
-                VALUES (?, ?, ?, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                ON CONFLICT(query_hash) DO UPDATE SET
-                    result = excluded.result,
-                    last_accessed = CURRENT_TIMESTAMP
-            """, (query_hash, query, result))
-            conn.commit()
-            logger.info(f"Cached result for query: {query[:50]}...")
-    
-    # ============================================
-    # STATISTICS & ANALYTICS
-    # ============================================
-    
-    def get_statistics(self) -> Dict[str, Any]:
-        """Get overall system statistics.""" 
-        if isinstance(self, type):
-            return MemoryManager().get_statistics()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            stats = {}
-            
-            # Total conversations
-            cursor.execute("SELECT COUNT(*) FROM conversations")
-            stats['total_conversations'] = cursor.fetchone()[0]
-            
-            # Successful conversations
-            cursor.execute("SELECT COUNT(*) FROM conversations WHERE success = 1")
-            stats['successful_conversations'] = cursor.fetchone()[0]
-            
-            # Total research queries
-            cursor.execute("SELECT COUNT(*) FROM research_results")
-            stats['total_research_queries'] = cursor.fetchone()[0]
-            
-            # Total analyses
-            cursor.execute("SELECT COUNT(*) FROM analyses")
-            stats['total_analyses'] = cursor.fetchone()[0]
-            
-            # Total articles
-            cursor.execute("SELECT COUNT(*) FROM articles")
-            stats['total_articles'] = cursor.fetchone()[0]
-            
-            # Average article quality
-            cursor.execute("SELECT AVG(quality_score) FROM articles WHERE quality_score IS NOT NULL")
-            avg_quality = cursor.fetchone()[0]
-            stats['average_article_quality'] = round(avg_quality, 2) if avg_quality is not None else None
-            
-            # Cache statistics
-            cursor.execute("SELECT COUNT(*), SUM(hit_count) FROM query_cache")
-            cache_stats = cursor.fetchone()
-            stats['cached_queries'] = cache_stats[0]
-            stats['total_cache_hits'] = cache_stats[1] or 0
-            
-            # Most common task types
-            cursor.execute("""
-                SELECT task_type, COUNT(*) as count 
-                FROM conversations 
-                WHERE task_type IS NOT NULL
-                GROUP BY task_type 
-                ORDER BY count DESC 
-                LIMIT 5
-            """)
-            stats['top_task_types'] = dict(cursor.fetchall())
-            
-            return stats
-    
-    def clear_old_cache(self, days: int = 30):
-        """Clear cache entries older than specified days."""
-        if isinstance(self, type):
-            return MemoryManager().clear_old_cache(days)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute("""
-                DELETE FROM query_cache 
-                WHERE last_accessed < ?
-            """, (cutoff,))
-            deleted = cursor.rowcount
-            conn.commit()
-            logger.info(f"Cleared {deleted} old cache entries")
-            return deleted
\ No newline at end of file
+import sqlite3
+import json
+import hashlib
+import re
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any
+from pathlib import Path
+import logging
+from . import compression
+from . import migrations
+from . import stats as stats_schema
+
+logger = logging.getLogger("agent_memory")
+if not logger.handlers:
+    # library should not configure root logging; attach a NullHandler by default
+    logger.addHandler(logging.NullHandler())
+
+
+# Filler words that say nothing about the research topic
+_STOPWORDS = frozenset({
+    'the', 'and', 'for', 'with', 'about', 'from', 'into', 'what', 'how', 'why',
+    'write', 'explain', 'detailed', 'article', 'report', 'summary', 'please',
+})
+
+
+def _extract_keywords(text: str) -> List[str]:
+    """Extract word tokens (alphanumeric), preferring longer, topical keywords."""
+    tokens = re.findall(r'\w+', text.lower())
+    return [t for t in tokens if len(t) > 2 and t not in _STOPWORDS] or tokens[:3]
+
+
+def _relevance(keywords: set, text: str) -> float:
+    """Keyword overlap of the query and ``text`` (Jaccard, 0..1).
+
+    Symmetric, so a short query scores low against a much broader stored
+    one even though all of its keywords appear there.
+    """
+    other = set(_extract_keywords(text))
+    return len(keywords & other) / len(keywords | other) if keywords else 0.0
+
+
+def _cache_freshness(age_hours: float, soft_ttl_hours: Optional[float], hard_ttl_hours: Optional[float]) -> str:
+    """'fresh', 'stale' (past the soft TTL) or 'expired' (past the hard TTL); a None TTL never runs out."""
+    if hard_ttl_hours is not None and age_hours >= hard_ttl_hours:
+        return 'expired'
+    if soft_ttl_hours is not None and age_hours >= soft_ttl_hours:
+        return 'stale'
+    return 'fresh'
+
+
+class MemoryManager:
+    """Manages the memory for the Research Using SQLites"""
+    def __init__(self, db_path: str = 'memory/agent_memory.db',
+                 compression_codec: str = 'off', compression_min_bytes: int = 1024):
+        """Initialize the memory manager
+
+        ``compression_codec`` ('off', 'zlib' or 'lzma') applies to newly written
+        large text columns; rows are flagged individually so any mix stays readable.
+        """
+        if compression_codec not in compression.CODECS:
+            raise ValueError(f"compression_codec must be one of {compression.CODECS}")
+        self.db_path = db_path
+        self.compression_codec = compression_codec
+        self.compression_min_bytes = compression_min_bytes
+        self._dictionaries: Dict[int, bytes] = {}
+        self._active_dictionary_id: Optional[int] = None
+        # ensure the db directory exists
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # initialize the database tables
+        self._init_database()
+        logger.info(f"Memory manager initialized with database: {db_path}")
+
+    def _init_database(self):
+        """Create or upgrade the database schema to the latest version"""
+        with sqlite3.connect(self.db_path) as conn:
+            version = migrations.migrate(conn)
+            logger.info(f"Database schema at version {version}")
+
+    # ============================================
+    # COLUMN COMPRESSION
+    # ============================================
+
+    def _dictionary(self, cursor: sqlite3.Cursor, dictionary_id: int) -> bytes:
+        if dictionary_id not in self._dictionaries:
+            cursor.execute("SELECT dictionary FROM compression_dictionaries WHERE id = ?", (dictionary_id,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Compression dictionary {dictionary_id} is missing")
+            self._dictionaries[dictionary_id] = row[0]
+        return self._dictionaries[dictionary_id]
+
+    def _encode(self, cursor: sqlite3.Cursor, text: str):
+        """Return (stored value, codec flag) for a large text column."""
+        if self.compression_codec == 'off':
+            return text, None
+        zdict = None
+        if self.compression_codec == compression.ZLIB:
+            if self._active_dictionary_id is None:
+                cursor.execute("SELECT MAX(id) FROM compression_dictionaries")
+                self._active_dictionary_id = cursor.fetchone()[0] or 0
+            if self._active_dictionary_id:
+                zdict = self._dictionary(cursor, self._active_dictionary_id)
+        return compression.encode(text, self.compression_codec, self.compression_min_bytes,
+                                  zdict, self._active_dictionary_id)
+
+    def _decode(self, cursor: sqlite3.Cursor, value, codec: Optional[str]) -> Optional[str]:
+        """Decode a stored column value according to its row codec flag."""
+        dictionary_id = compression.dictionary_id(codec)
+        zdict = self._dictionary(cursor, dictionary_id) if dictionary_id else None
+        return compression.decompress(value, codec, zdict)
+
+    def save_compression_dictionary(self, dictionary: bytes, sample_count: int = None) -> int:
+        """Store a trained dictionary; it becomes the active one for new zlib rows."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO compression_dictionaries (dictionary, sample_count)
+                VALUES (?, ?)
+            """, (dictionary, sample_count))
+            conn.commit()
+            self._active_dictionary_id = cursor.lastrowid
+            self._dictionaries[cursor.lastrowid] = dictionary
+            logger.info(f"Saved compression dictionary {cursor.lastrowid} ({len(dictionary)} bytes)")
+            return cursor.lastrowid
+
+    def start_conversation(self, user_query: str, task_type: str = None, user_provided_data: str = None,
+                           origin: str = None) -> int:
+        """Start and record a new conversation, return its id.
+
+        ``origin`` marks conversations not started by a user (e.g. 'cache_warmer').
+        """
+        # Allow being called on the class (MemoryManager.start_conversation(...))
+        # by instantiating a default manager and forwarding the call.
+        if isinstance(self, type):
+            return MemoryManager().start_conversation(user_query, task_type, user_provided_data, origin)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO conversations (user_query, task_type, user_provided_data, origin)
+                VALUES (?, ?, ?, ?)
+            """, (user_query, task_type, user_provided_data, origin))
+            conn.commit()
+            conv_id = cursor.lastrowid
+            logger.info(f"Started conversation {conv_id}")
+            return conv_id
+
+    def end_conversation(self, conversation_id: int, agents_used: List[str], success: bool = True):
+        """Mark a conversation as complete."""
+        # Allow being called as MemoryManager.end_conversation(...)
+        if isinstance(self, type):
+            return MemoryManager().end_conversation(conversation_id, agents_used, success)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE conversations
+                SET agents_used = ?, success = ?
+                WHERE id = ?
+            """, (json.dumps(agents_used), 1 if success else 0, conversation_id))
+            conn.commit()
+            logger.info(f"Ended conversation {conversation_id}")
+
+    def set_task_type(self, conversation_id: int, task_type: str):
+        """Record the task type chosen for a conversation."""
+        if isinstance(self, type):
+            return MemoryManager().set_task_type(conversation_id, task_type)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE conversations
+                SET task_type = ?
+                WHERE id = ?
+            """, (task_type, conversation_id))
+            conn.commit()
+
+    def record_degradation(self, conversation_id: int, decision: str):
+        """Append a deadline degradation (e.g. a dropped agent) to the conversation's record."""
+        if isinstance(self, type):
+            return MemoryManager().record_degradation(conversation_id, decision)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT degradation FROM conversations WHERE id = ?", (conversation_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return
+            decisions = json.loads(row[0]) if row[0] else []
+            decisions.append(decision)
+            cursor.execute("""
+                UPDATE conversations
+                SET degradation = ?
+                WHERE id = ?
+            """, (json.dumps(decisions), conversation_id))
+            conn.commit()
+            logger.info(f"Conversation {conversation_id} degraded: {decision}")
+
+    def record_research_reuse(self, conversation_id: int, research_id: int):
+        """Record that the conversation answered from stored research instead of searching."""
+        if isinstance(self, type):
+            return MemoryManager().record_research_reuse(conversation_id, research_id)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE conversations
+                SET reused_research_id = ?
+                WHERE id = ?
+            """, (research_id, conversation_id))
+            conn.commit()
+
+    def save_research(self, conversation_id: int, query: str, results: str,
+                      sources: List[Any] = None) -> int:
+        """Save research results and link the sources they came from.
+
+        ``sources`` may be URLs or dicts with ``url``, ``title`` and ``content``;
+        each distinct (url, content) pair is stored once in the sources table.
+        """
+        if isinstance(self, type):
+            return MemoryManager().save_research(conversation_id, query, results, sources)
+        
+        sources = [{'url': s} if isinstance(s, str) else s for s in (sources or []) if s]
+        urls = [s['url'] for s in sources if s.get('url')]
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stored, codec = self._encode(cursor, results)
+            cursor.execute("""
+                INSERT INTO research_results (conversation_id, query, results, results_codec, sources)
+                VALUES (?, ?, ?, ?, ?)
+            """, (conversation_id, query, stored, codec, json.dumps(urls) if urls else None))
+            research_id = cursor.lastrowid
+
+            for position, source in enumerate(sources):
+                if not source.get('url'):
+                    continue
+                source_id = self._upsert_source(cursor, source)
+                cursor.execute("""
+                    INSERT OR IGNORE INTO research_sources (research_id, source_id, position)
+                    VALUES (?, ?, ?)
+                """, (research_id, source_id, position))
+
+            conn.commit()
+            logger.info(f"Saved research for conversation {conversation_id} ({len(sources)} sources)")
+            return research_id
+
+    @staticmethod
+    def _upsert_source(cursor: sqlite3.Cursor, source: Dict[str, Any]) -> int:
+        """Store a source once per (url, content hash) and return its id."""
+        content = source.get('content') or ''
+        content_hash = hashlib.sha256(' '.join(content.split()).encode()).hexdigest()
+        cursor.execute("""
+            INSERT OR IGNORE INTO sources (url, content_hash, title, content)
+            VALUES (?, ?, ?, ?)
+        """, (source['url'], content_hash, source.get('title'), content or None))
+        cursor.execute("""
+            SELECT id FROM sources WHERE url = ? AND content_hash = ?
+        """, (source['url'], content_hash))
+        return cursor.fetchone()[0]
+
+    def get_research_sources(self, research_id: int) -> List[Dict]:
+        """Get the sources used by a research run, in the order they were returned."""
+        if isinstance(self, type):
+            return MemoryManager().get_research_sources(research_id)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.id, s.url, s.title, s.content, s.first_seen
+                FROM research_sources rs
+                JOIN sources s ON rs.source_id = s.id
+                WHERE rs.research_id = ?
+                ORDER BY rs.position
+            """, (research_id,))
+
+            return [
+                {'id': r[0], 'url': r[1], 'title': r[2], 'content': r[3], 'first_seen': r[4]}
+                for r in cursor.fetchall()
+            ]
+
+    def get_runs_for_url(self, url: str, limit: int = 20) -> List[Dict]:
+        """Find research runs that used a given URL, newest first."""
+        if isinstance(self, type):
+            return MemoryManager().get_runs_for_url(url, limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT r.id, r.conversation_id, r.query, r.timestamp
+                FROM sources s
+                JOIN research_sources rs ON rs.source_id = s.id
+                JOIN research_results r ON r.id = rs.research_id
+                WHERE s.url = ?
+                ORDER BY r.timestamp DESC
+                LIMIT ?
+            """, (url, limit))
+
+            return [
+                {'research_id': r[0], 'conversation_id': r[1], 'query': r[2], 'timestamp': r[3]}
+                for r in cursor.fetchall()
+            ]
+
+    def get_similar_research(self, query: str, limit: int = 5) -> List[Dict]:
+        """Find similar past research (simple keyword matching)."""
+        if isinstance(self, type):
+            return MemoryManager().get_similar_research(query, limit)
+        
+        if not query or not query.strip():
+            return []
+
+        # Prefer longer keywords, limit overall results
+        keywords = _extract_keywords(query)[:5]
+
+        results: List[Dict] = []
+        seen = set()
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for kw in keywords:
+                cursor.execute("""
+                    SELECT query, results, timestamp, results_codec
+                    FROM research_results
+                    WHERE LOWER(query) LIKE ?
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                """, (f'%{kw}%', limit))
+
+                for row in cursor.fetchall():
+                    key = (row[0], row[2])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    results.append({
+                        'query': row[0],
+                        'results': self._decode(cursor, row[1], row[3]),
+                        'timestamp': row[2]
+                    })
+                    if len(results) >= limit:
+                        break
+
+                if len(results) >= limit:
+                    break
+
+        return results
+
+    def get_reusable_research(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0, limit: int = 3) -> List[Dict]:
+        """Find fresh past research covering the query, best match first.
+
+        Relevance is the fraction of the query's keywords found in the stored
+        query (0..1). Only rows younger than ``max_age_hours`` are considered.
+        """
+        if isinstance(self, type):
+            return MemoryManager().get_reusable_research(query, max_age_hours, min_relevance, limit)
+
+        if not query or not query.strip():
+            return []
+
+        keywords = set(_extract_keywords(query))
+        cutoff = (datetime.utcnow() - timedelta(hours=max_age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+        candidates: Dict[int, Dict] = {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for kw in sorted(keywords, key=len, reverse=True)[:5]:
+                cursor.execute("""
+                    SELECT id, query, results, timestamp, results_codec
+                    FROM research_results
+                    WHERE timestamp >= ?
+                      AND LOWER(query) LIKE ?
+                      AND results NOT LIKE 'Research failed:%'
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                """, (cutoff, f'%{kw}%', limit * 5))
+                for row in cursor.fetchall():
+                    candidates[row[0]] = {
+                        'id': row[0],
+                        'query': row[1],
+                        'results': (row[2], row[4]),
+                        'timestamp': row[3]
+                    }
+
+        scored = []
+        for candidate in candidates.values():
+            relevance = _relevance(keywords, candidate['query'])
+            if relevance >= min_relevance:
+                candidate['relevance'] = round(relevance, 3)
+                scored.append(candidate)
+
+        scored.sort(key=lambda c: (c['relevance'], c['timestamp']), reverse=True)
+
+        # Only decode the rows actually returned. The SQL filter cannot see
+        # into compressed rows, so failures are also dropped after decoding.
+        reusable = []
+        if scored:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for candidate in scored:
+                    candidate['results'] = self._decode(cursor, *candidate['results'])
+                    if candidate['results'].lower().startswith('research failed:'):
+                        continue
+                    reusable.append(candidate)
+                    if len(reusable) >= limit:
+                        break
+        return reusable
+
+    # ============================================
+    # ANALYSIS MEMORY
+    # ============================================
+    
+    def save_analysis(self, conversation_id: int, analysis: str, 
+                     key_insights: List[str] = None):
+        """Save analysis results."""
+        if isinstance(self, type):
+            return MemoryManager().save_analysis(conversation_id, analysis, key_insights)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stored, codec = self._encode(cursor, analysis)
+            cursor.execute("""
+                INSERT INTO analyses (conversation_id, analysis, analysis_codec, key_insights)
+                VALUES (?, ?, ?, ?)
+            """, (conversation_id, stored, codec,
+                  json.dumps(key_insights) if key_insights else None))
+            conn.commit()
+            logger.info(f"Saved analysis for conversation {conversation_id}")
+    
+    def get_past_analyses(self, topic: str, limit: int = 5) -> List[Dict]:
+        """Get past analyses on similar topics."""
+        if isinstance(self, type):
+            return MemoryManager().get_past_analyses(topic, limit)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT a.analysis, a.key_insights, a.timestamp, c.user_query, a.analysis_codec
+                FROM analyses a
+                JOIN conversations c ON a.conversation_id = c.id
+                WHERE LOWER(c.user_query) LIKE ?
+                ORDER BY a.timestamp DESC
+                LIMIT ?
+            """, (f'%{topic.lower()}%', limit))
+            
+            return [
+                {
+                    'analysis': self._decode(cursor, r[0], r[4]),
+                    'key_insights': json.loads(r[1]) if r[1] else [],
+                    'timestamp': r[2],
+                    'original_query': r[3]
+                }
+                for r in cursor.fetchall()
+            ]
+    
+    def get_reusable_analysis(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0) -> Optional[Dict]:
+        """Find the best fresh analysis made for a similar query, or None.
+
+        Relevance is computed as in get_reusable_research, against the query of
+        the conversation the analysis belongs to.
+        """
+        if isinstance(self, type):
+            return MemoryManager().get_reusable_analysis(query, max_age_hours, min_relevance)
+
+        if not query or not query.strip():
+            return None
+
+        keywords = set(_extract_keywords(query))
+        cutoff = (datetime.utcnow() - timedelta(hours=max_age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            matches = {}
+            for kw in sorted(keywords, key=len, reverse=True)[:5]:
+                cursor.execute("""
+                    SELECT a.id, c.user_query, a.timestamp, a.analysis, a.analysis_codec
+                    FROM analyses a
+                    JOIN conversations c ON a.conversation_id = c.id
+                    WHERE a.timestamp >= ?
+                      AND LOWER(c.user_query) LIKE ?
+                      AND a.analysis NOT LIKE 'Analysis failed:%'
+                    ORDER BY a.timestamp DESC
+                    LIMIT 10
+                """, (cutoff, f'%{kw}%'))
+                for row in cursor.fetchall():
+                    relevance = _relevance(keywords, row[1])
+                    if relevance >= min_relevance:
+                        matches[row[0]] = (relevance, row)
+
+            # Best first; compressed failures only show after decoding
+            for relevance, row in sorted(matches.values(), key=lambda m: (m[0], m[1][2]), reverse=True):
+                analysis = self._decode(cursor, row[3], row[4])
+                if analysis.lower().startswith('analysis failed:'):
+                    continue
+                return {
+                    'id': row[0],
+                    'original_query': row[1],
+                    'timestamp': row[2],
+                    'analysis': analysis,
+                    'relevance': round(relevance, 3)
+                }
+            return None
+
+    # ============================================
+    # ARTICLE MEMORY
+    # ============================================
+    
+    def save_article(self, conversation_id: int, article: str, 
+                    quality_score: float = None):
+        """Save generated article."""
+        if isinstance(self, type):
+            return MemoryManager().save_article(conversation_id, article, quality_score)
+        
+        word_count = len(article.split())
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stored, codec = self._encode(cursor, article)
+            cursor.execute("""
+                INSERT INTO articles (conversation_id, article, article_codec, quality_score, word_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, (conversation_id, stored, codec, quality_score, word_count))
+            conn.commit()
+            logger.info(f"Saved article for conversation {conversation_id}")
+    
+    def get_best_articles(self, topic: str = None, limit: int = 10) -> List[Dict]:
+        """Get highest quality articles, optionally filtered by topic."""
+        if isinstance(self, type):
+            return MemoryManager().get_best_articles(topic, limit)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            if topic:
+                cursor.execute("""
+                    SELECT a.article, a.quality_score, a.word_count, 
+                           a.timestamp, c.user_query, a.article_codec
+                    FROM articles a
+                    JOIN conversations c ON a.conversation_id = c.id
+                    WHERE LOWER(c.user_query) LIKE ?
+                    ORDER BY a.quality_score DESC, a.timestamp DESC
+                    LIMIT ?
+                """, (f'%{topic.lower()}%', limit))
+            else:
+                cursor.execute("""
+                    SELECT a.article, a.quality_score, a.word_count, 
+                           a.timestamp, c.user_query, a.article_codec
+                    FROM articles a
+                    JOIN conversations c ON a.conversation_id = c.id
+                    ORDER BY a.quality_score DESC, a.timestamp DESC
+                    LIMIT ?
+                """, (limit,))
+            
+            return [
+                {
+                    'article': self._decode(cursor, r[0], r[5]),
+                    'quality_score': r[1],
+                    'word_count': r[2],
+                    'timestamp': r[3],
+                    'original_query': r[4]
+                }
+                for r in cursor.fetchall()
+            ]
+
+    def get_unscored_articles(self, limit: int = 20, after_id: int = 0) -> List[Dict]:
+        """Get articles without a quality score, oldest first, with ids above ``after_id``."""
+        if isinstance(self, type):
+            return MemoryManager().get_unscored_articles(limit, after_id)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT a.id, a.conversation_id, a.article, a.article_codec, a.word_count, c.user_query
+                FROM articles a INDEXED BY idx_articles_unscored
+                LEFT JOIN conversations c ON a.conversation_id = c.id
+                WHERE a.quality_score IS NULL AND a.id > ?
+                ORDER BY a.id
+                LIMIT ?
+            """, (after_id, limit))
+
+            return [
+                {
+                    'id': r[0],
+                    'conversation_id': r[1],
+                    'article': self._decode(cursor, r[2], r[3]),
+                    'word_count': r[4],
+                    'user_query': r[5]
+                }
+                for r in cursor.fetchall()
+            ]
+
+    def save_quality_scores(self, scores: Dict[int, float]):
+        """Write quality scores for several articles ({article_id: score}) in one transaction."""
+        if isinstance(self, type):
+            return MemoryManager().save_quality_scores(scores)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE articles
+                SET quality_score = ?
+                WHERE id = ?
+            """, [(score, article_id) for article_id, score in scores.items()])
+            conn.commit()
+            logger.info(f"Saved quality scores for {len(scores)} articles")
+
+    # ============================================
+    # LEARNING & IMPROVEMENT
+    # ============================================
+    
+    def save_learning(self, agent_name: str, lesson: str, 
+                     context: str = None, success_pattern: bool = True):
+        """Save a learning for future improvement."""
+        if isinstance(self, type):
+            return MemoryManager().save_learning(agent_name, lesson, context, success_pattern)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO learnings (agent_name, lesson, context, success_pattern)
+                VALUES (?, ?, ?, ?)
+            """, (agent_name, lesson, context, 1 if success_pattern else 0))
+            conn.commit()
+            logger.info(f"Saved learning for {agent_name}")
+    
+    def get_learnings(self, agent_name: str = None, 
+                     success_only: bool = True, limit: int = 20) -> List[Dict]:
+        """Retrieve learnings for an agent."""
+        if isinstance(self, type):
+            return MemoryManager().get_learnings(agent_name, success_only, limit)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            if agent_name:
+                if success_only:
+                    cursor.execute("""
+                        SELECT lesson, context, timestamp
+                        FROM learnings
+                        WHERE agent_name = ? AND success_pattern = 1
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (agent_name, limit))
+                else:
+                    cursor.execute("""
+                        SELECT lesson, context, timestamp, success_pattern
+                        FROM learnings
+                        WHERE agent_name = ?
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (agent_name, limit))
+            else:
+                # return same column order (lesson, context, timestamp) for consistency
+                cursor.execute("""
+                    SELECT lesson, context, timestamp
+                    FROM learnings
+                    WHERE success_pattern = ?
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                """, (1 if success_only else 0, limit))
+            
+            return [
+                {
+                    'lesson': r[0],
+                    'context': r[1] if len(r) > 1 else None,
+                    'timestamp': r[2] if len(r) > 2 else None,
+                    'success_pattern': r[3] if len(r) > 3 else None
+                }
+                for r in cursor.fetchall()
+            ]
+    
+    # ============================================
+    # QUERY CACHING
+    # ============================================
+    
+    def get_cached_result(self, query: str) -> Optional[str]:
+        """Check if we have a cached result for this query, however old (see lookup_cache for TTLs)."""
+        if isinstance(self, type):
+            return MemoryManager().get_cached_result(query)
+        
+        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT result, result_codec FROM query_cache WHERE query_hash = ?
+            """, (query_hash,))
+            
+            result = cursor.fetchone()
+            if result:
+                # Update hit count and last accessed
+                cursor.execute("""
+                    UPDATE query_cache 
+                    SET hit_count = hit_count + 1, 
+                        last_accessed = CURRENT_TIMESTAMP
+                    WHERE query_hash = ?
+                """, (query_hash,))
+                conn.commit()
+                logger.info(f"Cache hit for query: {query[:50]}...")
+                return self._decode(cursor, result[0], result[1])
+            
+            return None
+    
+    def cache_result(self, query: str, result: str, soft_ttl_hours: float = None, hard_ttl_hours: float = None):
+        """Cache a result for future use.
+
+        The TTLs (hours) are kept with the entry; None leaves them to the
+        defaults given to ``lookup_cache``. Writing an entry ends any refresh
+        claimed on it.
+        """
+        if isinstance(self, type):
+            return MemoryManager().cache_result(query, result, soft_ttl_hours, hard_ttl_hours)
+        
+        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stored, codec = self._encode(cursor, result)
+            # Upsert: insert new or update existing result + last_accessed
+            cursor.execute("""
+                INSERT INTO query_cache (query_hash, query, result, result_codec, hit_count, last_accessed, created_at,
+                                         soft_ttl_hours, hard_ttl_hours)
+                VALUES (?, ?, ?, ?, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?)
+                ON CONFLICT(query_hash) DO UPDATE SET
+                    result = excluded.result,
+                    result_codec = excluded.result_codec,
+                    last_accessed = CURRENT_TIMESTAMP,
+                    created_at = CURRENT_TIMESTAMP,
+                    soft_ttl_hours = excluded.soft_ttl_hours,
+                    hard_ttl_hours = excluded.hard_ttl_hours,
+                    refresh_started_at = NULL
+            """, (query_hash, query, stored, codec, soft_ttl_hours, hard_ttl_hours))
+            conn.commit()
+            logger.info(f"Cached result for query: {query[:50]}...")
+    
+    def get_cache_entry(self, query: str) -> Optional[Dict]:
+        """Age and hit count of a query's cache entry, without counting as a hit (None if not cached)."""
+        if isinstance(self, type):
+            return MemoryManager().get_cache_entry(query)
+
+        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT created_at, last_accessed, hit_count,
+                       (julianday('now') - julianday(created_at)) * 24
+                FROM query_cache WHERE query_hash = ?
+            """, (query_hash,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {'created_at': row[0], 'last_accessed': row[1], 'hit_count': row[2], 'age_hours': row[3]}
+
+    def lookup_cache(self, query: str, soft_ttl_hours: float = None, hard_ttl_hours: float = None) -> Optional[Dict]:
+        """A query's cache entry with its freshness, or None if not cached.
+
+        Returns ``result``, ``age_hours`` and ``freshness``: 'fresh', 'stale'
+        (past the soft TTL; still served while it is refreshed) or 'expired'
+        (past the hard TTL; ``result`` is None and no hit is counted). The
+        entry's own TTLs take precedence over the defaults given here.
+        """
+        if isinstance(self, type):
+            return MemoryManager().lookup_cache(query, soft_ttl_hours, hard_ttl_hours)
+
+        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT result, result_codec, (julianday('now') - julianday(created_at)) * 24,
+                       COALESCE(soft_ttl_hours, ?), COALESCE(hard_ttl_hours, ?)
+                FROM query_cache WHERE query_hash = ?
+            """, (soft_ttl_hours, hard_ttl_hours, query_hash))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            freshness = _cache_freshness(row[2], row[3], row[4])
+            if freshness == 'expired':
+                return {'result': None, 'age_hours': row[2], 'freshness': freshness}
+            cursor.execute("""
+                UPDATE query_cache
+                SET hit_count = hit_count + 1,
+                    last_accessed = CURRENT_TIMESTAMP
+                WHERE query_hash = ?
+            """, (query_hash,))
+            conn.commit()
+            logger.info(f"Cache hit ({freshness}) for query: {query[:50]}...")
+            return {'result': self._decode(cursor, row[0], row[1]), 'age_hours': row[2], 'freshness': freshness}
+
+    def claim_cache_refresh(self, query: str, lease_seconds: float = 600) -> bool:
+        """Claim the background refresh of a cached query; False while another claim is younger than the lease.
+
+        The claim ends when the entry is rewritten (``cache_result``) or the
+        lease runs out, so a refresh that died is retried by a later reader.
+        """
+        if isinstance(self, type):
+            return MemoryManager().claim_cache_refresh(query, lease_seconds)
+
+        query_hash = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+        cutoff = (datetime.utcnow() - timedelta(seconds=lease_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            # One conditional write, so concurrent readers in other processes cannot both win
+            cursor.execute("""
+                UPDATE query_cache
+                SET refresh_started_at = CURRENT_TIMESTAMP
+                WHERE query_hash = ? AND (refresh_started_at IS NULL OR refresh_started_at < ?)
+            """, (query_hash, cutoff))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def get_query_demand(self, days: float = 7, recent_hours: float = 24) -> List[Dict]:
+        """Requests per query (lowercased and trimmed, as cache keys are) by users over the last ``days``.
+
+        Counts all requests, those in the last ``recent_hours``, cache hits
+        (conversations that ran no agent) and misses. Requests with user
+        provided data are left out: their answers depend on the data.
+        """
+        if isinstance(self, type):
+            return MemoryManager().get_query_demand(days, recent_hours)
+
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        recent_since = (datetime.utcnow() - timedelta(hours=recent_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT LOWER(TRIM(user_query)), MIN(user_query), COUNT(*),
+                       SUM(timestamp >= ?), SUM(agents_used = '[]'),
+                       SUM(agents_used IS NOT NULL AND agents_used != '[]')
+                FROM conversations
+                WHERE timestamp >= ? AND user_provided_data IS NULL AND origin IS NULL
+                GROUP BY LOWER(TRIM(user_query))
+            """, (recent_since, since))
+            return [
+                {
+                    'query': r[1],
+                    'cache_key': r[0],
+                    'requests': r[2],
+                    'recent_requests': r[3] or 0,
+                    'hits': r[4] or 0,
+                    'misses': r[5] or 0,
+                }
+                for r in cursor.fetchall()
+            ]
+
+    def get_agent_failure_rates(self, limit: int = 100) -> Dict[str, float]:
+        """Failure rate per agent over its ``limit`` most recent learnings."""
+        if isinstance(self, type):
+            return MemoryManager().get_agent_failure_rates(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT agent_name, AVG(success_pattern = 0)
+                FROM (
+                    SELECT agent_name, success_pattern,
+                           ROW_NUMBER() OVER (PARTITION BY agent_name ORDER BY timestamp DESC) AS n
+                    FROM learnings
+                )
+                WHERE n <= ?
+                GROUP BY agent_name
+            """, (limit,))
+            return {r[0]: r[1] for r in cursor.fetchall()}
+
+    # ============================================
+    # NODE LATENCIES
+    # ============================================
+
+    def record_node_latency(self, node: str, duration_seconds: float, conversation_id: int = None,
+                            task_type: str = None, success: bool = True):
+        """Record how long an orchestrator node took."""
+        if isinstance(self, type):
+            return MemoryManager().record_node_latency(node, duration_seconds, conversation_id, task_type, success)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO node_latencies (conversation_id, node, task_type, duration_seconds, success)
+                VALUES (?, ?, ?, ?, ?)
+            """, (conversation_id, node, task_type, duration_seconds, 1 if success else 0))
+            conn.commit()
+
+    def get_latency_estimate(self, node: str, percentile: float = 0.75, limit: int = 50) -> Optional[float]:
+        """Estimate a node's duration from its recent successful runs (None without history)."""
+        if isinstance(self, type):
+            return MemoryManager().get_latency_estimate(node, percentile, limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT duration_seconds FROM node_latencies
+                WHERE node = ? AND success = 1
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """, (node, limit))
+            durations = sorted(r[0] for r in cursor.fetchall())
+            if not durations:
+                return None
+            return durations[min(int(len(durations) * percentile), len(durations) - 1)]
+
+    def save_run_profile(self, conversation_id: Optional[int], wall_seconds: float, cpu_seconds: float = None,
+                         breakdown: Dict = None, hotspots: List[Dict] = None, profile: bytes = None):
+        """Store the profile of one orchestrator run (``profile`` is zlib-compressed pstats data)."""
+        if isinstance(self, type):
+            return MemoryManager().save_run_profile(conversation_id, wall_seconds, cpu_seconds, breakdown,
+                                                    hotspots, profile)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO run_profiles (conversation_id, wall_seconds, cpu_seconds, breakdown, hotspots, profile)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (conversation_id, wall_seconds, cpu_seconds, json.dumps(breakdown or {}),
+                  json.dumps(hotspots or []), profile))
+            conn.commit()
+            logger.info(f"Saved run profile for conversation {conversation_id} ({wall_seconds:.1f}s)")
+
+    def get_slowest_runs(self, limit: int = 10, conversation_id: int = None) -> List[Dict]:
+        """Profiled runs (optionally of one conversation), slowest first, with their breakdown and hotspots."""
+        if isinstance(self, type):
+            return MemoryManager().get_slowest_runs(limit, conversation_id)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            where = "WHERE p.conversation_id = ?" if conversation_id is not None else ""
+            params = (conversation_id, limit) if conversation_id is not None else (limit,)
+            cursor.execute(f"""
+                SELECT p.conversation_id, p.wall_seconds, p.cpu_seconds, p.breakdown, p.hotspots, p.timestamp,
+                       c.user_query
+                FROM run_profiles p LEFT JOIN conversations c ON p.conversation_id = c.id
+                {where}
+                ORDER BY p.wall_seconds DESC
+                LIMIT ?
+            """, params)
+            return [
+                {
+                    'conversation_id': row[0],
+                    'wall_seconds': row[1],
+                    'cpu_seconds': row[2],
+                    'breakdown': json.loads(row[3]) if row[3] else {},
+                    'hotspots': json.loads(row[4]) if row[4] else [],
+                    'timestamp': row[5],
+                    'user_query': row[6],
+                }
+                for row in cursor.fetchall()
+            ]
+
+    def get_run_profile(self, conversation_id: int) -> Optional[bytes]:
+        """The compressed pstats data of a conversation's latest profiled run."""
+        if isinstance(self, type):
+            return MemoryManager().get_run_profile(conversation_id)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT profile FROM run_profiles
+                WHERE conversation_id = ?
+                ORDER BY id DESC
+                LIMIT 1
+            """, (conversation_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def get_plan_history(self, task_type: str = None, limit: int = 1000) -> List[Dict]:
+        """Finished conversations with the agents they ran, total latency and article quality.
+
+        Oldest first. Conversations that ran no agent (cache hits) are skipped.
+        ``degraded`` and ``reused_research`` mark runs that did not do the work their plan describes.
+        """
+        if isinstance(self, type):
+            return MemoryManager().get_plan_history(task_type, limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            task_filter, params = ("AND c.task_type = ?", (task_type,)) if task_type else ("", ())
+            cursor.execute(f"""
+                SELECT c.id, c.task_type, c.agents_used, c.success, c.timestamp, c.degradation,
+                       c.reused_research_id,
+                       (SELECT SUM(n.duration_seconds) FROM node_latencies n WHERE n.conversation_id = c.id),
+                       (SELECT MAX(a.quality_score) FROM articles a WHERE a.conversation_id = c.id)
+                FROM conversations c
+                WHERE c.task_type IS NOT NULL
+                  AND c.agents_used IS NOT NULL AND c.agents_used != '[]' {task_filter}
+                ORDER BY c.timestamp DESC, c.id DESC
+                LIMIT ?
+            """, (*params, limit))
+            return [
+                {
+                    'conversation_id': r[0],
+                    'task_type': r[1],
+                    'agents_used': json.loads(r[2]),
+                    'success': bool(r[3]),
+                    'timestamp': r[4],
+                    'degraded': bool(r[5]),
+                    'reused_research': r[6] is not None,
+                    'latency_seconds': r[7],
+                    'quality_score': r[8]
+                }
+                for r in reversed(cursor.fetchall())
+            ]
+
+    # ============================================
+    # STATISTICS & ANALYTICS
+    # ============================================
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get overall system statistics (read from trigger-maintained counters)."""
+        if isinstance(self, type):
+            return MemoryManager().get_statistics()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            counters = stats_schema.read_counters(cursor)
+            
+            stats = {
+                name: int(counters.get(name, 0))
+                for name in ('total_conversations', 'successful_conversations', 'total_research_queries',
+                             'total_analyses', 'total_articles', 'cached_queries', 'total_cache_hits')
+            }
+            
+            # Average article quality
+            quality_count = counters.get('article_quality_count', 0)
+            stats['average_article_quality'] = (
+                round(counters['article_quality_sum'] / quality_count, 2) if quality_count else None
+            )
+            
+            # Most common task types
+            cursor.execute("""
+                SELECT task_type, count
+                FROM stats_task_types
+                WHERE count > 0
+                ORDER BY count DESC 
+                LIMIT 5
+            """)
+            stats['top_task_types'] = dict(cursor.fetchall())
+            
+            return stats
+
+    def get_rollups(self, granularity: str = 'hour', limit: int = 24) -> List[Dict]:
+        """Get runs, successes and cache hits per hour or day, newest bucket first."""
+        if isinstance(self, type):
+            return MemoryManager().get_rollups(granularity, limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            return stats_schema.read_rollups(conn.cursor(), granularity, limit)
+
+    def rebuild_statistics(self):
+        """Recompute statistics counters and rollups from the base tables."""
+        if isinstance(self, type):
+            return MemoryManager().rebuild_statistics()
+
+        with sqlite3.connect(self.db_path) as conn:
+            stats_schema.rebuild(conn.cursor())
+            conn.commit()
+            logger.info("Rebuilt statistics")
+    
+    def clear_old_cache(self, days: int = 30):
+        """Clear cache entries older than specified days."""
+        if isinstance(self, type):
+            return MemoryManager().clear_old_cache(days)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute("""
+                DELETE FROM query_cache 
+                WHERE last_accessed < ?
+            """, (cutoff,))
+            deleted = cursor.rowcount
+            conn.commit()
+            logger.info(f"Cleared {deleted} old cache entries")
+            return deleted
+
+    def prune_conversations(self, max_conversations: int = None, max_age_days: float = None) -> int:
+        """Delete conversations beyond the newest ``max_conversations`` or older than ``max_age_days``.
+
+        Their research, analyses, articles, latencies and profiles go with them,
+        as do sources no remaining research refers to. Returns the number of
+        conversations deleted.
+        """
+        if isinstance(self, type):
+            return MemoryManager().prune_conversations(max_conversations, max_age_days)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS pruned (id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM pruned")
+            if max_conversations is not None:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO pruned (id)
+                    SELECT id FROM conversations ORDER BY id DESC LIMIT -1 OFFSET ?
+                """, (max_conversations,))
+            if max_age_days is not None:
+                cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute("""
+                    INSERT OR IGNORE INTO pruned (id)
+                    SELECT id FROM conversations WHERE timestamp < ?
+                """, (cutoff,))
+            cursor.execute("SELECT COUNT(*) FROM pruned")
+            deleted = cursor.fetchone()[0]
+            if not deleted:
+                return 0
+
+            cursor.execute("""
+                DELETE FROM research_sources WHERE research_id IN (
+                    SELECT id FROM research_results WHERE conversation_id IN (SELECT id FROM pruned)
+                )
+            """)
+            for table in ('research_results', 'analyses', 'articles', 'node_latencies', 'run_profiles'):
+                cursor.execute(f"DELETE FROM {table} WHERE conversation_id IN (SELECT id FROM pruned)")
+            cursor.execute("DELETE FROM conversations WHERE id IN (SELECT id FROM pruned)")
+            cursor.execute("""
+                DELETE FROM sources
+                WHERE NOT EXISTS (SELECT 1 FROM research_sources rs WHERE rs.source_id = sources.id)
+            """)
+            conn.commit()
+            logger.info(f"Pruned {deleted} conversations")
+            return deleted
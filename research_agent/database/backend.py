@@ -0,0 +1,85 @@
+"""The memory store interface used by the orchestrator and its tools.
+
+``MemoryManager`` (SQLite) and ``InMemoryBackend`` (plain dicts, nothing on
+disk; for tests and benchmarks) both implement ``MemoryBackend``. Pick one
+with MEMORY_BACKEND. Both are checked against the shared behaviour in
+tests/test_memory_backends.py.
+"""
+from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+
+from .agent_memory import MemoryManager
+from .in_memory import InMemoryBackend
+
+BACKENDS = ('sqlite', 'memory')
+
+
+@runtime_checkable
+class MemoryBackend(Protocol):
+    # Conversations
+    def start_conversation(self, user_query: str, task_type: str = None, user_provided_data: str = None,
+                           origin: str = None) -> int: ...
+    def end_conversation(self, conversation_id: int, agents_used: List[str], success: bool = True): ...
+    def set_task_type(self, conversation_id: int, task_type: str): ...
+    def record_degradation(self, conversation_id: int, decision: str): ...
+    def record_research_reuse(self, conversation_id: int, research_id: int): ...
+    def prune_conversations(self, max_conversations: int = None, max_age_days: float = None) -> int: ...
+
+    # Research
+    def save_research(self, conversation_id: int, query: str, results: str, sources: List[Any] = None) -> int: ...
+    def get_research_sources(self, research_id: int) -> List[Dict]: ...
+    def get_runs_for_url(self, url: str, limit: int = 20) -> List[Dict]: ...
+    def get_similar_research(self, query: str, limit: int = 5) -> List[Dict]: ...
+    def get_reusable_research(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0, limit: int = 3) -> List[Dict]: ...
+
+    # Analyses
+    def save_analysis(self, conversation_id: int, analysis: str, key_insights: List[str] = None): ...
+    def get_past_analyses(self, topic: str, limit: int = 5) -> List[Dict]: ...
+    def get_reusable_analysis(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0) -> Optional[Dict]: ...
+
+    # Articles
+    def save_article(self, conversation_id: int, article: str, quality_score: float = None): ...
+    def get_best_articles(self, topic: str = None, limit: int = 10) -> List[Dict]: ...
+    def get_unscored_articles(self, limit: int = 20, after_id: int = 0) -> List[Dict]: ...
+    def save_quality_scores(self, scores: Dict[int, float]): ...
+
+    # Learnings
+    def save_learning(self, agent_name: str, lesson: str, context: str = None, success_pattern: bool = True): ...
+    def get_learnings(self, agent_name: str = None, success_only: bool = True, limit: int = 20) -> List[Dict]: ...
+    def get_agent_failure_rates(self, limit: int = 100) -> Dict[str, float]: ...
+
+    # Query cache
+    def get_cached_result(self, query: str) -> Optional[str]: ...
+    def cache_result(self, query: str, result: str, soft_ttl_hours: float = None,
+                     hard_ttl_hours: float = None): ...
+    def lookup_cache(self, query: str, soft_ttl_hours: float = None,
+                     hard_ttl_hours: float = None) -> Optional[Dict]: ...
+    def claim_cache_refresh(self, query: str, lease_seconds: float = 600) -> bool: ...
+    def get_cache_entry(self, query: str) -> Optional[Dict]: ...
+    def get_query_demand(self, days: float = 7, recent_hours: float = 24) -> List[Dict]: ...
+    def clear_old_cache(self, days: int = 30): ...
+
+    # Latencies and profiles
+    def record_node_latency(self, node: str, duration_seconds: float, conversation_id: int = None,
+                            task_type: str = None, success: bool = True): ...
+    def get_latency_estimate(self, node: str, percentile: float = 0.75, limit: int = 50) -> Optional[float]: ...
+    def save_run_profile(self, conversation_id: Optional[int], wall_seconds: float, cpu_seconds: float = None,
+                         breakdown: Dict = None, hotspots: List[Dict] = None, profile: bytes = None): ...
+    def get_slowest_runs(self, limit: int = 10, conversation_id: int = None) -> List[Dict]: ...
+    def get_run_profile(self, conversation_id: int) -> Optional[bytes]: ...
+    def get_plan_history(self, task_type: str = None, limit: int = 1000) -> List[Dict]: ...
+
+    # Statistics
+    def get_statistics(self) -> Dict[str, Any]: ...
+    def get_rollups(self, granularity: str = 'hour', limit: int = 24) -> List[Dict]: ...
+    def rebuild_statistics(self): ...
+
+
+def create_backend(kind: str = 'sqlite', db_path: str = 'memory/agent_memory.db', **sqlite_options) -> MemoryBackend:
+    """Build a memory backend; ``sqlite_options`` (e.g. compression) only apply to SQLite."""
+    if kind == 'sqlite':
+        return MemoryManager(db_path, **sqlite_options)
+    if kind == 'memory':
+        return InMemoryBackend()
+    raise ValueError(f"memory backend must be one of {BACKENDS}")
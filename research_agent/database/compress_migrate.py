@@ -0,0 +1,122 @@
+"""Recompress the large text columns of the memory DB in place.
+
+Run from the research_agent directory:
+
+    python -m database.compress_migrate --codec zlib --train   # train a dictionary, compress
+    python -m database.compress_migrate --codec lzma
+    python -m database.compress_migrate --codec off            # back to plain text
+
+Rows are rewritten in small batches, each in its own transaction, so the
+database stays usable while the migration runs and can be resumed.
+"""
+import argparse
+import logging
+import sqlite3
+from typing import Tuple
+
+from . import compression
+from .agent_memory import MemoryManager
+from .compression import COMPRESSED_COLUMNS
+
+logger = logging.getLogger("compress_migrate")
+
+
+def train(manager: MemoryManager, samples_per_table: int = 200) -> int:
+    """Train a dictionary on the most recent rows and make it the active one."""
+    samples = []
+    with sqlite3.connect(manager.db_path) as conn:
+        cursor = conn.cursor()
+        for table, column in COMPRESSED_COLUMNS.items():
+            cursor.execute(f"""
+                SELECT {column}, {column}_codec FROM {table}
+                ORDER BY id DESC
+                LIMIT ?
+            """, (samples_per_table,))
+            samples.extend(manager._decode(cursor, value, codec) for value, codec in cursor.fetchall())
+
+    dictionary = compression.train_dictionary(s for s in samples if s)
+    return manager.save_compression_dictionary(dictionary, sample_count=len(samples))
+
+
+def migrate_table(manager: MemoryManager, table: str, column: str,
+                  batch_size: int = 500) -> Tuple[int, int, int]:
+    """Re-encode one column with the manager's codec.
+
+    Returns (rows rewritten, stored bytes before, stored bytes after).
+    """
+    codec_column = f"{column}_codec"
+    last_id = 0
+    rewritten = bytes_before = bytes_after = 0
+
+    with sqlite3.connect(manager.db_path) as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(f"""
+                SELECT id, {column}, {codec_column} FROM {table}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, value, codec in rows:
+                text = manager._decode(cursor, value, codec)
+                stored, new_codec = manager._encode(cursor, text)
+                # The codec flag (including dictionary id) fully identifies the encoding
+                if new_codec == codec:
+                    continue
+                updates.append((stored, new_codec, row_id))
+                bytes_before += len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+                bytes_after += len(stored) if isinstance(stored, bytes) else len(stored.encode('utf-8'))
+
+            if updates:
+                cursor.executemany(f"""
+                    UPDATE {table} SET {column} = ?, {codec_column} = ? WHERE id = ?
+                """, updates)
+            conn.commit()
+            rewritten += len(updates)
+            last_id = rows[-1][0]
+            logger.info(f"{table}: rewrote {rewritten} rows (up to id {last_id})")
+
+    return rewritten, bytes_before, bytes_after
+
+
+def main(argv=None):
+    from settings.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Recompress large text columns of the memory DB")
+    parser.add_argument("--db", default="memory/agent_memory.db", help="Path to the SQLite database")
+    parser.add_argument("--codec", choices=compression.CODECS, required=True,
+                        help="Target codec ('off' stores plain text)")
+    parser.add_argument("--min-bytes", type=int, default=1024,
+                        help="Values smaller than this stay uncompressed")
+    parser.add_argument("--train", action="store_true",
+                        help="Train a new zlib dictionary from existing rows first")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    manager = MemoryManager(args.db, compression_codec=args.codec, compression_min_bytes=args.min_bytes)
+
+    if args.train:
+        if args.codec != compression.ZLIB:
+            parser.error("--train only applies to --codec zlib")
+        dictionary_id = train(manager)
+        print(f"Trained compression dictionary {dictionary_id}")
+
+    for table, column in COMPRESSED_COLUMNS.items():
+        rewritten, before, after = migrate_table(manager, table, column, args.batch_size)
+        print(f"{table}.{column}: {rewritten} rows rewritten, {before} -> {after} bytes")
+
+    if args.vacuum:
+        with sqlite3.connect(args.db) as conn:
+            conn.execute("VACUUM")
+        print("Vacuumed database")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import lzma
+import re
+import zlib
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+# Codec names stored in the per-row ``*_codec`` columns. NULL means plain text.
+ZLIB = 'zlib'
+LZMA = 'lzma'
+# zlib with a preset dictionary: stored as 'zlib-dict:<dictionary id>'
+ZLIB_DICT_PREFIX = 'zlib-dict:'
+
+CODECS = ('off', ZLIB, LZMA)
+
+# Large text columns that may be stored compressed, flagged per row in <column>_codec
+COMPRESSED_COLUMNS = {
+    'research_results': 'results',
+    'analyses': 'analysis',
+    'articles': 'article',
+    'query_cache': 'result',
+}
+
+# zlib only looks back 32KB, so a larger preset dictionary is wasted
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+# Structure our agents emit on every run (research_tool dumps, analyzer and
+# writer headings). Used to seed dictionaries before any data is stored.
+SEED_PHRASES = [
+    "Title: ", "\nContent: ", "\nURL: https://", "\n---\n", "https://www.",
+    "## 1. EXECUTIVE SUMMARY\n", "## 2. KEY FINDINGS\n", "## 3. DETAILED THEMATIC ANALYSIS\n",
+    "## 4. CRITICAL DATA POINTS & STATISTICS\n", "## 5. STAKEHOLDER ANALYSIS\n",
+    "## 6. TRENDS & PATTERNS\n", "## 8. CHALLENGES & LIMITATIONS\n",
+    "## 9. FUTURE OUTLOOK & PREDICTIONS\n", "## 11. REAL-WORLD EXAMPLES & CASE STUDIES\n",
+    "## 12. GAPS & UNKNOWNS\n", "## 13. NARRATIVE STRUCTURE RECOMMENDATION\n",
+    "**Finding ", "**Market Size & Growth:**", "**Adoption Metrics:**", "**Example ",
+    "**Short-term (6-12 months):**", "**Medium-term (1-3 years):**", "**Long-term (3+ years):**",
+    "## Introduction\n", "## Conclusion\n", "## Key Takeaways\n",
+    " according to ", " percent ", " of the ", " in the ", " and the ",
+]
+
+
+def train_dictionary(samples: Iterable[str], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """Build a zlib preset dictionary from sample column values.
+
+    Lines and word 4-grams that recur across samples are packed into the
+    dictionary, most frequent last (zlib encodes nearer matches more cheaply).
+    """
+    size = min(size, MAX_DICTIONARY_SIZE)
+    counts: Counter = Counter()
+    for sample in samples:
+        seen = set()
+        for line in sample.splitlines():
+            line = line.strip()
+            if 8 <= len(line) <= 200:
+                seen.add(line + "\n")
+        words = re.findall(r'\S+', sample)
+        for i in range(len(words) - 3):
+            seen.add(' '.join(words[i:i + 4]) + ' ')
+        # count document frequency, not raw frequency
+        counts.update(seen)
+
+    pieces = [p for p, c in counts.most_common() if c > 1]
+    pieces += [p for p in SEED_PHRASES if p not in counts]
+
+    chosen = []
+    used = 0
+    for piece in pieces:
+        encoded = piece.encode()
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+
+    # most frequent at the end of the dictionary
+    return b''.join(reversed(chosen))
+
+
+def compress(text: str, codec: str, zdict: Optional[bytes] = None) -> bytes:
+    """Compress text with a codec; zdict is only used for zlib."""
+    data = text.encode('utf-8')
+    if codec == LZMA:
+        return lzma.compress(data, preset=6)
+    if zdict:
+        compressor = zlib.compressobj(level=9, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level=9)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(value, codec: Optional[str], zdict: Optional[bytes] = None) -> Optional[str]:
+    """Decode a stored column value according to its row codec flag."""
+    if value is None or not codec:
+        return value
+    if codec == LZMA:
+        return lzma.decompress(value).decode('utf-8')
+    if codec.startswith(ZLIB_DICT_PREFIX):
+        decompressor = zlib.decompressobj(zdict=zdict)
+        return (decompressor.decompress(value) + decompressor.flush()).decode('utf-8')
+    if codec == ZLIB:
+        return zlib.decompress(value).decode('utf-8')
+    raise ValueError(f"Unknown column codec: {codec}")
+
+
+def dictionary_id(codec: Optional[str]) -> Optional[int]:
+    """Return the dictionary id referenced by a codec flag, if any."""
+    if codec and codec.startswith(ZLIB_DICT_PREFIX):
+        return int(codec[len(ZLIB_DICT_PREFIX):])
+    return None
+
+
+def encode(text: str, codec: str, min_bytes: int, zdict: Optional[bytes] = None,
+           zdict_id: Optional[int] = None) -> Tuple[object, Optional[str]]:
+    """Return (stored value, codec flag) for a text value.
+
+    Short values, and values that would not shrink, are stored as plain text.
+    """
+    if text is None or codec in (None, 'off') or len(text.encode('utf-8')) < min_bytes:
+        return text, None
+    use_dict = codec == ZLIB and zdict is not None
+    packed = compress(text, codec, zdict if use_dict else None)
+    if len(packed) >= len(text.encode('utf-8')):
+        return text, None
+    flag = f"{ZLIB_DICT_PREFIX}{zdict_id}" if use_dict else codec
+    return packed, flag
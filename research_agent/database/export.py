@@ -0,0 +1,279 @@
+"""Export memory DB tables for analysis without copying the live database.
+
+Run from the research_agent directory:
+
+    python -m database.export --out exports                        # every row, JSONL
+    python -m database.export --out exports --incremental          # rows since the last export
+    python -m database.export --out exports --format parquet --tables articles conversations
+    python -m database.export --out exports --since-id 500 --since-timestamp "2025-06-01 00:00:00"
+
+All tables are read inside one read transaction on a read-only connection,
+so an export is a consistent snapshot. With the WAL journal (enabled by the
+job queue) it does not hold up writers; with the default rollback journal,
+writers wait while it runs. Rows are fetched and written in chunks of
+``--chunk-size``, so memory use does not grow with table size. Compressed
+columns are exported as plain text.
+
+Incremental exports keep per-table watermarks (highest id, and for tables
+whose rows change after insert, the highest change timestamp) in
+``<out>/watermarks.json``, written after every table has been exported.
+Only the change timestamp catches updated rows: later quality scores or
+conversation outcomes on rows already exported need a full export.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import compression
+from .compression import COMPRESSED_COLUMNS
+
+logger = logging.getLogger("export")
+
+# Exported tables and the column that changes when a row is updated (None: rows never change)
+EXPORT_TABLES = {
+    'conversations': None,
+    'research_results': None,
+    'analyses': None,
+    'articles': None,
+    'learnings': None,
+    'query_cache': 'last_accessed',
+}
+# Creation timestamp column per table, used for --since-timestamp on tables without a change column
+CREATED_COLUMNS = {'query_cache': 'created_at'}
+
+FORMATS = ('jsonl', 'jsonl.gz', 'parquet')
+WATERMARK_FILE = 'watermarks.json'
+
+
+def open_snapshot(db_path: str) -> sqlite3.Connection:
+    """Read-only connection with an open read transaction; every query sees the same snapshot."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, isolation_level=None)
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode.lower() != 'wal':
+        logger.warning(f"Database uses the {journal_mode} journal: writers wait until the export finishes")
+    conn.execute("BEGIN")
+    # The snapshot is taken at the first read, not at BEGIN
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    return conn
+
+
+class _Decoder:
+    """Decodes compressed column values, loading dictionaries from the snapshot."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._dictionaries: Dict[int, bytes] = {}
+
+    def __call__(self, value, codec: Optional[str]) -> Optional[str]:
+        dictionary_id = compression.dictionary_id(codec)
+        zdict = None
+        if dictionary_id:
+            if dictionary_id not in self._dictionaries:
+                row = self.conn.execute(
+                    "SELECT dictionary FROM compression_dictionaries WHERE id = ?", (dictionary_id,)
+                ).fetchone()
+                self._dictionaries[dictionary_id] = row[0] if row else None
+            zdict = self._dictionaries[dictionary_id]
+        return compression.decompress(value, codec, zdict)
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[Tuple[str, str]]:
+    """(name, declared type) of the columns exported for a table; codec flags are left out."""
+    columns = [(row[1], (row[2] or '').upper()) for row in conn.execute(f"PRAGMA table_info({table})")]
+    return [(name, declared) for name, declared in columns if not name.endswith('_codec')]
+
+
+def _timestamp_column(table: str) -> str:
+    return EXPORT_TABLES[table] or CREATED_COLUMNS.get(table, 'timestamp')
+
+
+def iter_chunks(conn: sqlite3.Connection, table: str, since_id: int = 0, since_timestamp: str = None,
+                chunk_size: int = 1000) -> Iterator[List[Dict]]:
+    """Yield rows newer than the watermark in id order, ``chunk_size`` at a time.
+
+    A row is new when its id is above ``since_id`` or, if ``since_timestamp``
+    is given, its change (or creation) timestamp is after it.
+    """
+    names = [name for name, _ in table_columns(conn, table)]
+    all_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    compressed = COMPRESSED_COLUMNS.get(table)
+    codec_column = f"{compressed}_codec" if compressed and f"{compressed}_codec" in all_columns else None
+    select = ', '.join(names + ([codec_column] if codec_column else []))
+    decode = _Decoder(conn)
+
+    if since_timestamp:
+        where = f"(id > ? OR {_timestamp_column(table)} > ?)"
+        params = (since_id, since_timestamp)
+    else:
+        where = "id > ?"
+        params = (since_id,)
+
+    cursor_id = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT {select} FROM {table}
+            WHERE {where} AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, params + (cursor_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        chunk = []
+        for row in rows:
+            record = dict(zip(names, row))
+            if codec_column:
+                record[compressed] = decode(record[compressed], row[-1])
+            chunk.append(record)
+        yield chunk
+        cursor_id = rows[-1][names.index('id')]
+
+
+class JsonlWriter:
+    def __init__(self, path: str, columns: List[Tuple[str, str]], gzipped: bool = False):
+        self._file = (gzip.open if gzipped else open)(path, 'wt', encoding='utf-8')
+
+    def write(self, chunk: List[Dict]):
+        for record in chunk:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+def _json_default(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ParquetWriter:
+    """Writes each chunk as a row group; the schema comes from the declared SQLite types."""
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]]):
+        # Optional dependency, only needed for parquet exports
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def arrow_type(declared: str):
+            if 'INT' in declared:
+                return pa.int64()
+            if any(t in declared for t in ('REAL', 'FLOA', 'DOUB')):
+                return pa.float64()
+            if 'BLOB' in declared:
+                return pa.binary()
+            return pa.string()
+
+        self._pa = pa
+        self._schema = pa.schema([(name, arrow_type(declared)) for name, declared in columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+
+    def write(self, chunk: List[Dict]):
+        self._writer.write_table(self._pa.Table.from_pylist(chunk, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def export_table(conn: sqlite3.Connection, table: str, path: str, fmt: str, since_id: int = 0,
+                 since_timestamp: str = None, chunk_size: int = 1000) -> int:
+    """Write the table's rows past the watermark to ``path``; returns the number of rows."""
+    columns = table_columns(conn, table)
+    if fmt == 'parquet':
+        writer = ParquetWriter(f"{path}.tmp", columns)
+    else:
+        writer = JsonlWriter(f"{path}.tmp", columns, gzipped=fmt == 'jsonl.gz')
+    exported = 0
+    try:
+        for chunk in iter_chunks(conn, table, since_id, since_timestamp, chunk_size):
+            writer.write(chunk)
+            exported += len(chunk)
+    finally:
+        writer.close()
+    if exported:
+        os.replace(f"{path}.tmp", path)
+    else:
+        os.remove(f"{path}.tmp")
+    return exported
+
+
+def table_watermark(conn: sqlite3.Connection, table: str) -> Dict:
+    """Highest id and change timestamp of a table in the snapshot."""
+    column = _timestamp_column(table)
+    max_id, max_timestamp = conn.execute(f"SELECT MAX(id), MAX({column}) FROM {table}").fetchone()
+    return {'id': max_id or 0, 'timestamp': max_timestamp}
+
+
+def load_watermarks(out_dir: str) -> Dict[str, Dict]:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(out_dir: str, watermarks: Dict[str, Dict]):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def export(db_path: str, out_dir: str, tables: List[str] = None, fmt: str = 'jsonl', incremental: bool = False,
+           since_id: int = None, since_timestamp: str = None, chunk_size: int = 1000) -> Dict[str, Dict]:
+    """Export tables from one snapshot into ``out_dir``; returns per-table row counts and files."""
+    tables = tables or list(EXPORT_TABLES)
+    os.makedirs(out_dir, exist_ok=True)
+    watermarks = load_watermarks(out_dir) if incremental else {}
+    stamp = time.strftime('%Y%m%dT%H%M%S')
+
+    conn = open_snapshot(db_path)
+    report = {}
+    try:
+        new_watermarks = {}
+        for table in tables:
+            previous = watermarks.get(table, {})
+            table_since_id = since_id if since_id is not None else previous.get('id', 0)
+            table_since_timestamp = since_timestamp or (previous.get('timestamp') if EXPORT_TABLES[table] else None)
+            new_watermarks[table] = table_watermark(conn, table)
+
+            path = os.path.join(out_dir, f"{table}-{stamp}.{fmt}")
+            rows = export_table(conn, table, path, fmt, table_since_id, table_since_timestamp, chunk_size)
+            report[table] = {'rows': rows, 'file': path if rows else None}
+            logger.info(f"{table}: exported {rows} rows" + (f" to {path}" if rows else ""))
+    finally:
+        conn.execute("COMMIT")
+        conn.close()
+
+    if incremental:
+        save_watermarks(out_dir, {**watermarks, **new_watermarks})
+    return report
+
+
+def main(argv=None):
+    from settings.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Export memory DB tables from a consistent snapshot")
+    parser.add_argument("--db", default="memory/agent_memory.db", help="Path to the SQLite database")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--format", choices=FORMATS, default='jsonl')
+    parser.add_argument("--tables", nargs='+', choices=list(EXPORT_TABLES), help="Tables to export (default: all)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Export only rows past the watermarks in <out>/{WATERMARK_FILE}, then advance them")
+    parser.add_argument("--since-id", type=int, help="Export rows with a higher id")
+    parser.add_argument("--since-timestamp", help="...or a later change/creation timestamp ('YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows held in memory at a time")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    report = export(args.db, args.out, args.tables, args.format, args.incremental,
+                    args.since_id, args.since_timestamp, args.chunk_size)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
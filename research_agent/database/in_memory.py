@@ -0,0 +1,631 @@
+"""Memory store kept in process memory.
+
+Behaves like the SQLite ``MemoryManager`` (see tests/test_memory_backends.py) but
+keeps rows in dicts with lookup indexes by id, conversation, URL, agent,
+node and cache key, so nothing touches the disk. Everything is lost when
+the process exits; meant for tests, benchmarks and throwaway runs.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .agent_memory import _cache_freshness, _extract_keywords, _relevance
+from .stats import BUCKETS
+
+logger = logging.getLogger("in_memory")
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _now() -> str:
+    # Same UTC text format as SQLite's CURRENT_TIMESTAMP, so comparisons and ordering match
+    return datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+
+
+def _ago(**delta) -> str:
+    return (datetime.utcnow() - timedelta(**delta)).strftime(TIMESTAMP_FORMAT)
+
+
+def _bucket(granularity: str, timestamp: str) -> str:
+    return f"{timestamp[:13]}:00" if granularity == 'hour' else timestamp[:10]
+
+
+def _contains(text: Optional[str], needle: str) -> bool:
+    """LOWER(text) LIKE '%needle%'"""
+    return needle.lower() in (text or '').lower()
+
+
+def _newest_first(rows) -> List[Dict]:
+    return sorted(rows, key=lambda row: (row['timestamp'], row['id']), reverse=True)
+
+
+def _cache_key(query: str) -> str:
+    return hashlib.sha256(query.lower().strip().encode()).hexdigest()
+
+
+class InMemoryBackend:
+    """Dict-backed implementation of database.backend.MemoryBackend; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = defaultdict(lambda: itertools.count(1))
+        self._conversations: Dict[int, Dict] = {}
+        self._research: Dict[int, Dict] = {}
+        self._research_by_conversation: Dict[int, List[int]] = defaultdict(list)
+        self._sources: Dict[int, Dict] = {}
+        self._source_ids: Dict[tuple, int] = {}
+        self._sources_by_url: Dict[str, List[int]] = defaultdict(list)
+        # research id -> [(position, source id)], source id -> research ids
+        self._research_sources: Dict[int, List[tuple]] = defaultdict(list)
+        self._runs_by_source: Dict[int, set] = defaultdict(set)
+        self._analyses: Dict[int, Dict] = {}
+        self._articles: Dict[int, Dict] = {}
+        self._unscored: set = set()
+        self._learnings_by_agent: Dict[str, List[Dict]] = defaultdict(list)
+        self._cache: Dict[str, Dict] = {}
+        self._latencies_by_node: Dict[str, List[Dict]] = defaultdict(list)
+        self._latencies_by_conversation: Dict[int, List[Dict]] = defaultdict(list)
+        self._profiles: Dict[int, Dict] = {}
+        # (granularity, bucket) -> counts; like the SQLite rollups, not reduced when rows are deleted
+        self._rollups: Dict[tuple, Dict[str, int]] = defaultdict(lambda: {'runs': 0, 'successes': 0, 'cache_hits': 0})
+        logger.info("In-memory memory backend initialized")
+
+    def _next_id(self, table: str) -> int:
+        return next(self._ids[table])
+
+    def _bump_rollups(self, timestamp: str, **deltas: int):
+        for granularity in BUCKETS:
+            counts = self._rollups[(granularity, _bucket(granularity, timestamp))]
+            for name, delta in deltas.items():
+                counts[name] += delta
+
+    # ============================================
+    # CONVERSATIONS
+    # ============================================
+
+    def start_conversation(self, user_query: str, task_type: str = None, user_provided_data: str = None,
+                           origin: str = None) -> int:
+        with self._lock:
+            conv_id = self._next_id('conversations')
+            timestamp = _now()
+            self._conversations[conv_id] = {
+                'id': conv_id, 'user_query': user_query, 'task_type': task_type, 'timestamp': timestamp,
+                'user_provided_data': user_provided_data, 'agents_used': None, 'success': 1,
+                'degradation': None, 'origin': origin, 'reused_research_id': None,
+            }
+            self._bump_rollups(timestamp, runs=1, successes=1)
+            return conv_id
+
+    def end_conversation(self, conversation_id: int, agents_used: List[str], success: bool = True):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return
+            new_success = 1 if success else 0
+            self._bump_rollups(conversation['timestamp'], successes=new_success - conversation['success'])
+            conversation['agents_used'] = json.dumps(agents_used)
+            conversation['success'] = new_success
+
+    def set_task_type(self, conversation_id: int, task_type: str):
+        with self._lock:
+            if conversation_id in self._conversations:
+                self._conversations[conversation_id]['task_type'] = task_type
+
+    def record_degradation(self, conversation_id: int, decision: str):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return
+            decisions = json.loads(conversation['degradation']) if conversation['degradation'] else []
+            decisions.append(decision)
+            conversation['degradation'] = json.dumps(decisions)
+
+    def record_research_reuse(self, conversation_id: int, research_id: int):
+        with self._lock:
+            if conversation_id in self._conversations:
+                self._conversations[conversation_id]['reused_research_id'] = research_id
+
+    def prune_conversations(self, max_conversations: int = None, max_age_days: float = None) -> int:
+        with self._lock:
+            pruned = set()
+            if max_conversations is not None:
+                pruned.update(sorted(self._conversations, reverse=True)[max_conversations:])
+            if max_age_days is not None:
+                cutoff = _ago(days=max_age_days)
+                pruned.update(cid for cid, c in self._conversations.items() if c['timestamp'] < cutoff)
+
+            for cid in pruned:
+                for research_id in self._research_by_conversation.pop(cid, []):
+                    del self._research[research_id]
+                    for _, source_id in self._research_sources.pop(research_id, []):
+                        self._runs_by_source[source_id].discard(research_id)
+                self._latencies_by_conversation.pop(cid, None)
+                del self._conversations[cid]
+            for table in (self._analyses, self._articles, self._profiles):
+                for row_id in [i for i, row in table.items() if row['conversation_id'] in pruned]:
+                    del table[row_id]
+            self._unscored &= self._articles.keys()
+            for node, rows in self._latencies_by_node.items():
+                self._latencies_by_node[node] = [r for r in rows if r['conversation_id'] not in pruned]
+            for source_id in [s for s in self._sources if not self._runs_by_source.get(s)]:
+                source = self._sources.pop(source_id)
+                del self._source_ids[(source['url'], source['content_hash'])]
+                self._sources_by_url[source['url']].remove(source_id)
+                self._runs_by_source.pop(source_id, None)
+            if pruned:
+                logger.info(f"Pruned {len(pruned)} conversations")
+            return len(pruned)
+
+    # ============================================
+    # RESEARCH MEMORY
+    # ============================================
+
+    def save_research(self, conversation_id: int, query: str, results: str,
+                      sources: List[Any] = None) -> int:
+        sources = [{'url': s} if isinstance(s, str) else s for s in (sources or []) if s]
+        urls = [s['url'] for s in sources if s.get('url')]
+        with self._lock:
+            research_id = self._next_id('research_results')
+            self._research[research_id] = {
+                'id': research_id, 'conversation_id': conversation_id, 'query': query, 'results': results,
+                'sources': json.dumps(urls) if urls else None, 'timestamp': _now(),
+            }
+            self._research_by_conversation[conversation_id].append(research_id)
+            linked = self._research_sources[research_id]
+            for position, source in enumerate(sources):
+                if not source.get('url'):
+                    continue
+                source_id = self._upsert_source(source)
+                if research_id not in self._runs_by_source[source_id]:
+                    linked.append((position, source_id))
+                    self._runs_by_source[source_id].add(research_id)
+            return research_id
+
+    def _upsert_source(self, source: Dict[str, Any]) -> int:
+        content = source.get('content') or ''
+        content_hash = hashlib.sha256(' '.join(content.split()).encode()).hexdigest()
+        key = (source['url'], content_hash)
+        if key not in self._source_ids:
+            source_id = self._next_id('sources')
+            self._sources[source_id] = {
+                'id': source_id, 'url': source['url'], 'content_hash': content_hash,
+                'title': source.get('title'), 'content': content or None, 'first_seen': _now(),
+            }
+            self._source_ids[key] = source_id
+            self._sources_by_url[source['url']].append(source_id)
+        return self._source_ids[key]
+
+    def get_research_sources(self, research_id: int) -> List[Dict]:
+        with self._lock:
+            return [
+                {key: self._sources[source_id][key] for key in ('id', 'url', 'title', 'content', 'first_seen')}
+                for _, source_id in sorted(self._research_sources.get(research_id, []))
+            ]
+
+    def get_runs_for_url(self, url: str, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            research_ids = {rid for sid in self._sources_by_url.get(url, []) for rid in self._runs_by_source[sid]}
+            runs = _newest_first(self._research[rid] for rid in research_ids)[:limit]
+            return [
+                {'research_id': r['id'], 'conversation_id': r['conversation_id'], 'query': r['query'],
+                 'timestamp': r['timestamp']}
+                for r in runs
+            ]
+
+    def get_similar_research(self, query: str, limit: int = 5) -> List[Dict]:
+        if not query or not query.strip():
+            return []
+        results: List[Dict] = []
+        seen = set()
+        with self._lock:
+            newest = _newest_first(self._research.values())
+            for kw in _extract_keywords(query)[:5]:
+                for row in [r for r in newest if _contains(r['query'], kw)][:limit]:
+                    key = (row['query'], row['timestamp'])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    results.append({'query': row['query'], 'results': row['results'], 'timestamp': row['timestamp']})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def get_reusable_research(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0, limit: int = 3) -> List[Dict]:
+        if not query or not query.strip():
+            return []
+        keywords = set(_extract_keywords(query))
+        cutoff = _ago(hours=max_age_hours)
+        candidates: Dict[int, Dict] = {}
+        with self._lock:
+            fresh = _newest_first(
+                r for r in self._research.values()
+                if r['timestamp'] >= cutoff and not r['results'].lower().startswith('research failed:')
+            )
+            for kw in sorted(keywords, key=len, reverse=True)[:5]:
+                for row in [r for r in fresh if _contains(r['query'], kw)][:limit * 5]:
+                    candidates[row['id']] = {key: row[key] for key in ('id', 'query', 'results', 'timestamp')}
+
+        scored = []
+        for candidate in candidates.values():
+            relevance = _relevance(keywords, candidate['query'])
+            if relevance >= min_relevance:
+                candidate['relevance'] = round(relevance, 3)
+                scored.append(candidate)
+        scored.sort(key=lambda c: (c['relevance'], c['timestamp']), reverse=True)
+        return scored[:limit]
+
+    # ============================================
+    # ANALYSIS MEMORY
+    # ============================================
+
+    def save_analysis(self, conversation_id: int, analysis: str, key_insights: List[str] = None):
+        with self._lock:
+            analysis_id = self._next_id('analyses')
+            self._analyses[analysis_id] = {
+                'id': analysis_id, 'conversation_id': conversation_id, 'analysis': analysis,
+                'key_insights': json.dumps(key_insights) if key_insights else None, 'timestamp': _now(),
+            }
+
+    def _with_query(self, rows) -> List[tuple]:
+        """(row, user query) for rows whose conversation exists, as the SQLite inner join does."""
+        return [(row, self._conversations[row['conversation_id']]['user_query'])
+                for row in rows if row['conversation_id'] in self._conversations]
+
+    def get_past_analyses(self, topic: str, limit: int = 5) -> List[Dict]:
+        with self._lock:
+            matches = [(a, q) for a, q in self._with_query(_newest_first(self._analyses.values()))
+                       if _contains(q, topic)]
+            return [
+                {
+                    'analysis': a['analysis'],
+                    'key_insights': json.loads(a['key_insights']) if a['key_insights'] else [],
+                    'timestamp': a['timestamp'],
+                    'original_query': q
+                }
+                for a, q in matches[:limit]
+            ]
+
+    def get_reusable_analysis(self, query: str, max_age_hours: float = 24,
+                              min_relevance: float = 0.0) -> Optional[Dict]:
+        if not query or not query.strip():
+            return None
+        keywords = set(_extract_keywords(query))
+        cutoff = _ago(hours=max_age_hours)
+        best = None
+        with self._lock:
+            fresh = self._with_query(_newest_first(
+                a for a in self._analyses.values()
+                if a['timestamp'] >= cutoff and not a['analysis'].lower().startswith('analysis failed:')
+            ))
+            for kw in sorted(keywords, key=len, reverse=True)[:5]:
+                for a, q in [(a, q) for a, q in fresh if _contains(q, kw)][:10]:
+                    relevance = _relevance(keywords, q)
+                    if relevance >= min_relevance and (best is None or (relevance, a['timestamp']) > best[:2]):
+                        best = (relevance, a['timestamp'], a, q)
+        if best is None:
+            return None
+        relevance, _, a, q = best
+        return {
+            'id': a['id'],
+            'original_query': q,
+            'timestamp': a['timestamp'],
+            'analysis': a['analysis'],
+            'relevance': round(relevance, 3)
+        }
+
+    # ============================================
+    # ARTICLE MEMORY
+    # ============================================
+
+    def save_article(self, conversation_id: int, article: str, quality_score: float = None):
+        with self._lock:
+            article_id = self._next_id('articles')
+            self._articles[article_id] = {
+                'id': article_id, 'conversation_id': conversation_id, 'article': article,
+                'quality_score': quality_score, 'word_count': len(article.split()), 'timestamp': _now(),
+            }
+            if quality_score is None:
+                self._unscored.add(article_id)
+
+    def get_best_articles(self, topic: str = None, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            rows = [(a, q) for a, q in self._with_query(self._articles.values()) if not topic or _contains(q, topic)]
+            # Unscored articles last, as NULLs sort in SQLite's descending order
+            rows.sort(key=lambda item: (item[0]['quality_score'] is not None, item[0]['quality_score'] or 0,
+                                        item[0]['timestamp'], item[0]['id']), reverse=True)
+            return [
+                {
+                    'article': a['article'],
+                    'quality_score': a['quality_score'],
+                    'word_count': a['word_count'],
+                    'timestamp': a['timestamp'],
+                    'original_query': q
+                }
+                for a, q in rows[:limit]
+            ]
+
+    def get_unscored_articles(self, limit: int = 20, after_id: int = 0) -> List[Dict]:
+        with self._lock:
+            ids = sorted(i for i in self._unscored if i > after_id)[:limit]
+            result = []
+            for article_id in ids:
+                a = self._articles[article_id]
+                conversation = self._conversations.get(a['conversation_id'])
+                result.append({
+                    'id': a['id'],
+                    'conversation_id': a['conversation_id'],
+                    'article': a['article'],
+                    'word_count': a['word_count'],
+                    'user_query': conversation['user_query'] if conversation else None
+                })
+            return result
+
+    def save_quality_scores(self, scores: Dict[int, float]):
+        with self._lock:
+            for article_id, score in scores.items():
+                if article_id in self._articles:
+                    self._articles[article_id]['quality_score'] = score
+                    if score is None:
+                        self._unscored.add(article_id)
+                    else:
+                        self._unscored.discard(article_id)
+
+    # ============================================
+    # LEARNING & IMPROVEMENT
+    # ============================================
+
+    def save_learning(self, agent_name: str, lesson: str, context: str = None, success_pattern: bool = True):
+        with self._lock:
+            self._learnings_by_agent[agent_name].append({
+                'id': self._next_id('learnings'), 'agent_name': agent_name, 'lesson': lesson,
+                'context': context, 'success_pattern': 1 if success_pattern else 0, 'timestamp': _now(),
+            })
+
+    def get_learnings(self, agent_name: str = None, success_only: bool = True, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            if agent_name:
+                rows = [r for r in self._learnings_by_agent.get(agent_name, [])
+                        if not success_only or r['success_pattern'] == 1]
+            else:
+                wanted = 1 if success_only else 0
+                rows = [r for rows in self._learnings_by_agent.values() for r in rows if r['success_pattern'] == wanted]
+            # Only the per-agent listing of all learnings reports success_pattern, as in MemoryManager
+            with_pattern = bool(agent_name) and not success_only
+            return [
+                {
+                    'lesson': r['lesson'],
+                    'context': r['context'],
+                    'timestamp': r['timestamp'],
+                    'success_pattern': r['success_pattern'] if with_pattern else None
+                }
+                for r in _newest_first(rows)[:limit]
+            ]
+
+    def get_agent_failure_rates(self, limit: int = 100) -> Dict[str, float]:
+        with self._lock:
+            rates = {}
+            for agent_name, rows in self._learnings_by_agent.items():
+                recent = _newest_first(rows)[:limit]
+                if recent:
+                    rates[agent_name] = sum(r['success_pattern'] == 0 for r in recent) / len(recent)
+            return rates
+
+    # ============================================
+    # QUERY CACHING
+    # ============================================
+
+    def get_cached_result(self, query: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(_cache_key(query))
+            if entry is None:
+                return None
+            entry['hit_count'] += 1
+            entry['last_accessed'] = _now()
+            self._bump_rollups(entry['last_accessed'], cache_hits=1)
+            return entry['result']
+
+    def cache_result(self, query: str, result: str, soft_ttl_hours: float = None, hard_ttl_hours: float = None):
+        with self._lock:
+            now = _now()
+            key = _cache_key(query)
+            entry = self._cache.get(key)
+            ttls = {'soft_ttl_hours': soft_ttl_hours, 'hard_ttl_hours': hard_ttl_hours, 'refresh_started_at': None}
+            if entry is None:
+                self._cache[key] = {'id': self._next_id('query_cache'), 'query': query, 'result': result,
+                                    'hit_count': 0, 'last_accessed': now, 'created_at': now, **ttls}
+            else:
+                entry.update(result=result, last_accessed=now, created_at=now, **ttls)
+
+    def get_cache_entry(self, query: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(_cache_key(query))
+            if entry is None:
+                return None
+            created = datetime.strptime(entry['created_at'], TIMESTAMP_FORMAT)
+            return {
+                'created_at': entry['created_at'],
+                'last_accessed': entry['last_accessed'],
+                'hit_count': entry['hit_count'],
+                'age_hours': (datetime.utcnow() - created).total_seconds() / 3600,
+            }
+
+    def lookup_cache(self, query: str, soft_ttl_hours: float = None, hard_ttl_hours: float = None) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(_cache_key(query))
+            if entry is None:
+                return None
+            created = datetime.strptime(entry['created_at'], TIMESTAMP_FORMAT)
+            age_hours = (datetime.utcnow() - created).total_seconds() / 3600
+            soft = entry['soft_ttl_hours'] if entry['soft_ttl_hours'] is not None else soft_ttl_hours
+            hard = entry['hard_ttl_hours'] if entry['hard_ttl_hours'] is not None else hard_ttl_hours
+            freshness = _cache_freshness(age_hours, soft, hard)
+            if freshness == 'expired':
+                return {'result': None, 'age_hours': age_hours, 'freshness': freshness}
+            entry['hit_count'] += 1
+            entry['last_accessed'] = _now()
+            self._bump_rollups(entry['last_accessed'], cache_hits=1)
+            return {'result': entry['result'], 'age_hours': age_hours, 'freshness': freshness}
+
+    def claim_cache_refresh(self, query: str, lease_seconds: float = 600) -> bool:
+        with self._lock:
+            entry = self._cache.get(_cache_key(query))
+            if entry is None:
+                return False
+            claimed = entry['refresh_started_at']
+            if claimed is not None and claimed >= _ago(seconds=lease_seconds):
+                return False
+            entry['refresh_started_at'] = _now()
+            return True
+
+    def get_query_demand(self, days: float = 7, recent_hours: float = 24) -> List[Dict]:
+        since = _ago(days=days)
+        recent_since = _ago(hours=recent_hours)
+        groups: Dict[str, Dict] = {}
+        with self._lock:
+            for c in self._conversations.values():
+                if c['timestamp'] < since or c['user_provided_data'] is not None or c['origin'] is not None:
+                    continue
+                # SQLite's TRIM only strips spaces
+                key = c['user_query'].strip(' ').lower()
+                group = groups.setdefault(key, {'query': c['user_query'], 'cache_key': key, 'requests': 0,
+                                                'recent_requests': 0, 'hits': 0, 'misses': 0})
+                group['query'] = min(group['query'], c['user_query'])
+                group['requests'] += 1
+                group['recent_requests'] += c['timestamp'] >= recent_since
+                group['hits'] += c['agents_used'] == '[]'
+                group['misses'] += c['agents_used'] is not None and c['agents_used'] != '[]'
+        return list(groups.values())
+
+    def clear_old_cache(self, days: int = 30):
+        cutoff = _ago(days=days)
+        with self._lock:
+            stale = [key for key, entry in self._cache.items() if entry['last_accessed'] < cutoff]
+            for key in stale:
+                del self._cache[key]
+            logger.info(f"Cleared {len(stale)} old cache entries")
+            return len(stale)
+
+    # ============================================
+    # NODE LATENCIES
+    # ============================================
+
+    def record_node_latency(self, node: str, duration_seconds: float, conversation_id: int = None,
+                            task_type: str = None, success: bool = True):
+        with self._lock:
+            row = {'id': self._next_id('node_latencies'), 'conversation_id': conversation_id, 'node': node,
+                   'task_type': task_type, 'duration_seconds': duration_seconds,
+                   'success': 1 if success else 0, 'timestamp': _now()}
+            self._latencies_by_node[node].append(row)
+            if conversation_id is not None:
+                self._latencies_by_conversation[conversation_id].append(row)
+
+    def get_latency_estimate(self, node: str, percentile: float = 0.75, limit: int = 50) -> Optional[float]:
+        with self._lock:
+            recent = _newest_first(r for r in self._latencies_by_node.get(node, []) if r['success'] == 1)[:limit]
+        durations = sorted(r['duration_seconds'] for r in recent)
+        if not durations:
+            return None
+        return durations[min(int(len(durations) * percentile), len(durations) - 1)]
+
+    def save_run_profile(self, conversation_id: Optional[int], wall_seconds: float, cpu_seconds: float = None,
+                         breakdown: Dict = None, hotspots: List[Dict] = None, profile: bytes = None):
+        with self._lock:
+            profile_id = self._next_id('run_profiles')
+            self._profiles[profile_id] = {
+                'id': profile_id, 'conversation_id': conversation_id, 'wall_seconds': wall_seconds,
+                'cpu_seconds': cpu_seconds, 'breakdown': breakdown or {}, 'hotspots': hotspots or [],
+                'profile': profile, 'timestamp': _now(),
+            }
+
+    def get_slowest_runs(self, limit: int = 10, conversation_id: int = None) -> List[Dict]:
+        with self._lock:
+            rows = [p for p in self._profiles.values()
+                    if conversation_id is None or p['conversation_id'] == conversation_id]
+            rows.sort(key=lambda p: p['wall_seconds'], reverse=True)
+            result = []
+            for p in rows[:limit]:
+                conversation = self._conversations.get(p['conversation_id'])
+                result.append({
+                    'conversation_id': p['conversation_id'],
+                    'wall_seconds': p['wall_seconds'],
+                    'cpu_seconds': p['cpu_seconds'],
+                    'breakdown': json.loads(json.dumps(p['breakdown'])),
+                    'hotspots': json.loads(json.dumps(p['hotspots'])),
+                    'timestamp': p['timestamp'],
+                    'user_query': conversation['user_query'] if conversation else None,
+                })
+            return result
+
+    def get_run_profile(self, conversation_id: int) -> Optional[bytes]:
+        with self._lock:
+            ids = [i for i, p in self._profiles.items() if p['conversation_id'] == conversation_id]
+            return self._profiles[max(ids)]['profile'] if ids else None
+
+    def get_plan_history(self, task_type: str = None, limit: int = 1000) -> List[Dict]:
+        with self._lock:
+            rows = [
+                c for c in self._conversations.values()
+                if c['task_type'] is not None and c['agents_used'] not in (None, '[]')
+                and (not task_type or c['task_type'] == task_type)
+            ]
+            history = []
+            for c in reversed(_newest_first(rows)[:limit]):
+                latencies = self._latencies_by_conversation.get(c['id'])
+                scores = [a['quality_score'] for a in self._articles.values()
+                          if a['conversation_id'] == c['id'] and a['quality_score'] is not None]
+                history.append({
+                    'conversation_id': c['id'],
+                    'task_type': c['task_type'],
+                    'agents_used': json.loads(c['agents_used']),
+                    'success': bool(c['success']),
+                    'timestamp': c['timestamp'],
+                    'degraded': bool(c['degradation']),
+                    'reused_research': c['reused_research_id'] is not None,
+                    'latency_seconds': sum(r['duration_seconds'] for r in latencies) if latencies else None,
+                    'quality_score': max(scores) if scores else None
+                })
+            return history
+
+    # ============================================
+    # STATISTICS & ANALYTICS
+    # ============================================
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Computed from the live rows; there are no counters to drift."""
+        with self._lock:
+            scores = [a['quality_score'] for a in self._articles.values() if a['quality_score'] is not None]
+            task_types = Counter(c['task_type'] for c in self._conversations.values() if c['task_type'] is not None)
+            return {
+                'total_conversations': len(self._conversations),
+                'successful_conversations': sum(c['success'] == 1 for c in self._conversations.values()),
+                'total_research_queries': len(self._research),
+                'total_analyses': len(self._analyses),
+                'total_articles': len(self._articles),
+                'cached_queries': len(self._cache),
+                'total_cache_hits': sum(e['hit_count'] for e in self._cache.values()),
+                'average_article_quality': round(sum(scores) / len(scores), 2) if scores else None,
+                'top_task_types': dict(task_types.most_common(5)),
+            }
+
+    def get_rollups(self, granularity: str = 'hour', limit: int = 24) -> List[Dict]:
+        if granularity not in BUCKETS:
+            raise ValueError(f"granularity must be one of {tuple(BUCKETS)}")
+        with self._lock:
+            buckets = sorted((b for g, b in self._rollups if g == granularity), reverse=True)[:limit]
+            return [{'bucket': b, **self._rollups[(granularity, b)]} for b in buckets]
+
+    def rebuild_statistics(self):
+        """Recompute rollups from the rows, attributing cache hits to each entry's last access."""
+        with self._lock:
+            self._rollups.clear()
+            for c in self._conversations.values():
+                self._bump_rollups(c['timestamp'], runs=1, successes=c['success'])
+            for entry in self._cache.values():
+                if entry['hit_count'] > 0:
+                    self._bump_rollups(entry['last_accessed'], cache_hits=entry['hit_count'])
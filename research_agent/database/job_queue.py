@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import migrations
+
+logger = logging.getLogger("job_queue")
+if not logger.handlers:
+    logger.addHandler(logging.NullHandler())
+
+# Job lifecycle: queued -> running -> done, or back to queued for a retry,
+# or dead once max_attempts is used up (dead-letter; see requeue_dead).
+QUEUED, RUNNING, DONE, DEAD = 'queued', 'running', 'done', 'dead'
+
+
+class JobQueue:
+    """Durable job queue in the memory DB with claim-with-lease semantics.
+
+    A worker claims a job for ``lease_seconds`` and must heartbeat to keep it.
+    If the worker dies, the lease expires and another worker picks the job up.
+    """
+
+    def __init__(self, db_path: str = 'memory/agent_memory.db', lease_seconds: int = 120,
+                 retry_backoff_seconds: int = 10):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            # WAL lets producers poll while workers write
+            conn.execute("PRAGMA journal_mode=WAL")
+            migrations.migrate(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Several processes share the file; wait for the write lock instead of failing
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    # ============================================
+    # PRODUCERS
+    # ============================================
+
+    def enqueue(self, payload: Dict[str, Any], kind: str = 'research',
+                priority: int = 0, max_attempts: int = 3) -> int:
+        """Add a job and return its id. Higher priority jobs are claimed first."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO jobs (kind, payload, priority, max_attempts)
+                VALUES (?, ?, ?, ?)
+            """, (kind, json.dumps(payload), priority, max_attempts))
+            conn.commit()
+            logger.info(f"Enqueued {kind} job {cursor.lastrowid}")
+            return cursor.lastrowid
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Get a job's status, attempts, result and error."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, kind, status, attempts, max_attempts, result, error, created_at, finished_at
+                FROM jobs WHERE id = ?
+            """, (job_id,))
+            r = cursor.fetchone()
+            if r is None:
+                return None
+            return {
+                'id': r[0],
+                'kind': r[1],
+                'status': r[2],
+                'attempts': r[3],
+                'max_attempts': r[4],
+                'result': json.loads(r[5]) if r[5] else None,
+                'error': r[6],
+                'created_at': r[7],
+                'finished_at': r[8]
+            }
+
+    def wait_for_result(self, job_id: int, timeout: float = None,
+                        poll_interval: float = 0.5) -> Dict[str, Any]:
+        """Block until the job is done or dead; raises TimeoutError after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get_job(job_id)
+            if job is None:
+                raise KeyError(f"Unknown job {job_id}")
+            if job['status'] in (DONE, DEAD):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(poll_interval)
+
+    async def await_result(self, job_id: int, timeout: float = None,
+                           poll_interval: float = 0.5) -> Dict[str, Any]:
+        """Async version of wait_for_result, for producers running an event loop."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = await asyncio.to_thread(self.get_job, job_id)
+            if job is None:
+                raise KeyError(f"Unknown job {job_id}")
+            if job['status'] in (DONE, DEAD):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            await asyncio.sleep(poll_interval)
+
+    # ============================================
+    # WORKERS
+    # ============================================
+
+    def claim(self, worker_id: str, kind: str = None) -> Optional[Dict[str, Any]]:
+        """Claim the next runnable job (queued, or running with an expired lease)."""
+        with self._connect() as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.cursor()
+                # Jobs whose worker died on their last allowed attempt go to the dead-letter state
+                cursor.execute("""
+                    UPDATE jobs
+                    SET status = ?, error = COALESCE(error, 'lease expired'), finished_at = CURRENT_TIMESTAMP,
+                        lease_owner = NULL, lease_expires_at = NULL
+                    WHERE status = ? AND lease_expires_at < CURRENT_TIMESTAMP AND attempts >= max_attempts
+                """, (DEAD, RUNNING))
+
+                kind_filter, params = ("AND kind = ?", (kind,)) if kind else ("", ())
+                cursor.execute(f"""
+                    SELECT id FROM jobs
+                    WHERE status = ? AND available_at <= CURRENT_TIMESTAMP {kind_filter}
+                    ORDER BY priority DESC, available_at, id
+                    LIMIT 1
+                """, (QUEUED, *params))
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(f"""
+                        SELECT id FROM jobs
+                        WHERE status = ? AND lease_expires_at < CURRENT_TIMESTAMP {kind_filter}
+                        ORDER BY lease_expires_at
+                        LIMIT 1
+                    """, (RUNNING, *params))
+                    row = cursor.fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                cursor.execute("""
+                    UPDATE jobs
+                    SET status = ?, lease_owner = ?, attempts = attempts + 1,
+                        lease_expires_at = datetime('now', ?), heartbeat_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    RETURNING id, kind, payload, attempts, max_attempts
+                """, (RUNNING, worker_id, f'+{self.lease_seconds} seconds', row[0]))
+                job = cursor.fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        logger.info(f"Worker {worker_id} claimed job {job[0]} (attempt {job[3]}/{job[4]})")
+        return {
+            'id': job[0],
+            'kind': job[1],
+            'payload': json.loads(job[2]),
+            'attempts': job[3],
+            'max_attempts': job[4]
+        }
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease. Returns False if the worker no longer owns the job."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET lease_expires_at = datetime('now', ?), heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ? AND status = ?
+            """, (f'+{self.lease_seconds} seconds', job_id, worker_id, RUNNING))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store the result and mark the job done (only if the worker still owns it)."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET status = ?, result = ?, error = NULL, finished_at = CURRENT_TIMESTAMP,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ? AND status = ?
+            """, (DONE, json.dumps(result), job_id, worker_id, RUNNING))
+            conn.commit()
+            if cursor.rowcount != 1:
+                logger.warning(f"Worker {worker_id} lost the lease on job {job_id}; result discarded")
+                return False
+            logger.info(f"Job {job_id} done")
+            return True
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> str:
+        """Record a failure: retry with exponential backoff, or dead-letter. Returns the new status."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE jobs
+                SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END,
+                    available_at = datetime('now', '+' || (? * (1 << (attempts - 1))) || ' seconds'),
+                    finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                    error = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ? AND status = ?
+                RETURNING status
+            """, (DEAD, QUEUED, self.retry_backoff_seconds, error, job_id, worker_id, RUNNING))
+            row = cursor.fetchone()
+            conn.commit()
+            status = row[0] if row else None
+            logger.warning(f"Job {job_id} failed ({error[:200]}); now {status}")
+            return status
+
+    # ============================================
+    # ADMIN
+    # ============================================
+
+    def requeue_dead(self, job_id: int = None) -> int:
+        """Move dead-lettered jobs (one, or all) back to the queue with fresh attempts."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE jobs
+                SET status = ?, attempts = 0, available_at = CURRENT_TIMESTAMP, finished_at = NULL
+                WHERE status = ? {"AND id = ?" if job_id is not None else ""}
+            """, (QUEUED, DEAD) + ((job_id,) if job_id is not None else ()))
+            conn.commit()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return dict(cursor.fetchall())
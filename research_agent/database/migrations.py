@@ -0,0 +1,375 @@
+"""Versioned schema migrations for the memory DB.
+
+The schema version is stored in ``PRAGMA user_version``. Each migration runs
+in its own ``BEGIN IMMEDIATE`` transaction together with the version bump, so
+a failed migration leaves the database at the previous version and
+concurrent processes never apply the same migration twice.
+
+Migrations must be safe on databases created before versioning existed
+(user_version 0 but tables present), hence ``IF NOT EXISTS`` everywhere.
+
+    python -m database.migrations status
+    python -m database.migrations migrate
+    python -m database.migrations check-plans   # exit 1 if a query stops using its index
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from typing import Callable, List, Tuple
+
+from . import stats
+from .compression import COMPRESSED_COLUMNS
+
+logger = logging.getLogger("migrations")
+
+
+def ensure_column(cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+    """Add a column to an existing table if it is missing."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def _baseline(cursor: sqlite3.Cursor):
+    # Conversations table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_query TEXT NOT NULL,
+            task_type TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_provided_data TEXT,
+            agents_used TEXT,
+            success INTEGER DEFAULT 1
+        )
+    """)
+
+    # Research results table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS research_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            query TEXT NOT NULL,
+            results TEXT NOT NULL,
+            sources TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+
+    # Analyses table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            analysis TEXT NOT NULL,
+            key_insights TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+
+    # Articles table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            article TEXT NOT NULL,
+            quality_score REAL,
+            word_count INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+
+    # Learnings table - for agent improvements
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS learnings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT NOT NULL,
+            lesson TEXT NOT NULL,
+            context TEXT,
+            success_pattern INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Similar queries cache - for faster responses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS query_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query_hash TEXT UNIQUE NOT NULL,
+            query TEXT NOT NULL,
+            result TEXT NOT NULL,
+            hit_count INTEGER DEFAULT 0,
+            last_accessed DATETIME DEFAULT CURRENT_TIMESTAMP,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _sources(cursor: sqlite3.Cursor):
+    # Sources table - each fetched page snippet stored once, keyed by URL + content hash
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            title TEXT,
+            content TEXT,
+            first_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (url, content_hash)
+        )
+    """)
+
+    # Which research run used which source
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS research_sources (
+            research_id INTEGER NOT NULL,
+            source_id INTEGER NOT NULL,
+            position INTEGER,
+            PRIMARY KEY (research_id, source_id),
+            FOREIGN KEY (research_id) REFERENCES research_results(id),
+            FOREIGN KEY (source_id) REFERENCES sources(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_research_sources_source
+        ON research_sources (source_id, research_id)
+    """)
+
+
+def _compression(cursor: sqlite3.Cursor):
+    # Preset dictionaries for zlib compression of text columns
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dictionary BLOB NOT NULL,
+            sample_count INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Per-row codec flags (NULL = plain text)
+    for table, column in COMPRESSED_COLUMNS.items():
+        ensure_column(cursor, table, f'{column}_codec', 'TEXT')
+
+
+def _statistics(cursor: sqlite3.Cursor):
+    # Statistics counters and rollups, kept current by triggers
+    stats.create_schema(cursor)
+
+
+# One index per MemoryManager query shape; see PLAN_CHECKS in database/query_plans.py
+QUERY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_research_results_timestamp ON research_results (timestamp, query)",
+    "CREATE INDEX IF NOT EXISTS idx_research_results_conversation ON research_results (conversation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_conversation ON analyses (conversation_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_quality"
+    " ON articles (quality_score DESC, timestamp DESC, conversation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_conversation ON articles (conversation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_learnings_agent"
+    " ON learnings (agent_name, success_pattern, timestamp, lesson, context)",
+    "CREATE INDEX IF NOT EXISTS idx_learnings_pattern ON learnings (success_pattern, timestamp, lesson, context)",
+    "CREATE INDEX IF NOT EXISTS idx_query_cache_last_accessed ON query_cache (last_accessed)",
+]
+
+
+def _query_indexes(cursor: sqlite3.Cursor):
+    for statement in QUERY_INDEXES:
+        cursor.execute(statement)
+
+
+def _jobs(cursor: sqlite3.Cursor):
+    # Durable job queue; see database/job_queue.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL DEFAULT 'research',
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            priority INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            available_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            lease_owner TEXT,
+            lease_expires_at DATETIME,
+            heartbeat_at DATETIME,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim
+        ON jobs (status, priority DESC, available_at, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_lease
+        ON jobs (status, lease_expires_at)
+    """)
+
+
+def _node_latencies(cursor: sqlite3.Cursor):
+    # Measured duration of each orchestrator node, used for deadline planning
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS node_latencies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            node TEXT NOT NULL,
+            task_type TEXT,
+            duration_seconds REAL NOT NULL,
+            success INTEGER DEFAULT 1,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_node_latencies_node
+        ON node_latencies (node, success, timestamp DESC)
+    """)
+    # JSON list of the degradations applied to meet a request's deadline
+    ensure_column(cursor, 'conversations', 'degradation', 'TEXT')
+
+
+def _plan_history_indexes(cursor: sqlite3.Cursor):
+    # Per-conversation latency totals and fresh-analysis lookups for the plan optimizer
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_node_latencies_conversation ON node_latencies (conversation_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp)")
+
+
+def _unscored_articles_index(cursor: sqlite3.Cursor):
+    # Lets the quality scorer find unscored articles without scanning scored ones
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_articles_unscored
+        ON articles (id) WHERE quality_score IS NULL
+    """)
+
+
+def _run_profiles(cursor: sqlite3.Cursor):
+    # Opt-in CPU profiles and await-time breakdowns of whole orchestrator runs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER,
+            wall_seconds REAL NOT NULL,
+            cpu_seconds REAL,
+            breakdown TEXT,
+            hotspots TEXT,
+            profile BLOB,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_profiles_wall ON run_profiles (wall_seconds DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_profiles_conversation ON run_profiles (conversation_id)")
+
+
+def _conversation_origin(cursor: sqlite3.Cursor):
+    # Who started a conversation: NULL for users, e.g. 'cache_warmer' for background runs
+    ensure_column(cursor, 'conversations', 'origin', 'TEXT')
+    # Query demand mining for the cache warmer
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp)")
+
+
+def _cache_ttls(cursor: sqlite3.Cursor):
+    # Per-entry freshness (hours; NULL = the reader's default) and the background refresh claim
+    ensure_column(cursor, 'query_cache', 'soft_ttl_hours', 'REAL')
+    ensure_column(cursor, 'query_cache', 'hard_ttl_hours', 'REAL')
+    ensure_column(cursor, 'query_cache', 'refresh_started_at', 'DATETIME')
+
+
+def _research_reuse(cursor: sqlite3.Cursor):
+    # Stored research a conversation answered from instead of searching
+    ensure_column(cursor, 'conversations', 'reused_research_id', 'INTEGER')
+
+
+# (version, description, apply). Append only - never edit a released migration.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "baseline tables", _baseline),
+    (2, "deduplicated sources", _sources),
+    (3, "text column compression", _compression),
+    (4, "trigger-maintained statistics", _statistics),
+    (5, "indexes for memory queries", _query_indexes),
+    (6, "job queue", _jobs),
+    (7, "node latencies and degradation record", _node_latencies),
+    (8, "plan history indexes", _plan_history_indexes),
+    (9, "unscored articles index", _unscored_articles_index),
+    (10, "run profiles", _run_profiles),
+    (11, "conversation origin", _conversation_origin),
+    (12, "query cache TTLs", _cache_ttls),
+    (13, "reused research record", _research_reuse),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int = LATEST_VERSION) -> int:
+    """Apply pending migrations up to ``target`` and return the resulting version."""
+    version = current_version(conn)
+    if version > LATEST_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this code ({LATEST_VERSION})")
+        return version
+
+    # Manage transactions explicitly so each migration and its version bump are atomic
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for number, description, apply in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if current_version(conn) >= number:
+                    conn.execute("ROLLBACK")
+                    continue
+                cursor = conn.cursor()
+                apply(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+                logger.info(f"Applied migration {number}: {description}")
+            except Exception:
+                conn.execute("ROLLBACK")
+                logger.exception(f"Migration {number} ({description}) failed")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+
+    return current_version(conn)
+
+
+def main(argv=None):
+    from settings.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Memory DB schema migrations")
+    parser.add_argument("command", choices=("status", "migrate", "check-plans"))
+    parser.add_argument("--db", default="memory/agent_memory.db", help="Path to the SQLite database")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.command == "check-plans":
+        # Imported here: query_plans builds on MemoryManager, which imports this module
+        from .query_plans import PLAN_CHECKS, check_query_plans
+        failures = check_query_plans(args.db if os.path.exists(args.db) else None)
+        for failure in failures:
+            print(f"FAIL {failure}")
+        failed_checks = len({failure.split(':', 1)[0] for failure in failures})
+        print(f"{len(PLAN_CHECKS) - failed_checks}/{len(PLAN_CHECKS)} memory queries use their index")
+        sys.exit(1 if failures else 0)
+    with sqlite3.connect(args.db) as conn:
+        if args.command == "status":
+            print(f"Schema version {current_version(conn)} (latest {LATEST_VERSION})")
+        else:
+            print(f"Migrated to schema version {migrate(conn)}")
+
+
+if __name__ == "__main__":
+    main()
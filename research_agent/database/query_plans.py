@@ -0,0 +1,112 @@
+"""Query-plan checks for the memory DB.
+
+Each check calls a real ``MemoryManager`` method, captures the SQL it runs
+(``set_trace_callback`` hands over statements with their parameters bound)
+and asserts that ``EXPLAIN QUERY PLAN`` of those statements uses the
+expected index, so the checks follow the queries as they change. Give every
+new index an entry in ``PLAN_CHECKS``.
+
+    python -m database.migrations check-plans
+    python -m pytest tests/test_query_plans.py
+"""
+import contextlib
+import os
+import sqlite3
+import tempfile
+from typing import Callable, Iterator, List, Tuple
+
+from .agent_memory import MemoryManager
+
+# (name, call on a MemoryManager, fragment selecting the statements to check, index they must use)
+PLAN_CHECKS: List[Tuple[str, Callable[[MemoryManager], object], str, str]] = [
+    ("get_similar_research", lambda m: m.get_similar_research("climate change", 5),
+     "FROM research_results", "idx_research_results_timestamp"),
+    ("get_reusable_research", lambda m: m.get_reusable_research("climate change"),
+     "FROM research_results", "idx_research_results_timestamp"),
+    ("get_past_analyses", lambda m: m.get_past_analyses("climate", 5),
+     "FROM analyses", "idx_analyses_timestamp"),
+    ("get_reusable_analysis", lambda m: m.get_reusable_analysis("climate change"),
+     "FROM analyses", "idx_analyses_timestamp"),
+    ("get_best_articles", lambda m: m.get_best_articles(),
+     "FROM articles", "idx_articles_quality"),
+    ("get_unscored_articles", lambda m: m.get_unscored_articles(),
+     "FROM articles", "idx_articles_unscored"),
+    ("get_learnings(agent, success_only)", lambda m: m.get_learnings('research'),
+     "FROM learnings", "idx_learnings_agent"),
+    ("get_learnings(all)", lambda m: m.get_learnings(),
+     "FROM learnings", "idx_learnings_pattern"),
+    ("get_runs_for_url", lambda m: m.get_runs_for_url('https://example.com'),
+     "FROM sources", "idx_research_sources_source"),
+    ("get_latency_estimate", lambda m: m.get_latency_estimate('writer_node'),
+     "FROM node_latencies", "idx_node_latencies_node"),
+    ("get_slowest_runs", lambda m: m.get_slowest_runs(),
+     "FROM run_profiles", "idx_run_profiles_wall"),
+    ("get_query_demand", lambda m: m.get_query_demand(),
+     "FROM conversations", "idx_conversations_timestamp"),
+    ("clear_old_cache", lambda m: m.clear_old_cache(),
+     "DELETE FROM query_cache", "idx_query_cache_last_accessed"),
+]
+
+
+@contextlib.contextmanager
+def _traced(statements: List[str]) -> Iterator[None]:
+    """Record every statement run on connections opened inside the block."""
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    sqlite3.connect = traced_connect
+    try:
+        yield
+    finally:
+        sqlite3.connect = connect
+
+
+def traced_statements(manager: MemoryManager, call: Callable[[MemoryManager], object]) -> List[str]:
+    """Distinct statements (whitespace collapsed) run by ``call(manager)``."""
+    statements = []
+    with _traced(statements):
+        call(manager)
+    return list(dict.fromkeys(' '.join(statement.split()) for statement in statements))
+
+
+def check_plan(manager: MemoryManager, conn: sqlite3.Connection, name: str,
+               call: Callable[[MemoryManager], object], fragment: str, index: str) -> List[str]:
+    """Failures of one check: statements containing ``fragment`` whose plan skips ``index``."""
+    statements = [s for s in traced_statements(manager, call) if fragment in s]
+    if not statements:
+        return [f"{name}: ran no statement containing {fragment!r}"]
+    failures = []
+    for statement in statements:
+        details = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+        if not any(index in detail for detail in details):
+            failures.append(f"{name}: expected {index}, got {details} for {statement}")
+    return failures
+
+
+@contextlib.contextmanager
+def scratch_manager(db_path: str = None) -> Iterator[Tuple[MemoryManager, sqlite3.Connection]]:
+    """A migrated copy of ``db_path`` (a fresh database if None), since the checked calls write."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'plans.db')
+        if db_path:
+            with sqlite3.connect(db_path) as source, sqlite3.connect(path) as copy:
+                source.backup(copy)
+        manager = MemoryManager(path)
+        conn = sqlite3.connect(path)
+        try:
+            yield manager, conn
+        finally:
+            conn.close()
+
+
+def check_query_plans(db_path: str = None) -> List[str]:
+    """Run every check on a copy of ``db_path``; returns a description of each failure."""
+    failures = []
+    with scratch_manager(db_path) as (manager, conn):
+        for check in PLAN_CHECKS:
+            failures.extend(check_plan(manager, conn, *check))
+    return failures
@@ -0,0 +1,241 @@
+"""Incrementally maintained statistics for the memory DB.
+
+Counters and hourly/daily rollups are kept current by triggers on the base
+tables, so reading statistics never scans them. If the counters ever drift
+(manual edits, a restored backup), rebuild them from the base tables:
+
+    python -m database.stats rebuild
+    python -m database.stats show
+"""
+import argparse
+import json
+import sqlite3
+from typing import List
+
+COUNTERS = (
+    'total_conversations',
+    'successful_conversations',
+    'total_research_queries',
+    'total_analyses',
+    'total_articles',
+    'article_quality_sum',
+    'article_quality_count',
+    'cached_queries',
+    'total_cache_hits',
+)
+
+# Rollup bucket expressions per granularity
+BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00', {ts})",
+    'day': "date({ts})",
+}
+
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_task_types (
+        task_type TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_rollups (
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        runs INTEGER NOT NULL DEFAULT 0,
+        successes INTEGER NOT NULL DEFAULT 0,
+        cache_hits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket)
+    )
+    """,
+]
+
+
+def _bump(name: str, delta: str) -> str:
+    return f"UPDATE stats_counters SET value = value + ({delta}) WHERE name = '{name}';"
+
+
+def _bump_task_type(task_type: str, delta: int) -> str:
+    return f"""
+        INSERT OR IGNORE INTO stats_task_types (task_type) SELECT {task_type} WHERE {task_type} IS NOT NULL;
+        UPDATE stats_task_types SET count = count + ({delta}) WHERE task_type = {task_type};
+    """
+
+
+def _bump_rollups(ts: str, **deltas: str) -> str:
+    sets = ', '.join(f"{column} = {column} + ({delta})" for column, delta in deltas.items())
+    statements = []
+    for granularity, bucket in BUCKETS.items():
+        bucket = bucket.format(ts=ts)
+        statements.append(f"""
+            INSERT OR IGNORE INTO stats_rollups (granularity, bucket) VALUES ('{granularity}', {bucket});
+            UPDATE stats_rollups SET {sets} WHERE granularity = '{granularity}' AND bucket = {bucket};
+        """)
+    return '\n'.join(statements)
+
+
+def _trigger(name: str, event: str, body: str) -> str:
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END"
+
+
+# Rollups record activity as it happens and are not reduced when rows are
+# later deleted (e.g. by retention); counters always match the live tables.
+STATS_TRIGGERS = [
+    _trigger('stats_conversations_insert', 'AFTER INSERT ON conversations FOR EACH ROW',
+             _bump('total_conversations', '1')
+             + _bump('successful_conversations', 'NEW.success = 1')
+             + _bump_task_type('NEW.task_type', 1)
+             + _bump_rollups('NEW.timestamp', runs='1', successes='NEW.success = 1')),
+    _trigger('stats_conversations_success', 'AFTER UPDATE OF success ON conversations FOR EACH ROW',
+             _bump('successful_conversations', '(NEW.success = 1) - (OLD.success = 1)')
+             + _bump_rollups('NEW.timestamp', successes='(NEW.success = 1) - (OLD.success = 1)')),
+    _trigger('stats_conversations_task_type',
+             'AFTER UPDATE OF task_type ON conversations FOR EACH ROW '
+             'WHEN NEW.task_type IS NOT OLD.task_type',
+             _bump_task_type('OLD.task_type', -1) + _bump_task_type('NEW.task_type', 1)),
+    _trigger('stats_conversations_delete', 'AFTER DELETE ON conversations FOR EACH ROW',
+             _bump('total_conversations', '-1')
+             + _bump('successful_conversations', '-(OLD.success = 1)')
+             + _bump_task_type('OLD.task_type', -1)),
+    _trigger('stats_research_insert', 'AFTER INSERT ON research_results FOR EACH ROW',
+             _bump('total_research_queries', '1')),
+    _trigger('stats_research_delete', 'AFTER DELETE ON research_results FOR EACH ROW',
+             _bump('total_research_queries', '-1')),
+    _trigger('stats_analyses_insert', 'AFTER INSERT ON analyses FOR EACH ROW',
+             _bump('total_analyses', '1')),
+    _trigger('stats_analyses_delete', 'AFTER DELETE ON analyses FOR EACH ROW',
+             _bump('total_analyses', '-1')),
+    _trigger('stats_articles_insert', 'AFTER INSERT ON articles FOR EACH ROW',
+             _bump('total_articles', '1')
+             + _bump('article_quality_sum', 'COALESCE(NEW.quality_score, 0)')
+             + _bump('article_quality_count', 'NEW.quality_score IS NOT NULL')),
+    _trigger('stats_articles_quality', 'AFTER UPDATE OF quality_score ON articles FOR EACH ROW',
+             _bump('article_quality_sum', 'COALESCE(NEW.quality_score, 0) - COALESCE(OLD.quality_score, 0)')
+             + _bump('article_quality_count', '(NEW.quality_score IS NOT NULL) - (OLD.quality_score IS NOT NULL)')),
+    _trigger('stats_articles_delete', 'AFTER DELETE ON articles FOR EACH ROW',
+             _bump('total_articles', '-1')
+             + _bump('article_quality_sum', '-COALESCE(OLD.quality_score, 0)')
+             + _bump('article_quality_count', '-(OLD.quality_score IS NOT NULL)')),
+    _trigger('stats_cache_insert', 'AFTER INSERT ON query_cache FOR EACH ROW',
+             _bump('cached_queries', '1')
+             + _bump('total_cache_hits', 'NEW.hit_count')),
+    _trigger('stats_cache_hits', 'AFTER UPDATE OF hit_count ON query_cache FOR EACH ROW',
+             _bump('total_cache_hits', 'NEW.hit_count - OLD.hit_count')
+             + _bump_rollups('CURRENT_TIMESTAMP', cache_hits='NEW.hit_count - OLD.hit_count')),
+    _trigger('stats_cache_delete', 'AFTER DELETE ON query_cache FOR EACH ROW',
+             _bump('cached_queries', '-1')
+             + _bump('total_cache_hits', '-OLD.hit_count')),
+]
+
+
+def create_schema(cursor: sqlite3.Cursor):
+    """Create the stats tables and triggers, seeding counters on first use."""
+    for statement in STATS_TABLES:
+        cursor.execute(statement)
+    for statement in STATS_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute("SELECT COUNT(*) FROM stats_counters")
+    if cursor.fetchone()[0] == 0:
+        # First time on this database: bring counters in line with existing rows
+        rebuild(cursor)
+
+
+def rebuild(cursor: sqlite3.Cursor):
+    """Recompute every counter and rollup from the base tables.
+
+    Per-bucket cache hits are not recorded in the base tables; they are
+    approximated by attributing each entry's hits to its last access.
+    """
+    cursor.execute("DELETE FROM stats_counters")
+    cursor.execute("DELETE FROM stats_task_types")
+    cursor.execute("DELETE FROM stats_rollups")
+
+    counter_queries = {
+        'total_conversations': "SELECT COUNT(*) FROM conversations",
+        'successful_conversations': "SELECT COUNT(*) FROM conversations WHERE success = 1",
+        'total_research_queries': "SELECT COUNT(*) FROM research_results",
+        'total_analyses': "SELECT COUNT(*) FROM analyses",
+        'total_articles': "SELECT COUNT(*) FROM articles",
+        'article_quality_sum': "SELECT COALESCE(SUM(quality_score), 0) FROM articles",
+        'article_quality_count': "SELECT COUNT(quality_score) FROM articles",
+        'cached_queries': "SELECT COUNT(*) FROM query_cache",
+        'total_cache_hits': "SELECT COALESCE(SUM(hit_count), 0) FROM query_cache",
+    }
+    for name in COUNTERS:
+        cursor.execute(f"INSERT INTO stats_counters (name, value) VALUES (?, ({counter_queries[name]}))", (name,))
+
+    cursor.execute("""
+        INSERT INTO stats_task_types (task_type, count)
+        SELECT task_type, COUNT(*) FROM conversations
+        WHERE task_type IS NOT NULL
+        GROUP BY task_type
+    """)
+
+    for granularity, bucket in BUCKETS.items():
+        cursor.execute(f"""
+            INSERT INTO stats_rollups (granularity, bucket, runs, successes)
+            SELECT '{granularity}', {bucket.format(ts='timestamp')}, COUNT(*), SUM(success = 1)
+            FROM conversations
+            GROUP BY 2
+        """)
+        cursor.execute(f"""
+            INSERT INTO stats_rollups (granularity, bucket, cache_hits)
+            SELECT '{granularity}', {bucket.format(ts='last_accessed')}, SUM(hit_count)
+            FROM query_cache
+            WHERE hit_count > 0
+            GROUP BY 2
+            ON CONFLICT (granularity, bucket) DO UPDATE SET cache_hits = excluded.cache_hits
+        """)
+
+
+def read_counters(cursor: sqlite3.Cursor) -> dict:
+    cursor.execute("SELECT name, value FROM stats_counters")
+    return dict(cursor.fetchall())
+
+
+def read_rollups(cursor: sqlite3.Cursor, granularity: str, limit: int) -> List[dict]:
+    if granularity not in BUCKETS:
+        raise ValueError(f"granularity must be one of {tuple(BUCKETS)}")
+    cursor.execute("""
+        SELECT bucket, runs, successes, cache_hits
+        FROM stats_rollups
+        WHERE granularity = ?
+        ORDER BY bucket DESC
+        LIMIT ?
+    """, (granularity, limit))
+    return [
+        {'bucket': r[0], 'runs': r[1], 'successes': r[2], 'cache_hits': r[3]}
+        for r in cursor.fetchall()
+    ]
+
+
+def main(argv=None):
+    from settings.logging_config import configure_logging
+    from .agent_memory import MemoryManager
+
+    parser = argparse.ArgumentParser(description="Memory DB statistics")
+    parser.add_argument("command", choices=("show", "rebuild"))
+    parser.add_argument("--db", default="memory/agent_memory.db", help="Path to the SQLite database")
+    parser.add_argument("--granularity", choices=tuple(BUCKETS), default="day")
+    parser.add_argument("--limit", type=int, default=14, help="Number of rollup buckets to show")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    memory = MemoryManager(args.db)
+    if args.command == "rebuild":
+        memory.rebuild_statistics()
+        print("Statistics rebuilt")
+
+    print(json.dumps({
+        'statistics': memory.get_statistics(),
+        'rollups': memory.get_rollups(args.granularity, args.limit),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Per-tenant memory databases.
+
+Each tenant's memory lives in its own SQLite file under ``base_dir``, so one
+tenant's writes never lock another's and similar-research lookups only see
+the tenant's own history. With ``shard_count`` set, tenants are hashed onto
+that many shard files instead; this bounds the number of files, but tenants
+in one shard share its history. Requests without a tenant use the default
+database, as before.
+
+Files are created (and migrated) on first use. At most ``pool_size``
+managers are kept open, least recently used first out; the default database
+is always kept. With the in-memory backend each tenant gets its own store,
+and stores are never evicted since they hold the only copy of the data.
+Retention caps are applied to a tenant's file when it is opened and then at
+most every ``retention_interval`` seconds.
+
+Admin commands (run from the research_agent directory):
+
+    python -m database.tenancy list
+    python -m database.tenancy query "SELECT COUNT(*) AS n FROM conversations"
+    python -m database.tenancy prune --max-conversations 5000 --max-age-days 90
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .agent_memory import MemoryManager
+from .backend import MemoryBackend, create_backend
+
+logger = logging.getLogger("tenancy")
+
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+DEFAULT_SHARD = 'default'
+
+
+class TenantRouter:
+    """Hands out the memory backend for a tenant id."""
+
+    def __init__(self, base_dir: str = 'memory/tenants', default_db_path: str = 'memory/agent_memory.db',
+                 shard_count: int = 0, pool_size: int = 16, max_conversations: int = 0,
+                 retention_days: float = 0, tenant_max_conversations: Dict[str, int] = None,
+                 retention_interval: float = 600, backend: str = 'sqlite', **manager_kwargs):
+        """``max_conversations``/``retention_days`` of 0 mean no cap.
+
+        ``tenant_max_conversations`` overrides the conversation cap per tenant
+        (per-tenant files only; a shard is capped as a whole). ``backend`` is
+        'sqlite' or 'memory' (see database.backend); remaining keyword
+        arguments are passed to every SQLite MemoryManager.
+        """
+        self.base_dir = base_dir
+        self.default_db_path = default_db_path
+        self.shard_count = shard_count
+        self.pool_size = pool_size
+        self.max_conversations = max_conversations
+        self.retention_days = retention_days
+        self.tenant_max_conversations = tenant_max_conversations or {}
+        self.retention_interval = retention_interval
+        self.manager_kwargs = manager_kwargs
+        self.backend = backend
+        self.default = create_backend(backend, default_db_path, **manager_kwargs)
+        self._pool: 'OrderedDict[str, MemoryBackend]' = OrderedDict()
+        self._pruned_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def shard_name(self, tenant_id: str) -> str:
+        """File stem holding a tenant's memory."""
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError(f"Invalid tenant id {tenant_id!r}: use up to 64 letters, digits, '_', '.' or '-'")
+        if self.shard_count > 0:
+            digest = hashlib.sha256(tenant_id.encode('utf-8')).hexdigest()
+            return f"shard-{int(digest, 16) % self.shard_count:03d}"
+        return f"tenant-{tenant_id}"
+
+    def path_for(self, tenant_id: Optional[str]) -> str:
+        if not tenant_id:
+            return self.default_db_path
+        return os.path.join(self.base_dir, f"{self.shard_name(tenant_id)}.db")
+
+    def for_tenant(self, tenant_id: Optional[str]) -> MemoryBackend:
+        """The tenant's memory backend, opening its database on first use."""
+        if not tenant_id:
+            return self.default
+        path = self.path_for(tenant_id)
+        with self._lock:
+            manager = self._pool.get(path)
+            if manager is not None:
+                self._pool.move_to_end(path)
+            else:
+                manager = create_backend(self.backend, path, **self.manager_kwargs)
+                self._pool[path] = manager
+                while self.backend == 'sqlite' and len(self._pool) > self.pool_size:
+                    evicted, _ = self._pool.popitem(last=False)
+                    logger.debug(f"Closed tenant database {evicted}")
+            due = time.monotonic() - self._pruned_at.get(path, float('-inf')) >= self.retention_interval
+            if due:
+                self._pruned_at[path] = time.monotonic()
+        if due:
+            self._apply_retention(manager, tenant_id)
+        return manager
+
+    def _retention_caps(self, tenant_id: Optional[str]) -> Tuple[Optional[int], Optional[float]]:
+        max_conversations = self.max_conversations
+        if tenant_id and self.shard_count <= 0:
+            max_conversations = self.tenant_max_conversations.get(tenant_id, max_conversations)
+        return max_conversations or None, self.retention_days or None
+
+    def _apply_retention(self, manager: MemoryBackend, tenant_id: Optional[str]) -> int:
+        max_conversations, retention_days = self._retention_caps(tenant_id)
+        if max_conversations is None and retention_days is None:
+            return 0
+        try:
+            return manager.prune_conversations(max_conversations, retention_days)
+        except sqlite3.Error as e:
+            logger.warning(f"Retention on {self.path_for(tenant_id)} failed: {e}")
+            return 0
+
+    def shard_paths(self) -> Dict[str, str]:
+        """Every existing memory database: the default one and each tenant/shard file."""
+        paths = {DEFAULT_SHARD: self.default_db_path} if os.path.exists(self.default_db_path) else {}
+        for path in sorted(glob.glob(os.path.join(self.base_dir, '*.db'))):
+            paths[os.path.splitext(os.path.basename(path))[0]] = path
+        return paths
+
+    def query_all(self, sql: str, params: tuple = ()) -> List[Dict]:
+        """Run a read-only query on every database; each row gets a ``shard`` field."""
+        rows = []
+        for shard, path in self.shard_paths().items():
+            conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            try:
+                cursor = conn.execute(sql, params)
+                columns = [d[0] for d in cursor.description]
+                rows.extend({'shard': shard, **dict(zip(columns, row))} for row in cursor.fetchall())
+            finally:
+                conn.close()
+        return rows
+
+    def prune_all(self, max_conversations: int = None, max_age_days: float = None) -> Dict[str, int]:
+        """Apply retention caps to every tenant database (not the default one)."""
+        deleted = {}
+        for shard, path in self.shard_paths().items():
+            if shard == DEFAULT_SHARD:
+                continue
+            deleted[shard] = MemoryManager(path, **self.manager_kwargs).prune_conversations(
+                max_conversations, max_age_days
+            )
+        return deleted
+
+
+def main(argv=None):
+    from settings.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Inspect and maintain per-tenant memory databases")
+    parser.add_argument("--dir", default="memory/tenants", help="Directory of the tenant databases")
+    parser.add_argument("--db", default="memory/agent_memory.db", help="Default (no tenant) database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List databases with their size and conversation count")
+    query_parser = sub.add_parser("query", help="Run a read-only SQL query on every database")
+    query_parser.add_argument("sql")
+    prune_parser = sub.add_parser("prune", help="Apply retention caps to every tenant database")
+    prune_parser.add_argument("--max-conversations", type=int, help="Keep at most this many conversations")
+    prune_parser.add_argument("--max-age-days", type=float, help="Delete conversations older than this")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    router = TenantRouter(base_dir=args.dir, default_db_path=args.db)
+    if args.command == "list":
+        counts = {row['shard']: row for row in router.query_all(
+            "SELECT COUNT(*) AS conversations, MAX(timestamp) AS last_activity FROM conversations"
+        )}
+        for shard, path in router.shard_paths().items():
+            print(json.dumps({'shard': shard, 'path': path, 'bytes': os.path.getsize(path), **counts[shard]}))
+    elif args.command == "query":
+        for row in router.query_all(args.sql):
+            print(json.dumps(row, default=str))
+    else:
+        if args.max_conversations is None and args.max_age_days is None:
+            parser.error("prune needs --max-conversations and/or --max-age-days")
+        print(json.dumps(router.prune_all(args.max_conversations, args.max_age_days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,182 @@
-import streamlit as st
-from orchestrator import  task_classifier
-st.title("Research Agent")
-st.divider()
-st.markdown("This is the Research Agent application.")
-user_input = st.text_area("Enter your research query here:")
-
+"""Streamlit front end for the research agent.
+
+    streamlit run main.py
+
+The compiled graphs, their clients and the memory DB are built once per
+server process (st.cache_resource) and shared by every session. Finished
+runs are kept in st.session_state, so widget interactions and reruns show
+the stored result instead of running the agents again.
+"""
+import asyncio
+import queue
+import threading
+
+import streamlit as st
+
+from settings.logging_config import configure_logging
+
+# Once per server process; later script reruns are no-ops
+configure_logging()
+
+# Labels for the orchestrator nodes shown in the progress panel
+NODE_LABELS = {
+    'task_classifier': 'Classified the task',
+    'search_node': 'Research finished',
+    'analyse_node': 'Analysis finished',
+    'writer_node': 'Article written',
+    'analyse_write_node': 'Analysis and article finished',
+    'finish_node': 'Run recorded',
+}
+
+@st.cache_resource
+def get_app():
+    from orchestrator import app
+    return app
+
+
+@st.cache_resource
+def get_memory():
+    # Same MemoryManager the orchestrator writes to
+    from orchestrator import memory
+    return memory
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived loop for all runs, so async clients are never bound to a closed loop."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name='orchestrator-loop', daemon=True).start()
+    return loop
+
+
+def stream_run(state: dict):
+    """Run the orchestrator on the shared loop and yield its (namespace, mode, chunk) events here.
+
+    Subgraph events are included, since the writer graph's tokens come from
+    inside it. Events are handed over through a queue so all rendering stays
+    on the Streamlit script thread.
+    """
+    events = queue.Queue()
+
+    async def produce():
+        try:
+            async for event in get_app().astream(state, stream_mode=['updates', 'messages'], subgraphs=True):
+                events.put(event)
+        except Exception as e:
+            events.put(((), 'error', e))
+        finally:
+            events.put(None)
+
+    asyncio.run_coroutine_threadsafe(produce(), get_event_loop())
+    while (event := events.get()) is not None:
+        yield event
+
+
+def run_query(user_query: str, user_data: str, bypass_cache: bool) -> dict:
+    """Run one query, rendering progress and the article as it streams in."""
+    from agents.writer_agent import article_part
+
+    state = {
+        'user_query': user_query,
+        'task_type': None,
+        'user_provided_data': user_data or None,
+        'research_result': None,
+        'analysis': None,
+        'final_article': None,
+        'agents_to_run': [],
+        'completed_agents': [],
+        'bypass_cache': bypass_cache,
+    }
+    run = {'article': '', 'served_from_cache': False, 'served_stale': False, 'task_type': None, 'steps': [],
+           'error': None}
+
+    status = st.status('Running agents...', expanded=True)
+    article_box = st.empty()
+    # Article parts are written concurrently; each one's text so far, shown in article order
+    parts = {}
+
+    for namespace, mode, chunk in stream_run(state):
+        if mode == 'error':
+            run['error'] = str(chunk)
+            break
+
+        if mode == 'messages':
+            message, metadata = chunk
+            part = article_part(metadata.get('tags'))
+            if part is not None and isinstance(message.content, str):
+                parts[part] = parts.get(part, '') + message.content
+                article_box.markdown('\n\n'.join(parts[i] for i in sorted(parts)))
+            continue
+
+        # 'updates' of the writer's inner nodes are not steps of the run
+        if namespace:
+            continue
+
+        # 'updates': one entry per finished node
+        for node, update in chunk.items():
+            update = update or {}
+            step = NODE_LABELS.get(node, node)
+            if node == 'task_classifier' and update.get('task_type'):
+                step += f" ({update['task_type']})"
+                run['task_type'] = update['task_type']
+            run['steps'].append(step)
+            status.write(f'✅ {step}')
+            if update.get('served_from_cache'):
+                run['served_from_cache'] = True
+            if update.get('served_stale'):
+                run['served_stale'] = True
+            if update.get('final_article'):
+                run['article'] = update['final_article']
+
+    if run['error']:
+        status.update(label='Run failed', state='error')
+    else:
+        status.update(label='Done', state='complete', expanded=False)
+    article_box.empty()
+    return run
+
+
+def show_run(run: dict):
+    if run['error']:
+        st.error(f"Run failed: {run['error']}")
+        return
+    if run['served_from_cache']:
+        st.success('⚡ Served from cache - no agents were run')
+    elif run['task_type']:
+        st.caption(f"Task type: {run['task_type']}")
+    if run['served_stale']:
+        st.warning('A provider is unavailable: parts of this answer come from earlier runs and may be out of date')
+    with st.expander('Steps', expanded=False):
+        for step in run['steps']:
+            st.write(f'✅ {step}')
+    st.markdown(run['article'] or '_No article was produced for this query._')
+
+
+st.set_page_config(page_title='Research Agent')
+st.title("Research Agent")
+st.divider()
+st.markdown("This is the Research Agent application.")
+
+# Finished runs by (query, data), kept across reruns of this session
+if 'runs' not in st.session_state:
+    st.session_state.runs = {}
+
+user_input = st.text_area("Enter your research query here:")
+user_data = st.text_area("Optional data to analyze:", height=100)
+bypass_cache = st.checkbox("Ignore cached results")
+submitted = st.button("Run", type="primary", disabled=not user_input.strip())
+
+key = (user_input.strip(), user_data.strip())
+previous = st.session_state.runs.get(key)
+if submitted and (bypass_cache or previous is None or previous['error']):
+    st.session_state.runs[key] = run_query(key[0], key[1], bypass_cache)
+
+if key in st.session_state.runs:
+    show_run(st.session_state.runs[key])
+
+with st.sidebar:
+    st.header("Memory")
+    stats = get_memory().get_statistics()
+    st.metric("Conversations", stats.get('total_conversations', 0))
+    st.metric("Cached queries", stats.get('cached_queries', 0))
+    st.metric("Cache hits", stats.get('total_cache_hits', 0))
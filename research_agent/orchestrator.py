@@ -1,374 +1,860 @@
-from typing import TypedDict, Optional, List
-from agents.llm import llm
-from langgraph.graph import StateGraph, END
-import logging
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage
-import asyncio
-from agents.research_agent import app as research_app
-from agents.analyzer_agent import app as analyzer_app
-from agents.writer_agent import app as writer_app
-from database.agent_memory import MemoryManager
-from langsmith import Client, traceable
-from settings.config import langsmith_key
-
-
-memory = MemoryManager()
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger('orchestrator')
-
-class OrchestratorState(TypedDict):
-    user_query: str
-    task_type: Optional[str]
-    user_provided_data: Optional[str]
-    research_result: Optional[str]
-    analysis: Optional[str]
-    final_article: Optional[str]
-    agents_to_run: List[str]
-    completed_agents: List[str]
-    conversation_id: Optional[int]
-
-@traceable(name="task_classifier")
-async def task_classifier(state: OrchestratorState) -> dict:
-    """Decides which agents to run based on user query"""
-    logger.info('Classifying task...')
-     # Start a new conversation in memory
-    conv_id = memory.start_conversation(
-        user_query=state['user_query'],
-        user_provided_data=state.get('user_provided_data')
-    )
-    
-    # Check if we have similar past queries (optional speedup)
-    cached_result = memory.get_cached_result(state['user_query'])
-    if cached_result:
-        logger.info('Found cached resul for similar query')
-
-
-    classifier_prompt = f"""
-    Analyze this user query and determine the task type:
-    
-    Query: {state['user_query']}
-    User provided data: {state.get('user_provided_data', 'None')}
-    
-    Task types:
-    - full_research: Need to research, analyze, and write
-    - quick_research: Need to research and write (skip analysis)
-    - research_only: Only need research
-    - analyze_provided: User provided data, analyze and write
-    - write_only: User provided analysis, just write
-    
-    Respond with ONLY the task type.
-    """
-    
-    try:
-        response = await llm.ainvoke([HumanMessage(content=classifier_prompt)])
-        task_type = response.content.strip().lower()
-        
-        # Map task type to agents
-        task_mapping = {
-            'full_research': ['research', 'analyzer', 'writer'],
-            'quick_research': ['research', 'writer'],
-            'research_only': ['research'],
-            'analyze_provided': ['analyzer', 'writer'],
-            'write_only': ['writer']
-        }
-        
-        agents = task_mapping.get(task_type, ['research', 'analyzer', 'writer'])
-        
-        logger.info(f'Task type: {task_type}, Agents: {agents}')
-        
-        return {
-            'task_type': task_type,
-            'agents_to_run': agents,
-            'completed_agents': [],
-             'conversation_id': conv_id
-        }
-    except Exception as e:
-        logger.error(f'Error in classifier: {e}')
-        # Default to full research on error
-        return {
-            'task_type': 'full_research',
-            'agents_to_run': ['research', 'analyzer', 'writer'],
-            'completed_agents': []
-        }
-
-@traceable(name="search_node")
-async def search_node(state: OrchestratorState) -> dict:
-    '''Perform research based on user query'''
-    logger.info('Starting research agent...')
-
-     # Check for similar past research to help the agent
-    similar_research = memory.get_similar_research(state['user_query'], limit=3)
-    
-    context_hint = ""
-    if similar_research:
-        context_hint = "\n\nPast related research found:\n"
-        for sr in similar_research:
-            context_hint += f"- Query: {sr['query']}\n  Key points: {sr['results'][:200]}...\n"
-
-    try:
-        search_result = await research_app.ainvoke({
-            'messages': [HumanMessage(content=state.get('user_query'))],
-            'research_result': None
-        })
-        
-        # Extract the actual research result string
-        result = search_result.get('research_result', 'No research result')
-        
-        # Save research to memory
-        if state.get('conversation_id'):
-            memory.save_research(
-                conversation_id=state['conversation_id'],
-                query=state['user_query'],
-                results=result,
-                sources=[]  # You can extract sources from research_result if needed
-            )
-            
-            # Save successful pattern as learning
-            memory.save_learning(
-                agent_name='research',
-                lesson=f'Successfully researched: {state["user_query"][:100]}',
-                context=f'Returned {len(result)} characters of data',
-                success_pattern=True
-            )
-        
-        # Update completed agents
-        completed = state.get('completed_agents', [])
-        completed.append('research')
-        
-        logger.info('Research completed')
-        return {
-            'research_result': result,
-            'completed_agents': completed
-        }
-    except Exception as e:
-        logger.error(f'Error calling search agent: {e}')
-        # Log failure as learning
-        if state.get('conversation_id'):
-            memory.save_learning(
-                agent_name='research',
-                lesson=f'Failed to research: {str(e)}',
-                context=state['user_query'],
-                success_pattern=False
-            )
-        return {
-            'research_result': f"Research failed: {str(e)}",
-            'completed_agents': state.get('completed_agents', []) + ['research']
-        }
-
-@traceable(name="analyse_node")
-async def analyse_node(state: OrchestratorState) -> dict:
-    """Analyzes research data or provided data"""
-    logger.info('Starting analysis agent...')
-    
-    # Determine input
-    if state.get('research_result'):
-        input_text = state['research_result']
-    elif state.get('user_provided_data'):
-        input_text = state['user_provided_data']
-    else:
-        input_text = state['user_query']
-    # Get past analyses on similar topics for context
-    past_analyses = memory.get_past_analyses(state['user_query'], limit=2)
-    
-    context_hint = ""
-    if past_analyses:
-        context_hint = "\n\nPrevious analyses on similar topics:\n"
-        for pa in past_analyses:
-            context_hint += f"- {pa['original_query']}\n  Key insights: {', '.join(pa['key_insights'][:3]) if pa['key_insights'] else 'N/A'}\n"
-    
-    try:
-        analysis_result = await analyzer_app.ainvoke({
-            'message': [HumanMessage(content=input_text)],
-            'analysis': None
-        })
-        
-        # Extract analysis string
-        result = analysis_result.get('analysis', 'No analysis result')
-        
-        # Save analysis to memory
-        if state.get('conversation_id'):
-            # Extract key insights (simple extraction - you can make this smarter)
-            key_insights = []
-            if '**Finding' in result or '## Key Findings' in result:
-                # Extract first few lines as insights
-                lines = result.split('\n')
-                key_insights = [line.strip() for line in lines if line.strip() and len(line) > 20][:5]
-            
-            memory.save_analysis(
-                conversation_id=state['conversation_id'],
-                analysis=result,
-                key_insights=key_insights
-            )
-            
-            # Save successful pattern
-            memory.save_learning(
-                agent_name='analyzer',
-                lesson=f'Successfully analyzed {len(input_text)} chars of data',
-                context=state['user_query'][:100],
-                success_pattern=True
-            )
-
-        # Update completed agents
-        completed = state.get('completed_agents', [])
-        completed.append('analyzer')
-        
-        logger.info('Analysis completed')
-        return {
-            'analysis': result,
-            'completed_agents': completed
-        }
-    except Exception as e:
-        logger.error(f'Error analyzing data: {e}')
-        # Log failure
-        if state.get('conversation_id'):
-            memory.save_learning(
-                agent_name='analyzer',
-                lesson=f'Analysis failed: {str(e)}',
-                context=state['user_query'],
-                success_pattern=False
-            )
-        return {
-            'analysis': f"Analysis failed: {str(e)}",
-            'completed_agents': state.get('completed_agents', []) + ['analyzer']
-        }
-
-@traceable(name="writer_node")
-async def writer_node(state: OrchestratorState) -> dict:
-    '''Writes the final report'''
-    logger.info('Starting writing agent...')
-    
-    # Determine input
-    if state.get('research_result'):
-        input_text = state['research_result']
-    else:
-        input_text = state['user_query']
-    
-    # Get best past articles for style reference
-    best_articles = memory.get_best_articles(topic=state['user_query'], limit=2)
-    
-    context_hint = ""
-    if best_articles:
-        context_hint = "\n\nHigh-quality past articles for style reference:\n"
-        for article in best_articles:
-            context_hint += f"- Quality: {article['quality_score']}, Words: {article['word_count']}\n"
-            context_hint += f"  Preview: {article['article'][:300]}...\n"
-    
-    try:
-        writer_result = await writer_app.ainvoke({
-            'message': [HumanMessage(content=input_text)],
-            'article': None
-        })
-        
-        # Extract article string
-        result = writer_result.get('article', 'No article generated')
-
-        
-        # Save article to memory
-        if state.get('conversation_id'):
-            memory.save_article(
-                conversation_id=state['conversation_id'],
-                article=result,
-            )
-            
-            # Save successful pattern
-            memory.save_learning(
-                agent_name='writer',
-                context=state['user_query'][:100],
-                success_pattern=True,
-                lesson=f'Wrote article of length {len(result)}'
-            )
-            
-            # Cache the result for similar future queries
-            memory.cache_result(state['user_query'], result)
-        
-        # Update completed agents
-        completed = state.get('completed_agents', [])
-        completed.append('writer')
-        
-        logger.info('Writing completed')
-        return {
-            'final_article': result,
-            'completed_agents': completed
-        }
-    except Exception as e:
-        logger.error(f'Error writing article: {e}')
-
-         # Log failure
-        if state.get('conversation_id'):
-            memory.save_learning(
-                agent_name='writer',
-                lesson=f'Writing failed: {str(e)}',
-                context=state['user_query'],
-                success_pattern=False
-            )
-        return {
-            'final_article': f"Writing failed: {str(e)}",
-            'completed_agents': state.get('completed_agents', []) + ['writer']
-        }
-
-@traceable(name="route_next_agent")
-def route_next_agent(state: OrchestratorState) -> str:
-    """Routes to the next agent or END"""
-    agents_to_run = state.get('agents_to_run', [])
-    completed = state.get('completed_agents', [])
-    
-    logger.info(f'Routing - To run: {agents_to_run}, Completed: {completed}')
-    
-    # Find next agent
-    for agent in agents_to_run:
-        if agent not in completed:
-            logger.info(f'Routing to: {agent}')
-            return agent
-    
-    # All done
-    logger.info('All agents completed, ending')
-    return 'end'
-
-
-# Build graph
-graph = StateGraph(OrchestratorState)
-graph.add_node('task_classifier', task_classifier)
-graph.add_node('search_node', search_node)
-graph.add_node('analyse_node', analyse_node)
-graph.add_node('writer_node', writer_node)
-
-graph.set_entry_point('task_classifier')
-
-# Universal routing from any node
-routing_map = {
-    'research': 'search_node',
-    'analyzer': 'analyse_node',
-    'writer': 'writer_node',
-    'end': END
-}
-
-graph.add_conditional_edges('task_classifier', route_next_agent, routing_map)
-graph.add_conditional_edges('search_node', route_next_agent, routing_map)
-graph.add_conditional_edges('analyse_node', route_next_agent, routing_map)
-graph.add_conditional_edges('writer_node', route_next_agent, routing_map)
-
-# Compile
-app = graph.compile()
-
-# Test
-if __name__ == "__main__":
-    import asyncio
-    
-    test_state = {
-        'user_query': "Write a detailed article on the impacts of climate change on coastal cities.",
-        'task_type': None,
-        'user_provided_data': None,
-        'research_result': None,
-        'analysis': None,
-        'final_article': None,
-        'agents_to_run': [],
-        'completed_agents': []
-    }
-    
-    result = asyncio.run(app.ainvoke(test_state))
-    
-    print("\n=== Results ===")
-    print(f"Task Type: {result['task_type']}")
-    print(f"Agents Run: {result['completed_agents']}")
+from typing import TypedDict, Optional, List, Dict
+from agents.llm import get_llm
+from langgraph.graph import StateGraph, END
+import logging
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage
+import asyncio
+import contextvars
+import functools
+import time
+from agents.research_agent import app as research_app
+from agents.analyzer_agent import app as analyzer_app, stream_sections
+from agents.writer_agent import app as writer_app, write_section
+from database.tenancy import TenantRouter
+from plan_optimizer import optimize_plan
+from profiling import ProfiledApp, current_profile, span
+from settings.logging_config import configure_logging, log_context
+from langsmith import Client, traceable
+from settings.config import (
+    langsmith_key,
+    research_max_age_hours,
+    research_reuse_min_relevance,
+    research_context_min_relevance,
+    memory_compression,
+    memory_compression_min_bytes,
+    request_deadline_seconds,
+    research_max_turns,
+    research_time_budget_seconds,
+    plan_optimizer_enabled,
+    pipelined_writing,
+    profile_sample_rate,
+    memory_backend,
+    memory_tenant_dir,
+    memory_tenant_shards,
+    memory_tenant_pool_size,
+    memory_tenant_max_conversations,
+    memory_tenant_retention_days,
+    memory_tenant_limits,
+    stale_fallback_max_age_hours,
+    query_cache_soft_ttl_hours,
+    query_cache_hard_ttl_hours,
+    query_cache_refresh_lease_seconds,
+)
+
+
+tenants = TenantRouter(
+    backend=memory_backend,
+    base_dir=memory_tenant_dir,
+    shard_count=memory_tenant_shards,
+    pool_size=memory_tenant_pool_size,
+    max_conversations=memory_tenant_max_conversations,
+    retention_days=memory_tenant_retention_days,
+    tenant_max_conversations=memory_tenant_limits,
+    compression_codec=memory_compression,
+    compression_min_bytes=memory_compression_min_bytes
+)
+# Memory of requests without a tenant_id
+memory = tenants.default
+
+logger = logging.getLogger('orchestrator')
+
+classifier_llm = get_llm('classifier')
+
+# How much of each prior research result is passed to the research agent
+PRIOR_RESEARCH_CHARS = 1500
+
+# Node durations assumed until enough runs have been measured (seconds)
+DEFAULT_NODE_LATENCY = {
+    'search_node': 45.0,
+    'analyse_node': 20.0,
+    'writer_node': 25.0,
+    'analyse_write_node': 30.0,
+}
+# Never give the research agent less time than this, even under a tight deadline
+MIN_RESEARCH_SECONDS = 10
+# Article length asked for when the writer has to hurry
+DEFAULT_ARTICLE_WORDS = 1200
+MIN_ARTICLE_WORDS = 200
+# Node results starting with these are failures (see the except branches below)
+FAILURE_PREFIXES = ('Research failed:', 'Analysis failed:', 'Writing failed:')
+# Query cache TTLs for entries without their own (None: no limit)
+CACHE_SOFT_TTL_HOURS = query_cache_soft_ttl_hours or None
+CACHE_HARD_TTL_HOURS = query_cache_hard_ttl_hours or None
+# origin of background runs refreshing stale cache entries
+REFRESH_ORIGIN = 'cache_refresh'
+
+class OrchestratorState(TypedDict):
+    user_query: str
+    task_type: Optional[str]
+    user_provided_data: Optional[str]
+    research_result: Optional[str]
+    analysis: Optional[str]
+    final_article: Optional[str]
+    agents_to_run: List[str]
+    completed_agents: List[str]
+    conversation_id: Optional[int]
+    # Per-request freshness requirement for reusing stored research (hours, 0 disables reuse)
+    max_research_age_hours: Optional[float]
+    # Skip the query cache and always run the agents
+    bypass_cache: Optional[bool]
+    # Set when the final article came straight from the query cache
+    served_from_cache: Optional[bool]
+    # Set when a failed agent's output was replaced by a stored (possibly outdated) one
+    served_stale: Optional[bool]
+    # Latency budget for this request in seconds (falls back to REQUEST_DEADLINE_SECONDS)
+    deadline_seconds: Optional[float]
+    # Absolute deadline (time.time()), set by the classifier from deadline_seconds
+    deadline: Optional[float]
+    # Profile this run (None: sampled at PROFILE_SAMPLE_RATE)
+    profile: Optional[bool]
+    # Set by background jobs (e.g. 'cache_warmer') so their runs are not counted as user demand
+    origin: Optional[str]
+    # Selects the tenant's memory database (None: the default database)
+    tenant_id: Optional[str]
+
+
+def _time_left(state: OrchestratorState) -> Optional[float]:
+    """Seconds until the request's deadline, or None without a deadline"""
+    deadline = state.get('deadline')
+    return None if deadline is None else deadline - time.time()
+
+
+def _memory(state: OrchestratorState):
+    """Memory backend of the request's tenant"""
+    return tenants.for_tenant(state.get('tenant_id'))
+
+
+def _expected_latency(state: OrchestratorState, node: str) -> float:
+    """Measured p75 duration of a node, or the default before any history exists"""
+    estimate = _memory(state).get_latency_estimate(node)
+    return estimate if estimate is not None else DEFAULT_NODE_LATENCY[node]
+
+
+def _degrade(state: OrchestratorState, decision: str):
+    """Log a deadline degradation and record it on the conversation"""
+    logger.warning(f'Deadline: {decision}')
+    if state.get('conversation_id'):
+        _memory(state).record_degradation(state['conversation_id'], decision)
+
+
+def _timed(name: str, node):
+    """Wrap a node so its duration is recorded for deadline planning"""
+    @functools.wraps(node)
+    async def wrapper(state: OrchestratorState) -> dict:
+        started = time.monotonic()
+        update = {}
+        try:
+            with span(f'node:{name}'), log_context(conversation_id=state.get('conversation_id'),
+                                                   tenant_id=state.get('tenant_id'), node=name):
+                update = await node(state)
+            return update
+        except BaseException:
+            # The run stops here, so finish_node never records its end
+            try:
+                _end_conversation({**state, **(update or {})}, failed=True)
+            except Exception as e:
+                logger.warning(f'Could not record the end of the conversation: {e}')
+            raise
+        finally:
+            merged = {**state, **(update or {})}
+            success = bool(update) and not any(
+                isinstance(value, str) and value.startswith(FAILURE_PREFIXES) for value in update.values()
+            )
+            duration = time.monotonic() - started
+            logger.info(f"{name} {'finished' if success else 'failed'}", extra={
+                'conversation_id': merged.get('conversation_id'), 'node': name, 'duration': duration
+            })
+            _memory(state).record_node_latency(
+                name,
+                duration,
+                conversation_id=merged.get('conversation_id'),
+                task_type=merged.get('task_type'),
+                success=success
+            )
+    return wrapper
+
+# Background refreshes running in this process, by tenant and cache key; also keeps the tasks referenced
+_refreshes: Dict[tuple, asyncio.Task] = {}
+
+
+def _schedule_refresh(state: OrchestratorState):
+    """Start one background run recomputing a stale cached article, unless one is already running.
+
+    The memory claim deduplicates refreshes across processes; the run has
+    its own conversation, profile and log context.
+    """
+    query = state['user_query']
+    key = (state.get('tenant_id'), query.lower().strip())
+    if key in _refreshes:
+        return
+    if not _memory(state).claim_cache_refresh(query, query_cache_refresh_lease_seconds):
+        logger.debug(f"Refresh of '{query[:60]}' already claimed")
+        return
+    logger.info(f"Refreshing stale cached result for '{query[:60]}' in the background")
+    task = asyncio.get_running_loop().create_task(_refresh_cached(query, state.get('tenant_id')),
+                                                  context=contextvars.Context())
+    _refreshes[key] = task
+    task.add_done_callback(lambda _: _refreshes.pop(key, None))
+
+
+async def _refresh_cached(query: str, tenant_id: Optional[str]):
+    """Run the agents for a query; the writer replaces the cache entry when it succeeds"""
+    try:
+        result = await app.ainvoke({
+            'user_query': query,
+            'tenant_id': tenant_id,
+            'bypass_cache': True,
+            'origin': REFRESH_ORIGIN,
+            'task_type': None,
+            'user_provided_data': None,
+            'research_result': None,
+            'analysis': None,
+            'final_article': None,
+            'agents_to_run': [],
+            'completed_agents': []
+        })
+    except Exception as e:
+        logger.warning(f"Background refresh of '{query[:60]}' failed: {e}")
+        return
+    article = result.get('final_article') or ''
+    if result.get('served_stale') or not article or article.startswith(FAILURE_PREFIXES):
+        # The claim lapses after the lease, so a later request retries
+        logger.warning(f"Background refresh of '{query[:60]}' produced no new article")
+    else:
+        logger.info(f"Refreshed cached result for '{query[:60]}'")
+
+@traceable(name="task_classifier")
+async def task_classifier(state: OrchestratorState) -> dict:
+    """Decides which agents to run based on user query"""
+    logger.info('Classifying task...')
+    # The deadline clock starts when the request enters the graph
+    deadline = state.get('deadline')
+    budget = state.get('deadline_seconds') or request_deadline_seconds
+    if deadline is None and budget > 0:
+        deadline = time.time() + budget
+     # Start a new conversation in memory
+    conv_id = _memory(state).start_conversation(
+        user_query=state['user_query'],
+        user_provided_data=state.get('user_provided_data'),
+        origin=state.get('origin')
+    )
+    profile = current_profile()
+    if profile is not None:
+        profile.conversation_id = conv_id
+        profile.tenant_id = state.get('tenant_id')
+    
+    # A cached article for the same query answers it without running any agent;
+    # a stale one is still served and refreshed in the background, an expired one is recomputed
+    cached = None
+    if not state.get('bypass_cache'):
+        cached = _memory(state).lookup_cache(state['user_query'], CACHE_SOFT_TTL_HOURS, CACHE_HARD_TTL_HOURS)
+    if cached and cached['freshness'] == 'expired':
+        logger.info(f"Cached result is {cached['age_hours']:.0f}h old, past its hard TTL; running agents")
+    elif cached:
+        logger.info(f"Found {cached['freshness']} cached result for this query, skipping agents")
+        if cached['freshness'] == 'stale':
+            _schedule_refresh(state)
+        return {
+            'final_article': cached['result'],
+            'agents_to_run': [],
+            'completed_agents': [],
+            'conversation_id': conv_id,
+            'served_from_cache': True,
+            'deadline': deadline
+        }
+
+    classifier_prompt = f"""
+    Analyze this user query and determine the task type:
+    
+    Query: {state['user_query']}
+    User provided data: {state.get('user_provided_data', 'None')}
+    
+    Task types:
+    - full_research: Need to research, analyze, and write
+    - quick_research: Need to research and write (skip analysis)
+    - research_only: Only need research
+    - analyze_provided: User provided data, analyze and write
+    - write_only: User provided analysis, just write
+    
+    Respond with ONLY the task type.
+    """
+    
+    try:
+        response = await classifier_llm.ainvoke([HumanMessage(content=classifier_prompt)])
+        task_type = response.content.strip().lower()
+        
+        # Map task type to agents
+        task_mapping = {
+            'full_research': ['research', 'analyzer', 'writer'],
+            'quick_research': ['research', 'writer'],
+            'research_only': ['research'],
+            'analyze_provided': ['analyzer', 'writer'],
+            'write_only': ['writer']
+        }
+        
+        if task_type not in task_mapping:
+            task_type = 'full_research'
+        agents = task_mapping[task_type]
+        _memory(state).set_task_type(conv_id, task_type)
+
+        update = {
+            'task_type': task_type,
+            'completed_agents': [],
+            'conversation_id': conv_id,
+            'deadline': deadline
+        }
+
+        # Swap in a cheaper equivalent plan when run history supports it
+        if plan_optimizer_enabled:
+            try:
+                choice = optimize_plan(_memory(state), state['user_query'], task_type, agents,
+                                       state.get('user_provided_data'))
+                if choice['reason']:
+                    logger.info(f"Plan optimizer: {choice['reason']}")
+                    agents = choice['agents']
+                    if choice['analysis']:
+                        update['analysis'] = choice['analysis']
+            except Exception as e:
+                logger.warning(f'Plan optimizer failed, keeping default plan: {e}')
+
+        logger.info(f'Task type: {task_type}, Agents: {agents}')
+        update['agents_to_run'] = agents
+        return update
+    except Exception as e:
+        logger.error(f'Error in classifier: {e}')
+        # Default to full research on error
+        return {
+            'task_type': 'full_research',
+            'agents_to_run': ['research', 'analyzer', 'writer'],
+            'completed_agents': [],
+            'conversation_id': conv_id,
+            'deadline': deadline
+        }
+
+@traceable(name="search_node")
+async def search_node(state: OrchestratorState) -> dict:
+    '''Perform research based on user query'''
+    logger.info('Starting research agent...')
+
+    # Per-request freshness requirement, falling back to the configured default
+    max_age = state.get('max_research_age_hours')
+    if max_age is None:
+        max_age = research_max_age_hours
+
+    # Check for fresh past research covering this query
+    reusable = []
+    if max_age > 0:
+        reusable = _memory(state).get_reusable_research(
+            state['user_query'],
+            max_age_hours=max_age,
+            min_relevance=research_context_min_relevance,
+            limit=3
+        )
+
+    # Good enough to use directly - skip the web search entirely
+    if reusable and reusable[0]['relevance'] >= research_reuse_min_relevance:
+        best = reusable[0]
+        logger.info(f"Reusing research from {best['timestamp']} (relevance {best['relevance']})")
+        if state.get('conversation_id'):
+            _memory(state).record_research_reuse(state['conversation_id'], best['id'])
+        completed = state.get('completed_agents', [])
+        completed.append('research')
+        return {
+            'research_result': best['results'],
+            'completed_agents': completed
+        }
+
+    # Otherwise hand partial matches to the agent as prior context
+    context_hint = ""
+    if reusable:
+        context_hint = "\n\nPrior research (use it and only search for what is missing or outdated):\n"
+        for sr in reusable:
+            context_hint += (
+                f"- Query: {sr['query']} (collected {sr['timestamp']} UTC)\n"
+                f"  Findings: {sr['results'][:PRIOR_RESEARCH_CHARS]}...\n"
+            )
+
+    # Under a deadline, leave enough time for the agents that run after research
+    budgets = {}
+    time_left = _time_left(state)
+    if time_left is not None:
+        reserve = sum(
+            _expected_latency(state, node)
+            for agent, node in (('analyzer', 'analyse_node'), ('writer', 'writer_node'))
+            if agent in state.get('agents_to_run', [])
+        )
+        research_time = max(time_left - reserve, MIN_RESEARCH_SECONDS)
+        if research_time < research_time_budget_seconds:
+            budgets = {
+                'time_budget_s': research_time,
+                'max_turns': max(2, int(research_max_turns * research_time / research_time_budget_seconds))
+            }
+            _degrade(state, f"capped research at {research_time:.0f}s and {budgets['max_turns']} turns")
+
+    try:
+        search_result = await research_app.ainvoke({
+            'messages': [HumanMessage(content=state.get('user_query') + context_hint)],
+            'research_result': None,
+            **budgets
+        })
+        
+        # Extract the actual research result string
+        result = search_result.get('research_result', 'No research result')
+        if not result or result.startswith(FAILURE_PREFIXES):
+            raise RuntimeError(result.removeprefix('Research failed: ') if result else 'no research result')
+
+        # Save research to memory
+        if state.get('conversation_id'):
+            _memory(state).save_research(
+                conversation_id=state['conversation_id'],
+                query=state['user_query'],
+                results=result,
+                sources=search_result.get('sources', [])
+            )
+            
+            # Save successful pattern as learning
+            _memory(state).save_learning(
+                agent_name='research',
+                lesson=f'Successfully researched: {state["user_query"][:100]}',
+                context=f'Returned {len(result)} characters of data',
+                success_pattern=True
+            )
+        
+        # Update completed agents
+        completed = state.get('completed_agents', [])
+        completed.append('research')
+        
+        logger.info('Research completed')
+        return {
+            'research_result': result,
+            'completed_agents': completed
+        }
+    except Exception as e:
+        logger.error(f'Error calling search agent: {e}')
+        return {
+            **_failed(state, 'research', 'research_result', f"Research failed: {str(e)}"),
+            'completed_agents': state.get('completed_agents', []) + ['research']
+        }
+
+def _analysis_input(state: OrchestratorState) -> str:
+    """Text the analyzer works on: research, else the user's data, else the query"""
+    if state.get('research_result'):
+        return state['research_result']
+    if state.get('user_provided_data'):
+        return state['user_provided_data']
+    return state['user_query']
+
+
+def _save_analysis(state: OrchestratorState, input_text: str, result: str):
+    """Store an analysis and its success pattern"""
+    if not state.get('conversation_id') or not result or result.startswith(FAILURE_PREFIXES):
+        return
+    # Extract key insights (simple extraction - you can make this smarter)
+    key_insights = []
+    if '**Finding' in result or '## Key Findings' in result:
+        # Extract first few lines as insights
+        lines = result.split('\n')
+        key_insights = [line.strip() for line in lines if line.strip() and len(line) > 20][:5]
+
+    _memory(state).save_analysis(
+        conversation_id=state['conversation_id'],
+        analysis=result,
+        key_insights=key_insights
+    )
+
+    # Save successful pattern
+    _memory(state).save_learning(
+        agent_name='analyzer',
+        lesson=f'Successfully analyzed {len(input_text)} chars of data',
+        context=state['user_query'][:100],
+        success_pattern=True
+    )
+
+
+def _save_article(state: OrchestratorState, result: str):
+    """Store an article, its success pattern and the query cache entry"""
+    # Failures are never stored, least of all in the query cache
+    if not state.get('conversation_id') or not result or result.startswith(FAILURE_PREFIXES):
+        return
+    _memory(state).save_article(
+        conversation_id=state['conversation_id'],
+        article=result,
+    )
+
+    # Save successful pattern
+    _memory(state).save_learning(
+        agent_name='writer',
+        context=state['user_query'][:100],
+        success_pattern=True,
+        lesson=f'Wrote article of length {len(result)}'
+    )
+
+    # Cache the result for similar future queries
+    _memory(state).cache_result(state['user_query'], result, CACHE_SOFT_TTL_HOURS, CACHE_HARD_TTL_HOURS)
+
+
+def _save_failure(state: OrchestratorState, agent: str, lesson: str):
+    """Log an agent failure as a learning"""
+    if state.get('conversation_id'):
+        _memory(state).save_learning(
+            agent_name=agent,
+            lesson=lesson,
+            context=state['user_query'],
+            success_pattern=False
+        )
+
+
+def _stale_output(state: OrchestratorState, key: str) -> Optional[str]:
+    """Best stored research/analysis for a similar query, else the cached or best stored article"""
+    memory = _memory(state)
+    query = state['user_query']
+    try:
+        if key == 'research_result':
+            candidates = [r['results'] for r in memory.get_reusable_research(
+                query, max_age_hours=stale_fallback_max_age_hours,
+                min_relevance=research_context_min_relevance, limit=3
+            )]
+        elif key == 'analysis':
+            found = memory.get_reusable_analysis(
+                query, max_age_hours=stale_fallback_max_age_hours, min_relevance=research_context_min_relevance
+            )
+            candidates = [found['analysis']] if found else []
+        else:
+            candidates = [memory.get_cached_result(query)]
+            candidates += [a['article'] for a in memory.get_best_articles(topic=query, limit=3)]
+    except Exception as e:
+        logger.warning(f'Looking up a stale {key} failed: {e}')
+        return None
+    # Failures stored before they were filtered out are never served
+    return next((c for c in candidates if c and not c.startswith(FAILURE_PREFIXES)), None)
+
+
+def _failed(state: OrchestratorState, agent: str, key: str, message: str) -> dict:
+    """Update for a failed agent: a stale stored output when there is one, else the failure message.
+
+    Neither is saved as this conversation's output, so failures never reach
+    the query cache and stale results are not stored again as fresh ones.
+    """
+    _save_failure(state, agent, message)
+    stale = _stale_output(state, key)
+    if stale is None:
+        return {key: message}
+    decision = f"served stale {key} after {agent} failure ({message[:120]})"
+    logger.warning(f'Fallback: {decision}')
+    if state.get('conversation_id'):
+        _memory(state).record_degradation(state['conversation_id'], decision)
+    return {key: stale, 'served_stale': True}
+
+@traceable(name="analyse_node")
+async def analyse_node(state: OrchestratorState) -> dict:
+    """Analyzes research data or provided data"""
+    logger.info('Starting analysis agent...')
+    
+    input_text = _analysis_input(state)
+    # Get past analyses on similar topics for context
+    past_analyses = _memory(state).get_past_analyses(state['user_query'], limit=2)
+    
+    context_hint = ""
+    if past_analyses:
+        context_hint = "\n\nPrevious analyses on similar topics:\n"
+        for pa in past_analyses:
+            context_hint += f"- {pa['original_query']}\n  Key insights: {', '.join(pa['key_insights'][:3]) if pa['key_insights'] else 'N/A'}\n"
+    
+    try:
+        analysis_result = await analyzer_app.ainvoke({
+            'message': [HumanMessage(content=input_text)],
+            'analysis': None
+        })
+        
+        # Extract analysis string
+        result = analysis_result.get('analysis', 'No analysis result')
+        if not result or result.startswith(FAILURE_PREFIXES):
+            raise RuntimeError(result.removeprefix('Analysis failed: ') if result else 'no analysis result')
+
+        # Save analysis to memory
+        _save_analysis(state, input_text, result)
+
+        # Update completed agents
+        completed = state.get('completed_agents', [])
+        completed.append('analyzer')
+        
+        logger.info('Analysis completed')
+        return {
+            'analysis': result,
+            'completed_agents': completed
+        }
+    except Exception as e:
+        logger.error(f'Error analyzing data: {e}')
+        return {
+            **_failed(state, 'analyzer', 'analysis', f"Analysis failed: {str(e)}"),
+            'completed_agents': state.get('completed_agents', []) + ['analyzer']
+        }
+
+@traceable(name="writer_node")
+async def writer_node(state: OrchestratorState) -> dict:
+    '''Writes the final report'''
+    logger.info('Starting writing agent...')
+
+    # A planned analyzer that never ran was dropped by routing to meet the deadline
+    if 'analyzer' in state.get('agents_to_run', []) and 'analyzer' not in state.get('completed_agents', []):
+        _degrade(state, _analyzer_overdue(state) or 'dropped analyzer to meet the deadline')
+    
+    # Determine input: the analysis when there is one, else the raw research
+    analysis = state.get('analysis')
+    if analysis and not analysis.startswith(FAILURE_PREFIXES):
+        input_text = analysis
+    elif state.get('research_result'):
+        input_text = state['research_result']
+    else:
+        input_text = state['user_query']
+    
+    # Get best past articles for style reference
+    best_articles = _memory(state).get_best_articles(topic=state['user_query'], limit=2)
+    
+    context_hint = ""
+    if best_articles:
+        context_hint = "\n\nHigh-quality past articles for style reference:\n"
+        for article in best_articles:
+            context_hint += f"- Quality: {article['quality_score']}, Words: {article['word_count']}\n"
+            context_hint += f"  Preview: {article['article'][:300]}...\n"
+    
+    # Short on time: ask for a shorter article, roughly in proportion to the time left
+    time_left = _time_left(state)
+    if time_left is not None:
+        expected = _expected_latency(state, 'writer_node')
+        if time_left < expected:
+            words = max(MIN_ARTICLE_WORDS, int(DEFAULT_ARTICLE_WORDS * max(time_left, 0) / expected))
+            input_text += (
+                f"\n\nTime is short: keep the article to about {words} words "
+                "with at most three body sections."
+            )
+            _degrade(state, f"shortened article to ~{words} words ({time_left:.0f}s left)")
+
+    try:
+        writer_result = await writer_app.ainvoke({
+            'message': [HumanMessage(content=input_text)],
+            'article': None
+        })
+        
+        # Extract article string
+        result = writer_result.get('article', 'No article generated')
+        if not result or result.startswith(FAILURE_PREFIXES):
+            raise RuntimeError(result.removeprefix('Writing failed: ') if result else 'no article generated')
+
+        # Save article to memory
+        _save_article(state, result)
+        
+        # Update completed agents
+        completed = state.get('completed_agents', [])
+        completed.append('writer')
+        
+        logger.info('Writing completed')
+        return {
+            'final_article': result,
+            'completed_agents': completed
+        }
+    except Exception as e:
+        logger.error(f'Error writing article: {e}')
+        return {
+            **_failed(state, 'writer', 'final_article', f"Writing failed: {str(e)}"),
+            'completed_agents': state.get('completed_agents', []) + ['writer']
+        }
+
+def _heading(section: str) -> str:
+    return section.splitlines()[0].lstrip('#').strip()
+
+
+@traceable(name="analyse_write_node")
+async def analyse_write_node(state: OrchestratorState) -> dict:
+    """Analyzes and writes in a pipeline: each analysis section is written up while the analyzer continues"""
+    logger.info('Starting pipelined analysis and writing...')
+    input_text = _analysis_input(state)
+    topic = state['user_query']
+    completed = state.get('completed_agents', [])
+
+    sections = []
+    writer_tasks = []
+    # Analysis sections meant as instructions for the writer, not article content
+    guidance = []
+
+    def start(material: str, role: str):
+        # Parts are assembled in the order they are started
+        writer_tasks.append(asyncio.create_task(write_section(topic, material, role, part=len(writer_tasks))))
+
+    try:
+        async for section in stream_sections([HumanMessage(content=input_text)]):
+            sections.append(section)
+            # The opening waits for a second section, so unstructured output goes to the regular writer
+            if len(sections) == 2:
+                start(sections[0], 'opening')
+            if len(sections) >= 2:
+                if 'NARRATIVE STRUCTURE' in _heading(section).upper():
+                    guidance.append(section)
+                else:
+                    start(section, 'body')
+    except Exception as e:
+        for task in writer_tasks:
+            task.cancel()
+        logger.error(f'Error analyzing data: {e}')
+        return {
+            **_failed(state, 'analyzer', 'analysis', f"Analysis failed: {str(e)}"),
+            'completed_agents': completed + ['analyzer']
+        }
+
+    analysis = '\n\n'.join(sections)
+    _save_analysis(state, input_text, analysis)
+    logger.info(f'Analysis completed ({len(sections)} sections)')
+
+    try:
+        if len(sections) < 2:
+            # Nothing to pipeline: write the whole article from the analysis
+            writer_result = await writer_app.ainvoke({
+                'message': [HumanMessage(content=analysis or input_text)],
+                'article': None
+            })
+            result = writer_result.get('article', 'No article generated')
+            if not result or result.startswith(FAILURE_PREFIXES):
+                raise RuntimeError(result.removeprefix('Writing failed: ') if result else 'no article generated')
+        else:
+            covered = '\n'.join(f'- {_heading(section)}' for section in sections[1:])
+            start(f"Summary:\n{sections[0]}\n\nSections covered:\n{covered}\n\n" + '\n\n'.join(guidance),
+                  'conclusion')
+            parts = await asyncio.gather(*writer_tasks)
+            result = '\n\n'.join(part for part in parts if part)
+
+        _save_article(state, result)
+        logger.info('Writing completed')
+        return {
+            'analysis': analysis,
+            'final_article': result,
+            'completed_agents': completed + ['analyzer', 'writer']
+        }
+    except Exception as e:
+        for task in writer_tasks:
+            task.cancel()
+        logger.error(f'Error writing article: {e}')
+        return {
+            'analysis': analysis,
+            **_failed(state, 'writer', 'final_article', f"Writing failed: {str(e)}"),
+            'completed_agents': completed + ['analyzer', 'writer']
+        }
+
+def _analyzer_overdue(state: OrchestratorState) -> Optional[str]:
+    """Why the analyzer has to be dropped to meet the deadline, or None if analysis and writing fit"""
+    time_left = _time_left(state)
+    if time_left is None:
+        return None
+    if pipelined_writing:
+        needed = _expected_latency(state, 'analyse_write_node')
+    else:
+        needed = _expected_latency(state, 'analyse_node') + _expected_latency(state, 'writer_node')
+    if time_left < needed:
+        return f"dropped analyzer ({time_left:.0f}s left, analyzer + writer need ~{needed:.0f}s)"
+    return None
+
+
+@traceable(name="route_next_agent")
+def route_next_agent(state: OrchestratorState) -> str:
+    """Routes to the next agent or END"""
+    agents_to_run = state.get('agents_to_run', [])
+    completed = state.get('completed_agents', [])
+    
+    logger.info(f'Routing - To run: {agents_to_run}, Completed: {completed}')
+    
+    # Find next agent. An agent planned before one that already ran was
+    # dropped to meet the deadline and is not revisited.
+    for i, agent in enumerate(agents_to_run):
+        if agent in completed or any(later in completed for later in agents_to_run[i + 1:]):
+            continue
+
+        # Analysis followed by writing can run as one pipeline
+        pipelined = agent == 'analyzer' and 'writer' in agents_to_run and pipelined_writing
+
+        # Not enough time for analysis and writing: fall back to the quick_research path.
+        # writer_node records the degradation; routing only decides.
+        if agent == 'analyzer' and 'writer' in agents_to_run and _analyzer_overdue(state):
+            agent, pipelined = 'writer', False
+
+        if pipelined:
+            agent = 'analyzer_writer'
+
+        logger.info(f'Routing to: {agent}')
+        return agent
+    
+    # All done
+    logger.info('All agents completed, ending')
+    return 'end'
+
+
+def _end_conversation(state: OrchestratorState, failed: bool = False):
+    """Record which agents ran and whether every one of them succeeded"""
+    if not state.get('conversation_id'):
+        return
+    outputs = [state.get(key) for key in ('research_result', 'analysis', 'final_article') if state.get(key)]
+    success = bool(outputs) and not any(output.startswith(FAILURE_PREFIXES) for output in outputs)
+    # Stale fallbacks keep the user served, but the agents still failed
+    success = success and not state.get('served_stale') and not failed
+    _memory(state).end_conversation(state['conversation_id'], state.get('completed_agents', []), success)
+
+
+@traceable(name="finish_node")
+async def finish_node(state: OrchestratorState) -> dict:
+    """Records the end of the conversation once routing has nothing left to run"""
+    _end_conversation(state)
+    return {}
+
+
+# Build graph
+graph = StateGraph(OrchestratorState)
+graph.add_node('task_classifier', _timed('task_classifier', task_classifier))
+graph.add_node('search_node', _timed('search_node', search_node))
+graph.add_node('analyse_node', _timed('analyse_node', analyse_node))
+graph.add_node('writer_node', _timed('writer_node', writer_node))
+graph.add_node('analyse_write_node', _timed('analyse_write_node', analyse_write_node))
+# Not timed: it does no agent work and would skew the latency history
+graph.add_node('finish_node', finish_node)
+
+graph.set_entry_point('task_classifier')
+
+# Universal routing from any node
+routing_map = {
+    'research': 'search_node',
+    'analyzer': 'analyse_node',
+    'writer': 'writer_node',
+    'analyzer_writer': 'analyse_write_node',
+    'end': 'finish_node'
+}
+
+graph.add_conditional_edges('task_classifier', route_next_agent, routing_map)
+graph.add_conditional_edges('search_node', route_next_agent, routing_map)
+graph.add_conditional_edges('analyse_node', route_next_agent, routing_map)
+graph.add_conditional_edges('writer_node', route_next_agent, routing_map)
+graph.add_conditional_edges('analyse_write_node', route_next_agent, routing_map)
+graph.add_edge('finish_node', END)
+
+# Compile
+app = ProfiledApp(graph.compile(), tenants, profile_sample_rate)
+
+# Test
+if __name__ == "__main__":
+    import asyncio
+
+    configure_logging()
+    
+    test_state = {
+        'user_query': "Write a detailed article on the impacts of climate change on coastal cities.",
+        'task_type': None,
+        'user_provided_data': None,
+        'research_result': None,
+        'analysis': None,
+        'final_article': None,
+        'agents_to_run': [],
+        'completed_agents': []
+    }
+    
+    result = asyncio.run(app.ainvoke(test_state))
+    
+    print("\n=== Results ===")
+    print(f"Task Type: {result['task_type']}")
+    print(f"Agents Run: {result['completed_agents']}")
     print(f"\nFinal Article:\n{result['final_article']}")
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""Choose between equivalent agent plans using the history of past runs.
+
+The classifier maps a query to a task type and a default plan. Some task
+types can be answered by a cheaper plan (e.g. full_research without the
+analyzer). Per task type, the optimizer compares the plans that actually ran
+on latency, failure rate and article quality, and only switches to a cheaper
+plan once it has enough scored runs showing the quality holds. A fresh
+analysis of a similar query lets the writer run on its own.
+
+Disabled unless PLAN_OPTIMIZER_ENABLED is set. Evaluate it on stored runs
+first; decisions are made per memory database, so each one (the default and
+every tenant or shard file) is reported on its own:
+
+    python plan_optimizer.py stats
+    python plan_optimizer.py evaluate --test-fraction 0.3
+"""
+import argparse
+import json
+import logging
+from statistics import mean
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from database.agent_memory import MemoryManager
+from database.tenancy import TenantRouter
+from settings.logging_config import configure_logging
+from settings.config import (
+    memory_tenant_dir,
+    plan_optimizer_min_runs,
+    research_max_age_hours,
+    research_reuse_min_relevance,
+)
+
+logger = logging.getLogger('plan_optimizer')
+
+# Plans that answer the same task type; the first one is the classifier's default
+EQUIVALENT_PLANS = {
+    'full_research': [('research', 'analyzer', 'writer'), ('research', 'writer')],
+    'analyze_provided': [('analyzer', 'writer'), ('writer',)],
+}
+# A cheaper plan must keep article quality within this fraction of the default plan's
+QUALITY_TOLERANCE = 0.05
+# ...and may fail at most this much more often
+FAILURE_TOLERANCE = 0.05
+# Number of past runs per task type the decision is based on
+HISTORY_LIMIT = 500
+
+Plan = Tuple[str, ...]
+
+
+def plan_stats(runs: List[Dict]) -> Dict[Plan, Dict]:
+    """Aggregate runs (from MemoryManager.get_plan_history) per plan.
+
+    Degraded runs and runs answered from reused research did not do the work
+    their plan describes, so their latency and quality say nothing about it.
+    """
+    grouped: Dict[Plan, List[Dict]] = {}
+    for run in runs:
+        if run['degraded'] or run['reused_research']:
+            continue
+        grouped.setdefault(tuple(run['agents_used']), []).append(run)
+
+    stats = {}
+    for plan, plan_runs in grouped.items():
+        latencies = [r['latency_seconds'] for r in plan_runs if r['latency_seconds'] is not None]
+        qualities = [r['quality_score'] for r in plan_runs if r['quality_score'] is not None]
+        stats[plan] = {
+            'runs': len(plan_runs),
+            'scored_runs': len(qualities),
+            'failure_rate': sum(not r['success'] for r in plan_runs) / len(plan_runs),
+            'latency_seconds': mean(latencies) if latencies else None,
+            'quality_score': mean(qualities) if qualities else None,
+        }
+    return stats
+
+
+def _has_evidence(stats: Optional[Dict], min_runs: int) -> bool:
+    return stats is not None and stats['scored_runs'] >= min_runs and stats['latency_seconds'] is not None
+
+
+def _expected_failure(plan: Plan, stats: Dict, agent_failure_rates: Dict[str, float]) -> float:
+    """Observed failure rate of the plan, or higher if its agents' learnings say so."""
+    survival = 1.0
+    for agent in plan:
+        survival *= 1 - agent_failure_rates.get(agent, 0.0)
+    return max(stats['failure_rate'], 1 - survival)
+
+
+def _is_acceptable(plan: Plan, stats: Dict, base_plan: Plan, base: Dict,
+                   agent_failure_rates: Dict[str, float]) -> bool:
+    """Whether ``plan`` keeps quality and reliability and is faster than the base plan."""
+    return (
+        stats['quality_score'] >= base['quality_score'] * (1 - QUALITY_TOLERANCE)
+        and _expected_failure(plan, stats, agent_failure_rates)
+        <= _expected_failure(base_plan, base, agent_failure_rates) + FAILURE_TOLERANCE
+        and stats['latency_seconds'] < base['latency_seconds']
+    )
+
+
+def choose_plan(task_type: str, planned: Sequence[str], stats: Dict[Plan, Dict],
+                agent_failure_rates: Dict[str, float], min_runs: int) -> Tuple[Plan, Optional[str]]:
+    """Return the fastest acceptable equivalent plan and why, or the planned one and None."""
+    planned = tuple(planned)
+    alternatives = EQUIVALENT_PLANS.get(task_type, [])
+    base = stats.get(planned)
+    if planned not in alternatives or not _has_evidence(base, min_runs):
+        return planned, None
+
+    best, best_stats = planned, base
+    for plan in alternatives:
+        candidate = stats.get(plan)
+        if plan == planned or not _has_evidence(candidate, min_runs):
+            continue
+        if _is_acceptable(plan, candidate, planned, base, agent_failure_rates) \
+                and candidate['latency_seconds'] < best_stats['latency_seconds']:
+            best, best_stats = plan, candidate
+
+    if best == planned:
+        return planned, None
+    reason = (
+        f"{task_type}: {' -> '.join(best)} kept quality {best_stats['quality_score']:.2f} "
+        f"(vs {base['quality_score']:.2f}) in {best_stats['latency_seconds']:.0f}s "
+        f"(vs {base['latency_seconds']:.0f}s) over {best_stats['scored_runs']} runs"
+    )
+    return best, reason
+
+
+def optimize_plan(memory: MemoryManager, user_query: str, task_type: str, agents: List[str],
+                  user_provided_data: str = None) -> Dict:
+    """Pick the plan for a classified query.
+
+    Returns ``agents`` (the plan to run), ``analysis`` (a reused analysis to
+    hand to the writer, or None) and ``reason`` (None when the plan is unchanged).
+    """
+    # A fresh analysis of a similar query makes research and analysis unnecessary
+    if 'analyzer' in agents and 'writer' in agents and not user_provided_data:
+        cached = memory.get_reusable_analysis(
+            user_query,
+            max_age_hours=research_max_age_hours,
+            min_relevance=research_reuse_min_relevance
+        )
+        if cached:
+            return {
+                'agents': ['writer'],
+                'analysis': cached['analysis'],
+                'reason': f"reusing analysis {cached['id']} of '{cached['original_query'][:60]}' "
+                          f"(relevance {cached['relevance']})"
+            }
+
+    stats = plan_stats(memory.get_plan_history(task_type, limit=HISTORY_LIMIT))
+    plan, reason = choose_plan(task_type, agents, stats, memory.get_agent_failure_rates(), plan_optimizer_min_runs)
+    return {'agents': list(plan), 'analysis': None, 'reason': reason}
+
+
+def _printable(stats: Dict[Plan, Dict]) -> Dict[str, Dict]:
+    return {' -> '.join(plan): s for plan, s in stats.items()}
+
+
+def evaluate(history: List[Dict], test_fraction: float, min_runs: int,
+             agent_failure_rates: Dict[str, float]) -> Dict[str, Dict]:
+    """Decide on the older runs, then check each decision against the newer ones.
+
+    Reused analyses depend on query content and are not evaluated here.
+    """
+    split = int(len(history) * (1 - test_fraction))
+    train, test = history[:split], history[split:]
+
+    report = {}
+    for task_type, alternatives in EQUIVALENT_PLANS.items():
+        train_stats = plan_stats([r for r in train if r['task_type'] == task_type])
+        test_stats = plan_stats([r for r in test if r['task_type'] == task_type])
+        default = alternatives[0]
+        chosen, reason = choose_plan(task_type, default, train_stats, agent_failure_rates, min_runs)
+
+        holds = None
+        if chosen != default and _has_evidence(test_stats.get(default), 1) \
+                and _has_evidence(test_stats.get(chosen), 1):
+            holds = _is_acceptable(chosen, test_stats[chosen], default, test_stats[default], agent_failure_rates)
+
+        report[task_type] = {
+            'default_plan': ' -> '.join(default),
+            'chosen_plan': ' -> '.join(chosen),
+            'reason': reason,
+            # None: plan unchanged, or too few test runs to check it
+            'holds_on_test_runs': holds,
+            'train': _printable(train_stats),
+            'test': _printable(test_stats),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate the plan optimizer on stored runs')
+    parser.add_argument('command', choices=('stats', 'evaluate'))
+    parser.add_argument('--db', default='memory/agent_memory.db', help='Default (no tenant) database')
+    parser.add_argument('--dir', default=memory_tenant_dir, help='Directory of the tenant databases')
+    parser.add_argument('--test-fraction', type=float, default=0.3,
+                        help='Share of the newest runs held out to check decisions')
+    parser.add_argument('--min-runs', type=int, default=plan_optimizer_min_runs)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    tenants = TenantRouter(base_dir=args.dir, default_db_path=args.db)
+    results = {}
+    for shard, path in tenants.shard_paths().items():
+        memory = MemoryManager(path)
+        history = memory.get_plan_history(limit=100000)
+        if args.command == 'stats':
+            results[shard] = {
+                task_type: _printable(plan_stats([r for r in history if r['task_type'] == task_type]))
+                for task_type in sorted({r['task_type'] for r in history})
+            }
+        else:
+            results[shard] = evaluate(history, args.test_fraction, args.min_runs, memory.get_agent_failure_rates())
+    print(json.dumps(results, indent=2))
+
+    if args.command == 'evaluate':
+        for shard, report in results.items():
+            for task_type, entry in report.items():
+                print(f"{shard} {task_type}: [{entry['default_plan']}] => [{entry['chosen_plan']}] "
+                      f"(holds on test runs: {entry['holds_on_test_runs']})")
+
+
+if __name__ == '__main__':
+    main()
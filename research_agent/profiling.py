@@ -0,0 +1,275 @@
+"""Opt-in profiling of whole orchestrator runs.
+
+A run is profiled when its state sets ``profile: True`` or, failing that,
+with probability PROFILE_SAMPLE_RATE. A profiled run gets:
+
+- a cProfile of the event loop thread, summarised per category (SQLite,
+  JSON, compression, langgraph, ...) and as top hotspots
+- an await-time breakdown: time spent in each graph node, waiting for and
+  calling the LLM tiers, and in Tavily searches
+
+The result is stored in ``run_profiles`` under the run's conversation_id:
+
+    python profiling.py slowest --limit 10 --top 5
+    python profiling.py show 42
+    python profiling.py dump 42 run42.prof     # open with snakeviz or pstats
+"""
+import argparse
+import contextvars
+import cProfile
+import json
+import logging
+import marshal
+import pstats
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('profiling')
+
+# Number of hotspots stored per run
+HOTSPOT_LIMIT = 20
+# First matching marker (in the file name or function name) decides a function's category
+CPU_CATEGORIES = [
+    # The loop blocked in select/epoll with nothing to run: not CPU time
+    ('idle', ("of 'select.", 'selectors.py')),
+    ('sqlite', ('sqlite3',)),
+    ('json', ('/json/', '_json')),
+    ('compression', ('zlib', 'lzma', 'gzip', 'compression.py')),
+    ('langgraph', ('langgraph',)),
+    ('langchain', ('langchain', 'langsmith', 'pydantic')),
+    ('asyncio', ('/asyncio/',)),
+]
+
+_active: contextvars.ContextVar[Optional['RunProfile']] = contextvars.ContextVar('run_profile', default=None)
+
+
+class RunProfile:
+    """Timings collected during one profiled run."""
+
+    def __init__(self):
+        self.conversation_id: Optional[int] = None
+        self.tenant_id: Optional[str] = None
+        self.started_at = time.monotonic()
+        # category -> [total seconds, count]; spans may overlap when calls run concurrently
+        self.spans: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        self._lock = threading.Lock()
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def record(self, category: str, seconds: float):
+        with self._lock:
+            span = self.spans[category]
+            span[0] += seconds
+            span[1] += 1
+
+    def start(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            self._profiler = profiler
+        except ValueError as e:
+            # Only one profiler per thread: concurrent profiled runs on a shared loop get await times only
+            logger.info(f'CPU profile unavailable for this run: {e}')
+        self.started_at = time.monotonic()
+
+    def stop(self) -> Dict:
+        """Stop profiling and return the row for MemoryManager.save_run_profile."""
+        wall_seconds = time.monotonic() - self.started_at
+        stats = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler).stats
+
+        nodes = {k[len('node:'):]: round(v[0], 4) for k, v in self.spans.items() if k.startswith('node:')}
+        breakdown = {
+            'nodes': nodes,
+            'graph_overhead_seconds': round(max(wall_seconds - sum(nodes.values()), 0.0), 4),
+            'awaits': {
+                k: {'seconds': round(v[0], 4), 'count': v[1]}
+                for k, v in sorted(self.spans.items()) if not k.startswith('node:')
+            },
+        }
+        cpu_seconds = None
+        hotspots = []
+        if stats:
+            breakdown['cpu'] = cpu_breakdown(stats)
+            cpu_seconds = round(sum(v for k, v in breakdown['cpu'].items() if k != 'idle'), 4)
+            hotspots = top_hotspots(stats, HOTSPOT_LIMIT)
+        return {
+            'conversation_id': self.conversation_id,
+            'wall_seconds': round(wall_seconds, 4),
+            'cpu_seconds': cpu_seconds,
+            'breakdown': breakdown,
+            'hotspots': hotspots,
+            'profile': zlib.compress(marshal.dumps(stats)) if stats else None,
+        }
+
+
+def current_profile() -> Optional[RunProfile]:
+    return _active.get()
+
+
+@contextmanager
+def span(category: str):
+    """Add the time spent in the block to ``category`` of the current run's profile, if any."""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        profile.record(category, time.monotonic() - started)
+
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    return name if filename == '~' else f'{filename}:{line}({name})'
+
+
+def _category(func: tuple) -> str:
+    label = _label(func)
+    for category, markers in CPU_CATEGORIES:
+        if any(marker in label for marker in markers):
+            return category
+    return 'other'
+
+
+def cpu_breakdown(stats: Dict) -> Dict[str, float]:
+    """Own time (tottime) per category, in seconds."""
+    totals = defaultdict(float)
+    for func, (_, _, tottime, _, _) in stats.items():
+        totals[_category(func)] += tottime
+    return {k: round(v, 4) for k, v in sorted(totals.items(), key=lambda item: -item[1])}
+
+
+def top_hotspots(stats: Dict, limit: int) -> List[Dict]:
+    """Functions with the most own time, idle waiting excluded."""
+    busy = [item for item in stats.items() if _category(item[0]) != 'idle']
+    ranked = sorted(busy, key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            'function': _label(func),
+            'calls': ncalls,
+            'tottime': round(tottime, 4),
+            'cumtime': round(cumtime, 4),
+        }
+        for func, (_, ncalls, tottime, cumtime, _) in ranked
+    ]
+
+
+class ProfiledApp:
+    """Wraps a compiled graph so sampled or requested runs are profiled and stored.
+
+    Profiles are stored in the run's tenant database (``tenants`` is a
+    database.tenancy.TenantRouter). Everything except ``ainvoke`` and
+    ``astream`` is passed through.
+    """
+
+    def __init__(self, app, tenants, sample_rate: float = 0.0):
+        self._app = app
+        self._tenants = tenants
+        self.sample_rate = sample_rate
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+    def _wants_profile(self, state) -> bool:
+        requested = state.get('profile') if isinstance(state, dict) else None
+        if requested is not None:
+            return bool(requested)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _save(self, profile: RunProfile):
+        try:
+            self._tenants.for_tenant(profile.tenant_id).save_run_profile(**profile.stop())
+        except Exception as e:
+            logger.warning(f'Could not store run profile: {e}')
+
+    async def ainvoke(self, state, *args, **kwargs):
+        if not self._wants_profile(state):
+            return await self._app.ainvoke(state, *args, **kwargs)
+        profile = RunProfile()
+        token = _active.set(profile)
+        profile.start()
+        try:
+            return await self._app.ainvoke(state, *args, **kwargs)
+        finally:
+            _active.reset(token)
+            self._save(profile)
+
+    async def astream(self, state, *args, **kwargs):
+        if not self._wants_profile(state):
+            async for event in self._app.astream(state, *args, **kwargs):
+                yield event
+            return
+        profile = RunProfile()
+        token = _active.set(profile)
+        profile.start()
+        try:
+            async for event in self._app.astream(state, *args, **kwargs):
+                yield event
+        finally:
+            try:
+                _active.reset(token)
+            except ValueError:
+                # Generator closed from another context (e.g. garbage collected)
+                pass
+            self._save(profile)
+
+
+def _print_run(run: Dict, top: int):
+    breakdown = run['breakdown']
+    print(f"conversation {run['conversation_id']}: {run['wall_seconds']:.2f}s wall, "
+          f"{run['cpu_seconds'] or 0:.2f}s profiled CPU - {(run['user_query'] or '')[:70]}")
+    if breakdown.get('nodes'):
+        print('  nodes:    ' + ', '.join(f'{k} {v:.2f}s' for k, v in breakdown['nodes'].items())
+              + f", graph overhead {breakdown['graph_overhead_seconds']:.2f}s")
+    if breakdown.get('awaits'):
+        print('  awaits:   ' + ', '.join(f"{k} {v['seconds']:.2f}s/{v['count']}" for k, v in breakdown['awaits'].items()))
+    if breakdown.get('cpu'):
+        print('  cpu:      ' + ', '.join(f'{k} {v:.3f}s' for k, v in breakdown['cpu'].items()))
+    for hotspot in run['hotspots'][:top]:
+        print(f"  {hotspot['tottime']:8.3f}s {hotspot['cumtime']:8.3f}s {hotspot['calls']:>7}  {hotspot['function']}")
+
+
+def main(argv=None):
+    from database.agent_memory import MemoryManager
+    from settings.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description='Inspect profiled orchestrator runs')
+    parser.add_argument('--db', default='memory/agent_memory.db', help='Path to the SQLite database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    slowest_parser = sub.add_parser('slowest', help='List the slowest profiled runs')
+    slowest_parser.add_argument('--limit', type=int, default=10)
+    slowest_parser.add_argument('--top', type=int, default=5, help='Hotspots shown per run')
+    show_parser = sub.add_parser('show', help='Show the stored profile of a conversation as JSON')
+    show_parser.add_argument('conversation_id', type=int)
+    dump_parser = sub.add_parser('dump', help='Write a conversation\'s CPU profile as a .prof file')
+    dump_parser.add_argument('conversation_id', type=int)
+    dump_parser.add_argument('path')
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    memory = MemoryManager(args.db)
+    if args.command == 'slowest':
+        for run in memory.get_slowest_runs(args.limit):
+            _print_run(run, args.top)
+    elif args.command == 'show':
+        print(json.dumps(memory.get_slowest_runs(limit=1, conversation_id=args.conversation_id), indent=2))
+    else:
+        data = memory.get_run_profile(args.conversation_id)
+        if not data:
+            raise SystemExit(f'No CPU profile stored for conversation {args.conversation_id}')
+        with open(args.path, 'wb') as f:
+            f.write(zlib.decompress(data))
+        pstats.Stats(args.path).sort_stats('cumulative').print_stats(15)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Score stored articles in the background, off the request path.
+
+    python quality_scorer.py run                  # keep scoring new articles
+    python quality_scorer.py run --once           # score the backlog and exit
+    python quality_scorer.py run --evaluators heuristic,deepeval
+
+Unscored articles are picked up in batches, scored by every configured
+evaluator (the mean of their 0..1 scores is stored) and written back in one
+transaction per batch. Every memory database is scored: the default one
+and each tenant or shard file under ``--dir`` (new files are picked up on the
+next pass). The default ``heuristic`` evaluator is local and instant;
+``deepeval`` adds an LLM judge (G-Eval on Gemini).
+"""
+import argparse
+import asyncio
+import logging
+import re
+from statistics import mean
+from typing import Dict, List
+
+from database.agent_memory import MemoryManager, _extract_keywords
+from database.tenancy import TenantRouter
+from settings.logging_config import configure_logging
+from settings.config import (
+    google_key,
+    memory_tenant_dir,
+    quality_evaluators,
+    quality_batch_size,
+    quality_poll_seconds,
+)
+
+logger = logging.getLogger('quality_scorer')
+
+DB_PATH = 'memory/agent_memory.db'
+# Articles scored at the same time (matters for LLM judges)
+SCORING_CONCURRENCY = 4
+
+
+class HeuristicEvaluator:
+    """Local metrics: length, structure, readability, paragraph size and query coverage."""
+
+    name = 'heuristic'
+    WEIGHTS = {'length': 0.2, 'structure': 0.25, 'readability': 0.2, 'paragraphs': 0.15, 'relevance': 0.2}
+    # Word counts the writer prompt aims for
+    MIN_WORDS, MAX_WORDS = 600, 2500
+
+    def metrics(self, article: str, query: str = None) -> Dict[str, float]:
+        words = len(article.split())
+        if words < self.MIN_WORDS:
+            length = words / self.MIN_WORDS
+        else:
+            length = 1.0 if words <= self.MAX_WORDS else max(0.5, self.MAX_WORDS / words)
+
+        lines = article.splitlines()
+        has_title = any(line.startswith('# ') for line in lines[:3])
+        subheadings = [line for line in lines if line.startswith('## ')]
+        has_conclusion = any('conclusion' in line.lower() or 'takeaway' in line.lower() for line in subheadings)
+        structure = 0.25 * has_title + 0.5 * min(len(subheadings), 4) / 4 + 0.25 * has_conclusion
+
+        prose = [p for p in re.split(r'\n\s*\n', article) if p.strip() and not p.lstrip().startswith(('#', '-', '*', '>'))]
+        sentence_counts = [len(re.findall(r'[.!?](?:\s|$)', p)) or 1 for p in prose]
+        sentences = sum(sentence_counts)
+        avg_sentence = sum(len(p.split()) for p in prose) / sentences if sentences else 0
+        # Best between 12 and 25 words per sentence
+        if 12 <= avg_sentence <= 25:
+            readability = 1.0
+        elif avg_sentence < 12:
+            readability = avg_sentence / 12
+        else:
+            readability = max(0.0, 1 - (avg_sentence - 25) / 25)
+        paragraphs = sum(c <= 5 for c in sentence_counts) / len(sentence_counts) if sentence_counts else 0.0
+
+        keywords = set(_extract_keywords(query)) if query else set()
+        text = article.lower()
+        relevance = sum(k in text for k in keywords) / len(keywords) if keywords else 1.0
+
+        return {
+            'length': length,
+            'structure': structure,
+            'readability': readability,
+            'paragraphs': paragraphs,
+            'relevance': relevance,
+        }
+
+    async def score(self, article: Dict) -> float:
+        if article['article'].startswith('Writing failed:'):
+            return 0.0
+        metrics = self.metrics(article['article'], article.get('user_query'))
+        return sum(self.WEIGHTS[name] * value for name, value in metrics.items())
+
+
+class DeepEvalJudge:
+    """LLM judge: deepeval's G-Eval with a Gemini model."""
+
+    name = 'deepeval'
+    CRITERIA = (
+        "Judge the article written for the input request: is it accurate, well structured, "
+        "specific (numbers, names, examples), readable, and does it fully answer the request?"
+    )
+
+    def __init__(self, model_name: str = 'gemini-2.5-flash'):
+        # Imported here so the heuristic scorer works without deepeval installed
+        from deepeval.metrics import GEval
+        from deepeval.models import GeminiModel
+        from deepeval.test_case import LLMTestCase, LLMTestCaseParams
+
+        self._test_case = LLMTestCase
+        self._metric_args = {
+            'name': 'Article quality',
+            'criteria': self.CRITERIA,
+            'evaluation_params': [LLMTestCaseParams.INPUT, LLMTestCaseParams.ACTUAL_OUTPUT],
+            'model': GeminiModel(model_name=model_name, api_key=google_key),
+            'async_mode': True,
+        }
+        self._geval = GEval
+
+    async def score(self, article: Dict) -> float:
+        if article['article'].startswith('Writing failed:'):
+            return 0.0
+        # One metric per article: measure() keeps per-case state on the metric
+        metric = self._geval(**self._metric_args)
+        await metric.a_measure(
+            self._test_case(input=article.get('user_query') or '', actual_output=article['article'])
+        )
+        return metric.score
+
+
+EVALUATORS = {
+    'heuristic': HeuristicEvaluator,
+    'deepeval': DeepEvalJudge,
+}
+
+
+def build_evaluators(names: List[str]) -> list:
+    unknown = [n for n in names if n not in EVALUATORS]
+    if unknown:
+        raise ValueError(f"Unknown evaluators {unknown} (known: {', '.join(EVALUATORS)})")
+    return [EVALUATORS[name]() for name in names]
+
+
+async def score_batch(evaluators: list, articles: List[Dict]) -> Dict[int, float]:
+    """Score articles concurrently; articles whose evaluation fails are left unscored."""
+    semaphore = asyncio.Semaphore(SCORING_CONCURRENCY)
+
+    async def score_one(article: Dict) -> float:
+        async with semaphore:
+            return round(mean([await e.score(article) for e in evaluators]), 3)
+
+    results = await asyncio.gather(*(score_one(a) for a in articles), return_exceptions=True)
+    scores = {}
+    for article, result in zip(articles, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not score article {article['id']}: {result}")
+        else:
+            scores[article['id']] = result
+    return scores
+
+
+async def score_backlog(memory: MemoryManager, evaluators: list, batch_size: int, label: str = 'default') -> int:
+    """Score one database's unscored articles batch by batch; returns the number scored."""
+    scored = 0
+    after_id = 0
+    while True:
+        batch = await asyncio.to_thread(memory.get_unscored_articles, batch_size, after_id)
+        if not batch:
+            return scored
+
+        after_id = batch[-1]['id']
+        scores = await score_batch(evaluators, batch)
+        if scores:
+            await asyncio.to_thread(memory.save_quality_scores, scores)
+            scored += len(scores)
+            logger.info(f'{label}: scored {len(scores)}/{len(batch)} articles (total {scored})')
+
+
+async def run(tenants: TenantRouter, evaluators: list, batch_size: int, poll_seconds: float,
+              once: bool = False) -> int:
+    """Score every memory database's backlog; returns the number scored (only returns with ``once``)."""
+    managers: Dict[str, MemoryManager] = {}
+    scored = 0
+    while True:
+        for shard, path in tenants.shard_paths().items():
+            if path not in managers:
+                managers[path] = MemoryManager(path, **tenants.manager_kwargs)
+            scored += await score_backlog(managers[path], evaluators, batch_size, shard)
+        if once:
+            return scored
+        # Articles that failed are retried on the next pass
+        await asyncio.sleep(poll_seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Background article quality scoring')
+    parser.add_argument('command', choices=('run',))
+    parser.add_argument('--db', default=DB_PATH, help='Default (no tenant) database')
+    parser.add_argument('--dir', default=memory_tenant_dir, help='Directory of the tenant databases')
+    parser.add_argument('--evaluators', default=','.join(quality_evaluators),
+                        help=f"Comma-separated, from: {', '.join(EVALUATORS)}")
+    parser.add_argument('--batch-size', type=int, default=quality_batch_size)
+    parser.add_argument('--poll-seconds', type=float, default=quality_poll_seconds)
+    parser.add_argument('--once', action='store_true', help='Score the current backlog and exit')
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    evaluators = build_evaluators([e.strip() for e in args.evaluators.split(',') if e.strip()])
+    tenants = TenantRouter(base_dir=args.dir, default_db_path=args.db)
+    scored = asyncio.run(run(tenants, evaluators, args.batch_size, args.poll_seconds, args.once))
+    print(f'Scored {scored} articles')
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,117 @@
+"""Record a query's LLM and Tavily traffic once, then replay it offline.
+
+    python replay.py record "Explain FastAPI benefits" --out cassettes/fastapi.jsonl.gz
+    python replay.py replay cassettes/fastapi.jsonl.gz                     # original latencies
+    python replay.py replay cassettes/fastapi.jsonl.gz --latency-scale 0   # no waiting
+    python replay.py info cassettes/fastapi.jsonl.gz
+
+Replays run the full orchestrator graph with the recorded responses (see
+agents/cassette.py), so pipeline changes can be timed against the same
+model and search behaviour. Workers record every job when CASSETTE_DIR is
+set. The query cache and research reuse are bypassed in both modes so the
+agents actually run; the plan optimizer may still change the plan if it is
+enabled.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import Counter
+
+from agents.cassette import Cassette, record_run, use_cassette
+from settings.logging_config import configure_logging
+from worker import initial_state
+
+# Forces the agents to run instead of answering from stored results
+RUN_AGENTS = {'bypass_cache': True, 'max_research_age_hours': 0}
+
+
+async def record(query: str, user_data: str, path: str) -> dict:
+    from orchestrator import app
+
+    state = initial_state({'user_query': query, 'user_provided_data': user_data, **RUN_AGENTS})
+    return await record_run(app, state, path)
+
+
+async def replay(cassette: Cassette, profile: bool = False) -> dict:
+    from orchestrator import app
+
+    state = initial_state({**cassette.state, **RUN_AGENTS, 'profile': profile})
+    with use_cassette(cassette):
+        return await app.ainvoke(state)
+
+
+def _summary(result: dict) -> dict:
+    article = result.get('final_article') or ''
+    return {
+        'completed_agents': result.get('completed_agents'),
+        'article_words': len(article.split()),
+        'article_sha': hashlib.sha256(article.encode()).hexdigest()[:12],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record and replay orchestrator runs')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = sub.add_parser('record', help='Run a query live and record its responses')
+    record_parser.add_argument('query')
+    record_parser.add_argument('--data', help='File with user provided data')
+    record_parser.add_argument('--out', required=True, help='Cassette path (.jsonl.gz)')
+
+    replay_parser = sub.add_parser('replay', help='Run a recorded query offline')
+    replay_parser.add_argument('cassette')
+    replay_parser.add_argument('--latency-scale', type=float, default=1.0,
+                               help='Multiplier for recorded latencies (0 = no waiting)')
+    replay_parser.add_argument('--strict', action='store_true',
+                               help='Fail on requests with no exactly matching recorded response')
+    replay_parser.add_argument('--repeat', type=int, default=1)
+    replay_parser.add_argument('--profile', action='store_true',
+                               help='Store a run profile for each replay (see profiling.py)')
+
+    info_parser = sub.add_parser('info', help='Describe a cassette')
+    info_parser.add_argument('cassette')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        user_data = open(args.data).read() if args.data else None
+        started = time.monotonic()
+        result = asyncio.run(record(args.query, user_data, args.out))
+        print(json.dumps({'wall_seconds': round(time.monotonic() - started, 3), **_summary(result)}, indent=2))
+
+    elif args.command == 'replay':
+        runs = []
+        for _ in range(args.repeat):
+            cassette = Cassette.load(args.cassette, latency_scale=args.latency_scale, strict=args.strict)
+            started = time.monotonic()
+            result = asyncio.run(replay(cassette, args.profile))
+            runs.append({
+                'wall_seconds': round(time.monotonic() - started, 3),
+                **cassette.stats,
+                'unused': cassette.unused(),
+                'conversation_id': result.get('conversation_id'),
+                **_summary(result),
+            })
+        print(json.dumps({
+            'recorded_wall_seconds': cassette.meta.get('wall_seconds'),
+            'latency_scale': args.latency_scale,
+            'runs': runs,
+        }, indent=2))
+
+    else:
+        cassette = Cassette.load(args.cassette)
+        print(json.dumps({
+            'state': cassette.state,
+            'meta': cassette.meta,
+            'responses': dict(Counter(e['channel'] for e in cassette.entries)),
+            'recorded_latency_seconds': round(sum(
+                e['latency'] if 'latency' in e else (e['offsets'][-1] if e['offsets'] else 0)
+                for e in cassette.entries
+            ), 3),
+        }, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    configure_logging()
+    main()
@@ -1,8 +1,120 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-tavily_key = os.getenv("Tavily_API_KEY")
-google_key = os.getenv("GOOGLE_API_KEY")
-langsmith_key = os.getenv("LANGSMITH_API_KEY")
\ No newline at end of file
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+tavily_key = os.getenv("Tavily_API_KEY")
+google_key = os.getenv("GOOGLE_API_KEY")
+langsmith_key = os.getenv("LANGSMITH_API_KEY")
+
+# Logging (see settings/logging_config.py): format is text or json; long messages are cut at log_max_chars
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+log_format = os.getenv("LOG_FORMAT", "text")
+log_max_chars = int(os.getenv("LOG_MAX_CHARS", "2000"))
+# DEBUG records: share kept, and at most this many per call site and minute
+log_debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+log_debug_per_minute = int(os.getenv("LOG_DEBUG_PER_MINUTE", "60"))
+
+# Model tier per agent, e.g. "writer=standard,classifier=fast" (see agents/llm.py, which checks the names)
+llm_agent_tiers = {
+    agent.strip(): tier.strip()
+    for agent, tier in (
+        item.split("=", 1) for item in os.getenv("LLM_AGENT_TIERS", "").split(",") if "=" in item
+    )
+}
+
+# Provider-side caching of the static analyzer/writer prompts: off | gemini | local
+prompt_cache_backend = os.getenv("PROMPT_CACHE", "gemini")
+prompt_cache_ttl_seconds = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+
+# Circuit breakers for Gemini and Tavily: open once this share of the last N calls failed (see agents/circuit_breaker.py)
+circuit_error_rate = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+circuit_window = int(os.getenv("CIRCUIT_WINDOW", "20"))
+circuit_min_calls = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+# Seconds an open circuit fails fast, then the number of trial calls that must succeed to close it
+circuit_open_seconds = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+circuit_half_open_probes = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "2"))
+# Oldest stored research, analysis or article served in place of a failed agent's output
+stale_fallback_max_age_hours = float(os.getenv("STALE_FALLBACK_MAX_AGE_HOURS", "168"))
+
+# Query cache TTLs (hours, 0 = none): past the soft TTL an article is served while one background run
+# refreshes it, past the hard TTL the request recomputes it; entries may carry their own TTLs
+query_cache_soft_ttl_hours = float(os.getenv("QUERY_CACHE_SOFT_TTL_HOURS", "24"))
+query_cache_hard_ttl_hours = float(os.getenv("QUERY_CACHE_HARD_TTL_HOURS", "168"))
+# Seconds a background refresh holds its claim before another request may start one
+query_cache_refresh_lease_seconds = float(os.getenv("QUERY_CACHE_REFRESH_LEASE_SECONDS", "600"))
+
+# Research reuse: stored research younger than this is considered fresh
+research_max_age_hours = float(os.getenv("RESEARCH_MAX_AGE_HOURS", "24"))
+# Relevance at or above which fresh research is used as-is (no web search)
+research_reuse_min_relevance = float(os.getenv("RESEARCH_REUSE_MIN_RELEVANCE", "0.8"))
+# Relevance at or above which fresh research is handed to the agent as prior context
+research_context_min_relevance = float(os.getenv("RESEARCH_CONTEXT_MIN_RELEVANCE", "0.4"))
+
+# Research loop budgets: once any is hit the agent must answer with what it has
+research_max_turns = int(os.getenv("RESEARCH_MAX_TURNS", "6"))
+research_max_searches = int(os.getenv("RESEARCH_MAX_SEARCHES", "8"))
+research_time_budget_seconds = float(os.getenv("RESEARCH_TIME_BUDGET_SECONDS", "60"))
+# Token budget for the transcript sent on each research agent turn
+research_history_token_budget = int(os.getenv("RESEARCH_HISTORY_TOKEN_BUDGET", "12000"))
+
+# Default per-request latency budget in seconds (0 = no deadline)
+request_deadline_seconds = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+
+# Writer: "sectioned" outlines first and writes the sections concurrently, "single" uses one call
+writer_mode = os.getenv("WRITER_MODE", "sectioned")
+writer_section_concurrency = int(os.getenv("WRITER_SECTION_CONCURRENCY", "4"))
+writer_max_sections = int(os.getenv("WRITER_MAX_SECTIONS", "8"))
+
+# Write the article section by section while the analyzer is still streaming
+pipelined_writing = os.getenv("PIPELINED_WRITING", "true").lower() in ("1", "true", "yes")
+
+# Plan optimizer: pick between equivalent agent plans from run history (evaluate offline first)
+plan_optimizer_enabled = os.getenv("PLAN_OPTIMIZER_ENABLED", "false").lower() in ("1", "true", "yes")
+plan_optimizer_min_runs = int(os.getenv("PLAN_OPTIMIZER_MIN_RUNS", "5"))
+
+# Background article quality scoring: comma-separated evaluators (heuristic, deepeval)
+quality_evaluators = [e.strip() for e in os.getenv("QUALITY_EVALUATORS", "heuristic").split(",") if e.strip()]
+quality_batch_size = int(os.getenv("QUALITY_BATCH_SIZE", "20"))
+quality_poll_seconds = float(os.getenv("QUALITY_POLL_SECONDS", "30"))
+
+# Share of orchestrator runs profiled (0..1); a request can also set profile=True
+profile_sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Cache warming: off-peak window (local time, HH:MM-HH:MM) and per-run spend limits
+cache_warm_window = os.getenv("CACHE_WARM_WINDOW", "01:00-06:00")
+cache_warm_max_queries = int(os.getenv("CACHE_WARM_MAX_QUERIES", "20"))
+cache_warm_max_llm_calls = int(os.getenv("CACHE_WARM_MAX_LLM_CALLS", "200"))
+cache_warm_max_searches = int(os.getenv("CACHE_WARM_MAX_SEARCHES", "100"))
+# Demand history mined, and the age at which a cached article is refreshed
+cache_warm_lookback_days = float(os.getenv("CACHE_WARM_LOOKBACK_DAYS", "7"))
+cache_warm_refresh_hours = float(os.getenv("CACHE_WARM_REFRESH_HOURS", "24"))
+
+# Record every worker run's LLM and Tavily responses into cassettes in this directory (empty = off)
+cassette_dir = os.getenv("CASSETTE_DIR", "")
+
+# Compression of large memory DB text columns: off | zlib | lzma
+memory_compression = os.getenv("MEMORY_COMPRESSION", "off")
+memory_compression_min_bytes = int(os.getenv("MEMORY_COMPRESSION_MIN_BYTES", "1024"))
+
+# Memory store: sqlite (memory/agent_memory.db and tenant files) or memory (in-process, lost on exit)
+memory_backend = os.getenv("MEMORY_BACKEND", "sqlite")
+
+# Tenant databases: one file per tenant under memory_tenant_dir, or hashed onto this many shards (0 = per tenant)
+memory_tenant_dir = os.getenv("MEMORY_TENANT_DIR", "memory/tenants")
+memory_tenant_shards = int(os.getenv("MEMORY_TENANT_SHARDS", "0"))
+memory_tenant_pool_size = int(os.getenv("MEMORY_TENANT_POOL_SIZE", "16"))
+# Retention per tenant database (0 = keep everything); overrides as "acme=10000,trial=500"
+memory_tenant_max_conversations = int(os.getenv("MEMORY_TENANT_MAX_CONVERSATIONS", "0"))
+memory_tenant_retention_days = float(os.getenv("MEMORY_TENANT_RETENTION_DAYS", "0"))
+memory_tenant_limits = {
+    tenant.strip(): int(limit)
+    for tenant, limit in (
+        item.split("=", 1) for item in os.getenv("MEMORY_TENANT_LIMITS", "").split(",") if "=" in item
+    )
+}
+
+# Job queue workers
+worker_processes = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+job_lease_seconds = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+job_max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
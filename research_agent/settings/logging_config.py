@@ -0,0 +1,169 @@
+"""Process-wide logging setup, called once by each entry point.
+
+Records are handed to a background listener through a queue, so a log call
+on the event loop only formats the message and enqueues it; the stream
+write happens on the listener thread. On the way in, records get:
+
+- context fields set with ``log_context`` (``conversation_id``, ``node``, ...)
+  and any ``extra`` fields such as ``duration``
+- messages cut to LOG_MAX_CHARS, so payloads like tool calls stay bounded
+- DEBUG records sampled (LOG_DEBUG_SAMPLE_RATE) and rate limited per call
+  site (LOG_DEBUG_PER_MINUTE)
+
+    from settings.logging_config import configure_logging, log_context
+    configure_logging()
+    with log_context(conversation_id=42, node='search_node'):
+        logger.info('Searching')    # ... [conversation_id=42 node=search_node] Searching
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from settings.config import log_level, log_format, log_max_chars, log_debug_sample_rate, log_debug_per_minute
+
+# Record attributes copied into the structured output when present
+STRUCTURED_FIELDS = ('conversation_id', 'tenant_id', 'node', 'duration', 'agent', 'tier', 'job_id')
+
+_context: contextvars.ContextVar[Dict] = contextvars.ContextVar('log_context', default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields to every record logged in this context (and tasks/threads started from it)."""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context onto the record; runs in the thread that logs."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """Samples DEBUG records and caps them per call site and minute; other levels pass."""
+
+    def __init__(self, sample_rate: float = 1.0, per_minute: int = 60):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.per_minute = per_minute
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.per_minute <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(site, [now, 0])
+            if now - window[0] >= 60:
+                window[0], window[1] = now, 0
+            window[1] += 1
+            return window[1] <= self.per_minute
+
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that bounds the formatted message length before enqueueing."""
+
+    def __init__(self, log_queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message is cut; a traceback is appended in full by QueueHandler.prepare
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            record.msg = f'{message[:self.max_chars]}... [{len(message)} chars]'
+            record.args = None
+        return super().prepare(record)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = ' '.join(
+            f'{key}={_format_value(getattr(record, key))}' for key in STRUCTURED_FIELDS if hasattr(record, key)
+        )
+        record.context = f'[{fields}] ' if fields else ''
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: getattr(record, key) for key in STRUCTURED_FIELDS if hasattr(record, key)})
+        return json.dumps(entry, default=str)
+
+
+def _format_value(value) -> str:
+    return f'{value:.3f}' if isinstance(value, float) else str(value)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Route all logging through a queue to a background listener; safe to call more than once.
+
+    A forked child process gets its own queue and listener on its first call.
+    """
+    global _listener, _configured_pid
+    with _lock:
+        if _configured_pid == os.getpid():
+            return
+        if _listener is not None:
+            # Inherited from the parent over fork: its listener thread does not run here
+            _listener = None
+
+        stream = logging.StreamHandler()
+        if (fmt or log_format) == 'json':
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(TextFormatter('%(asctime)s %(levelname)s %(name)s: %(context)s%(message)s'))
+
+        log_queue = queue.SimpleQueue()
+        handler = TruncatingQueueHandler(log_queue, log_max_chars)
+        handler.addFilter(DebugRateLimitFilter(log_debug_sample_rate, log_debug_per_minute))
+        handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or log_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+        _configured_pid = os.getpid()
+        atexit.register(_stop_listener, _listener)
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    # Flushes what is still queued; only the process that started the listener may stop it
+    if listener is _listener and _configured_pid == os.getpid():
+        listener.stop()
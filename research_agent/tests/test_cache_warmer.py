@@ -0,0 +1,90 @@
+"""Choosing which queries to warm, the expected gain, and the warm window."""
+import hashlib
+from datetime import datetime, timedelta
+
+from cache_warmer import hit_rate_report, in_window, mine_candidates, normalize_query
+from database.in_memory import InMemoryBackend
+
+
+def _ask(memory: InMemoryBackend, query: str, times: int = 1, hit: bool = False, days_ago: float = 0):
+    """Record ``times`` user requests for ``query``, answered from the cache when ``hit``."""
+    for _ in range(times):
+        conv = memory.start_conversation(query)
+        memory.end_conversation(conv, [] if hit else ['research', 'writer'])
+        if days_ago:
+            stamp = datetime.utcnow() - timedelta(days=days_ago)
+            memory._conversations[conv]['timestamp'] = stamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _cache(memory: InMemoryBackend, query: str, hours_ago: float):
+    memory.cache_result(query, f"article about {query}")
+    key = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+    memory._cache[key]['created_at'] = (datetime.utcnow() - timedelta(hours=hours_ago)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 1, 1, hour, minute)
+
+
+def test_mine_candidates():
+    memory = InMemoryBackend()
+    # Spelling variants share one group, run as the most asked one
+    _ask(memory, "What is WASM?", times=3)
+    _ask(memory, "what is  wasm", hit=True)
+    # Asked once: not worth a run
+    _ask(memory, "Rust traits")
+    # Cached recently: nothing to do
+    _ask(memory, "Go generics", times=2)
+    _cache(memory, "Go generics", hours_ago=1)
+    # Cached too long ago, asked mostly last week
+    _ask(memory, "Zig comptime", times=4, days_ago=3)
+    _ask(memory, "Zig comptime")
+    _cache(memory, "Zig comptime", hours_ago=30)
+
+    candidates, totals = mine_candidates(memory, lookback_days=7, refresh_hours=12)
+    assert totals == {'requests': 12, 'hits': 1, 'misses': 11}
+    assert [c['query'] for c in candidates] == ["What is WASM?", "Zig comptime"]
+
+    wasm, zig = candidates
+    assert wasm['normalized'] == normalize_query("What is WASM?") == "what is wasm"
+    assert wasm['variants'] == ["What is WASM?", "what is  wasm"]
+    assert (wasm['requests'], wasm['misses'], wasm['reason'], wasm['cache_age_hours']) == (4, 3, 'missing', None)
+    # All asked today: the trending rate lifts the window rate
+    assert wasm['expected_requests_per_day'] == round((4 / 7 + 4) / 2, 2)
+    assert wasm['trend'] == 7.0
+    assert (zig['reason'], zig['cache_age_hours'], zig['recent_requests']) == ('stale', 30.0, 1)
+    assert zig['expected_requests_per_day'] == round((5 / 7 + 1) / 2, 2)
+
+    # Older requests fall out of the lookback window
+    candidates, totals = mine_candidates(memory, lookback_days=2, refresh_hours=12)
+    assert [c['query'] for c in candidates] == ["What is WASM?"]
+    assert totals['requests'] == 8
+
+
+def test_hit_rate_report():
+    candidates = [{'misses': 3}, {'misses': 5}]
+    report = hit_rate_report(candidates, {'requests': 20, 'hits': 4, 'misses': 16}, lookback_days=7)
+    assert report == {
+        'requests': 20,
+        'requests_per_day': round(20 / 7, 2),
+        'current_hit_rate': 0.2,
+        'expected_hit_rate': 0.6,
+        'expected_gain': 0.4,
+        'misses_avoided': 8,
+    }
+    empty = hit_rate_report([], {'requests': 0, 'hits': 0, 'misses': 0}, lookback_days=7)
+    assert (empty['current_hit_rate'], empty['expected_gain']) == (None, None)
+
+
+def test_in_window():
+    assert in_window("01:00-06:00", _at(1))
+    assert in_window("01:00-06:00", _at(5, 59))
+    assert not in_window("01:00-06:00", _at(6))
+    assert not in_window("01:00-06:00", _at(0, 59))
+
+
+def test_in_window_wrapping_past_midnight():
+    for now in (_at(22), _at(23, 30), _at(0), _at(3, 59)):
+        assert in_window("22:00-04:00", now), now
+    for now in (_at(4), _at(12), _at(21, 59)):
+        assert not in_window("22:00-04:00", now), now
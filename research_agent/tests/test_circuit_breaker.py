@@ -0,0 +1,169 @@
+"""Circuit breaker state changes, and the stale output served when a provider fails."""
+import threading
+
+import pytest
+
+from agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    """Hand-driven stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: Clock, **kwargs) -> CircuitBreaker:
+    options = dict(error_rate=0.5, window=4, min_calls=4, open_seconds=30, half_open_probes=2)
+    options.update(kwargs)
+    return CircuitBreaker('test', clock=clock, **options)
+
+
+def _call(breaker: CircuitBreaker, error: BaseException = None):
+    """One call through the breaker, failing with ``error`` when given; the error is swallowed."""
+    try:
+        with breaker.guard():
+            if error is not None:
+                raise error
+    except type(error) if error is not None else ():
+        pass
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        _call(breaker, ConnectionError('reset'))
+    assert breaker.state == OPEN
+
+
+def test_opens_at_the_error_rate():
+    breaker = _breaker(Clock())
+    _call(breaker)
+    _call(breaker, TimeoutError())
+    _call(breaker)
+    # 1 of 3 failed and fewer than min_calls are in
+    assert breaker.state == CLOSED
+    _call(breaker, ConnectionError('reset'))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            pass
+    assert breaker.is_open()
+
+
+def test_caller_errors_do_not_count():
+    breaker = _breaker(Clock())
+    for _ in range(10):
+        with pytest.raises(TypeError):
+            with breaker.guard():
+                raise TypeError('bad argument')
+    _call(breaker, ValueError('bad query'))
+    assert breaker.state == CLOSED
+    assert not breaker.is_open()
+
+
+def test_half_open_after_the_cooldown():
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = 29
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            pass
+    clock.now = 30
+    assert not breaker.is_open()
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+
+
+def test_probes_succeeding_close_the_circuit():
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = 30
+    _call(breaker)
+    assert breaker.state == HALF_OPEN
+    _call(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_probe_failure_reopens_the_circuit():
+    clock = Clock()
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now = 30
+    _call(breaker)
+    _call(breaker, TimeoutError())
+    assert breaker.state == OPEN
+    # The cooldown starts again from the failed probe
+    clock.now = 59
+    assert breaker.is_open()
+
+
+def test_probe_slots_are_limited_and_given_back():
+    clock = Clock()
+    breaker = _breaker(clock, half_open_probes=1)
+    _open(breaker)
+    clock.now = 30
+    with breaker.guard():
+        # The only trial slot is taken
+        assert breaker.is_open()
+        with pytest.raises(CircuitOpenError):
+            with breaker.guard():
+                pass
+    assert breaker.state == CLOSED
+
+    _open(breaker)
+    clock.now = 60
+    # A caller error ends the trial without a verdict and frees the slot
+    _call(breaker, ValueError('bad query'))
+    assert breaker.state == HALF_OPEN
+    _call(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_abandoned_calls_do_not_count():
+    clock = Clock()
+    breaker = _breaker(clock, half_open_probes=1)
+    abandoned = threading.Event()
+    abandoned.set()
+    # A search thread that finished after its caller timed out says nothing about the provider now
+    for _ in range(10):
+        with pytest.raises(TimeoutError):
+            with breaker.guard(abandoned=abandoned):
+                raise TimeoutError()
+    assert breaker.state == CLOSED
+
+    _open(breaker)
+    clock.now = 30
+    with breaker.guard(abandoned=abandoned):
+        pass
+    # The trial slot is given back, not passed
+    assert breaker.state == HALF_OPEN
+    assert not breaker.is_open()
+
+
+def test_failed_agent_serves_stale_output(monkeypatch):
+    pytest.importorskip('langgraph')
+    import orchestrator
+    from database.in_memory import InMemoryBackend
+
+    memory = InMemoryBackend()
+    monkeypatch.setattr(orchestrator.tenants, 'for_tenant', lambda tenant_id: memory)
+    old = memory.start_conversation("rust async runtimes")
+    memory.save_research(old, "rust async runtimes", "Tokio is the most used runtime")
+    conv = memory.start_conversation("rust async runtimes")
+    state = {'user_query': "rust async runtimes", 'conversation_id': conv}
+
+    update = orchestrator._failed(state, 'research', 'research_result', 'Research failed: tavily circuit is open')
+    assert update == {'research_result': "Tokio is the most used runtime", 'served_stale': True}
+    memory.set_task_type(conv, 'full_research')
+    memory.end_conversation(conv, ['research', 'writer'])
+    assert memory.get_plan_history()[-1]['degraded'] is True
+
+    # Nothing similar stored: the failure message is passed on
+    state = {'user_query': "kubernetes networking", 'conversation_id': conv}
+    update = orchestrator._failed(state, 'analyzer', 'analysis', 'Analysis failed: timeout')
+    assert update == {'analysis': 'Analysis failed: timeout'}
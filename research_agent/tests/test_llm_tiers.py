@@ -0,0 +1,37 @@
+"""LLM_AGENT_TIERS parsing and checking."""
+import importlib
+
+import pytest
+
+from settings import config
+
+
+@pytest.fixture
+def reload_config(monkeypatch):
+    """Reload settings.config under patched environment variables, then restore it."""
+    def reload(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(config)
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(config)
+
+
+def test_agent_tiers_are_stripped(reload_config):
+    tiers = reload_config(LLM_AGENT_TIERS=" writer = standard , analyzer=fast,, junk").llm_agent_tiers
+    assert tiers == {'writer': 'standard', 'analyzer': 'fast'}
+    assert reload_config(LLM_AGENT_TIERS="").llm_agent_tiers == {}
+
+
+def test_unknown_agents_and_tiers_are_rejected(monkeypatch):
+    pytest.importorskip('langchain_google_genai')
+    from agents import llm
+
+    monkeypatch.setattr(llm, 'AGENT_TIERS', dict(llm.AGENT_TIERS))
+    llm._apply_agent_tiers({'writer': 'standard'})
+    assert llm.AGENT_TIERS['writer'] == 'standard'
+    with pytest.raises(ValueError, match="unknown agent 'writter'"):
+        llm._apply_agent_tiers({'writter': 'standard'})
+    with pytest.raises(ValueError, match="unknown tier 'longform' for agent 'writer'"):
+        llm._apply_agent_tiers({'writer': 'longform'})
@@ -0,0 +1,340 @@
+"""Behaviour every memory backend must share, checked against each of them.
+
+Each test gets a fresh, empty backend: SQLite in a temporary directory and
+the in-process store.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.backend import MemoryBackend, create_backend
+from database.in_memory import InMemoryBackend
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def memory(request, tmp_path) -> MemoryBackend:
+    if request.param == 'sqlite':
+        return create_backend('sqlite', str(tmp_path / 'memory.db'))
+    return create_backend('memory')
+
+
+def _backdate_cache(memory, query: str, column: str, hours: float):
+    """Set a cache entry's ``created_at`` or ``refresh_started_at`` to ``hours`` ago."""
+    stamp = (datetime.utcnow() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+    key = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+    if isinstance(memory, InMemoryBackend):
+        memory._cache[key][column] = stamp
+        return
+    with sqlite3.connect(memory.db_path) as conn:
+        conn.execute(f"UPDATE query_cache SET {column} = ? WHERE query_hash = ?", (stamp, key))
+
+
+def test_protocol(memory):
+    assert isinstance(memory, MemoryBackend)
+
+
+def test_conversations(memory):
+    first = memory.start_conversation("Explain Rust ownership")
+    second = memory.start_conversation("Compare Go and Rust", user_provided_data="notes")
+    assert second > first
+
+    memory.set_task_type(first, 'full_research')
+    memory.record_degradation(first, 'dropped analyzer')
+    memory.end_conversation(first, ['research', 'writer'], success=True)
+    memory.set_task_type(second, 'quick_research')
+    memory.end_conversation(second, ['research'], success=False)
+    cache_hit = memory.start_conversation("Explain Rust ownership")
+    memory.set_task_type(cache_hit, 'full_research')
+    memory.end_conversation(cache_hit, [])
+    # Unknown conversations are ignored
+    memory.record_degradation(9999, 'unknown conversation')
+    memory.record_research_reuse(second, 42)
+    memory.record_research_reuse(9999, 42)
+
+    history = memory.get_plan_history()
+    # Cache hits are skipped, oldest first
+    assert [h['conversation_id'] for h in history] == [first, second]
+    assert history[0]['agents_used'] == ['research', 'writer']
+    assert (history[0]['degraded'], history[1]['degraded']) == (True, False)
+    assert (history[0]['reused_research'], history[1]['reused_research']) == (False, True)
+    assert (history[0]['success'], history[1]['success']) == (True, False)
+    assert history[0]['latency_seconds'] is None
+    assert [h['conversation_id'] for h in memory.get_plan_history('quick_research')] == [second]
+    assert len(memory.get_plan_history(limit=1)) == 1
+
+
+def test_research_and_sources(memory):
+    conv = memory.start_conversation("rust async runtimes")
+    research_id = memory.save_research(conv, "rust async runtimes", "Tokio is the most used runtime", sources=[
+        {'url': 'https://tokio.rs', 'title': 'Tokio', 'content': 'An async  runtime'},
+        'https://async.rs',
+        {'url': 'https://tokio.rs', 'title': 'Tokio again', 'content': 'An async runtime'},
+    ])
+    # In order; the same url with the same normalized content is stored once
+    sources = memory.get_research_sources(research_id)
+    assert [s['url'] for s in sources] == ['https://tokio.rs', 'https://async.rs']
+    assert sources[0]['title'] == 'Tokio'
+    assert sources[1]['content'] is None
+
+    other = memory.save_research(conv, "tokio internals", "Work stealing scheduler", sources=['https://tokio.rs'])
+    assert len(memory.get_research_sources(other)) == 1
+    runs = memory.get_runs_for_url('https://tokio.rs')
+    assert sorted(r['research_id'] for r in runs) == sorted([research_id, other])
+    assert memory.get_runs_for_url('https://missing.example') == []
+
+    memory.save_research(conv, "rust async failures", "Research failed: timeout")
+    similar = memory.get_similar_research("rust async")
+    assert {s['query'] for s in similar} == {"rust async runtimes", "rust async failures"}
+    assert memory.get_similar_research("   ") == []
+    assert len(memory.get_similar_research("rust async", limit=1)) == 1
+
+    reusable = memory.get_reusable_research("rust async runtimes", max_age_hours=1)
+    # Failed research is never reused
+    assert [r['query'] for r in reusable] == ["rust async runtimes"]
+    assert reusable[0]['relevance'] == 1.0
+    assert reusable[0]['results'] == "Tokio is the most used runtime"
+    assert memory.get_reusable_research("rust async runtimes", min_relevance=1.1) == []
+
+
+def test_analyses(memory):
+    conv = memory.start_conversation("Kubernetes autoscaling")
+    memory.save_analysis(conv, "HPA scales on CPU", key_insights=['HPA', 'VPA'])
+    failed = memory.start_conversation("Kubernetes networking")
+    memory.save_analysis(failed, "Analysis failed: quota")
+
+    past = memory.get_past_analyses("kubernetes autoscaling")
+    assert [(p['analysis'], p['key_insights'], p['original_query']) for p in past] == \
+        [("HPA scales on CPU", ['HPA', 'VPA'], "Kubernetes autoscaling")]
+    # Past analyses (context only) include failures
+    assert len(memory.get_past_analyses("kubernetes")) == 2
+
+    best = memory.get_reusable_analysis("kubernetes networking autoscaling", max_age_hours=1)
+    # Failed analyses are never reused
+    assert best['analysis'] == "HPA scales on CPU"
+    assert best['relevance'] == round(2 / 3, 3)
+    assert memory.get_reusable_analysis("kubernetes", min_relevance=1.1) is None
+    assert memory.get_reusable_analysis("") is None
+
+
+def test_relevance_is_symmetric(memory):
+    conv = memory.start_conversation("rust borrow checker vs GC in game engines")
+    memory.save_research(conv, "rust borrow checker vs GC in game engines", "Borrow checking avoids GC pauses")
+    memory.save_analysis(conv, "No pauses, more friction")
+
+    # Every keyword of the short query is in the stored one, but 1 of 5 keywords overlap
+    assert memory.get_reusable_research("rust", max_age_hours=1)[0]['relevance'] == 0.2
+    assert memory.get_reusable_research("rust", max_age_hours=1, min_relevance=0.4) == []
+    assert memory.get_reusable_analysis("rust", max_age_hours=1, min_relevance=0.4) is None
+    # ...and the same from the other side
+    memory.save_research(conv, "rust", "Rust is a systems language")
+    broad = memory.get_reusable_research("rust borrow checker game engines", max_age_hours=1)
+    assert [(r['query'], r['relevance']) for r in broad] == \
+        [("rust borrow checker vs GC in game engines", 1.0), ("rust", 0.2)]
+
+
+def test_articles(memory):
+    conv = memory.start_conversation("Python packaging")
+    memory.save_article(conv, "uv is fast", quality_score=0.5)
+    memory.save_article(conv, "pip and wheels explained")
+    memory.save_article(conv, "pyproject everywhere", quality_score=0.9)
+    other = memory.start_conversation("Rust traits")
+    memory.save_article(other, "Traits are interfaces")
+
+    best = memory.get_best_articles("python")
+    # Highest score first, unscored last
+    assert [a['article'] for a in best] == ["pyproject everywhere", "uv is fast", "pip and wheels explained"]
+    assert best[0]['word_count'] == 2
+    assert best[0]['original_query'] == "Python packaging"
+    assert len(memory.get_best_articles(limit=10)) == 4
+
+    unscored = memory.get_unscored_articles()
+    assert [a['article'] for a in unscored] == ["pip and wheels explained", "Traits are interfaces"]
+    assert unscored[1]['user_query'] == "Rust traits"
+    assert [a['id'] for a in memory.get_unscored_articles(after_id=unscored[0]['id'])] == [unscored[1]['id']]
+    memory.save_quality_scores({unscored[0]['id']: 0.8, unscored[1]['id']: 0.2})
+    assert memory.get_unscored_articles() == []
+    assert memory.get_statistics()['average_article_quality'] == round((0.5 + 0.9 + 0.8 + 0.2) / 4, 2)
+
+
+def test_learnings(memory):
+    memory.save_learning('writer', 'short intros work', context='q1')
+    memory.save_learning('writer', 'timeout', success_pattern=False)
+    memory.save_learning('analyzer', 'tables help')
+    memory.save_learning('analyzer', 'bad input', success_pattern=False)
+    memory.save_learning('analyzer', 'quota', success_pattern=False)
+
+    assert [(l['lesson'], l['context'], l['success_pattern']) for l in memory.get_learnings('writer')] == \
+        [('short intros work', 'q1', None)]
+    assert sorted((l['lesson'], l['success_pattern']) for l in memory.get_learnings('writer', success_only=False)) \
+        == [('short intros work', 1), ('timeout', 0)]
+    # Without an agent, only failures are returned
+    assert sorted(l['lesson'] for l in memory.get_learnings(success_only=False)) == ['bad input', 'quota', 'timeout']
+    assert len(memory.get_learnings(limit=1)) == 1
+    rates = memory.get_agent_failure_rates()
+    assert (rates['writer'], round(rates['analyzer'], 3)) == (0.5, 0.667)
+
+
+def test_query_cache(memory):
+    assert memory.get_cached_result("What is WASM?") is None
+    assert memory.get_cache_entry("What is WASM?") is None
+    memory.cache_result("What is WASM?", "first")
+    memory.cache_result("  what is wasm?  ", "second")
+    entry = memory.get_cache_entry("WHAT IS WASM?")
+    # Looking at an entry is not a hit
+    assert entry['hit_count'] == 0
+    assert 0 <= entry['age_hours'] < 1
+    # Keys ignore case and surrounding space
+    assert memory.get_cached_result("What is WASM?") == "second"
+    assert memory.get_cache_entry("What is WASM?")['hit_count'] == 1
+    stats = memory.get_statistics()
+    assert (stats['cached_queries'], stats['total_cache_hits']) == (1, 1)
+    assert memory.clear_old_cache(days=1) == 0
+    assert memory.clear_old_cache(days=-1) == 1
+    assert memory.get_cached_result("What is WASM?") is None
+
+
+def test_cache_freshness(memory):
+    assert memory.lookup_cache("What is WASM?") is None
+    memory.cache_result("fresh", "a")
+    memory.cache_result("stale", "b", soft_ttl_hours=-1)
+    memory.cache_result("expired", "c", soft_ttl_hours=-1, hard_ttl_hours=-1)
+    assert memory.lookup_cache("fresh", soft_ttl_hours=1, hard_ttl_hours=2)['freshness'] == 'fresh'
+    # The reader's TTLs apply to entries without their own
+    assert memory.lookup_cache("fresh", soft_ttl_hours=-1)['freshness'] == 'stale'
+    # The entry's TTLs take precedence
+    stale = memory.lookup_cache("stale", soft_ttl_hours=1)
+    assert (stale['result'], stale['freshness']) == ("b", 'stale')
+    # Expired entries are not served and not counted as hits
+    expired = memory.lookup_cache("expired")
+    assert (expired['result'], expired['freshness']) == (None, 'expired')
+    assert [memory.get_cache_entry(q)['hit_count'] for q in ("fresh", "stale", "expired")] == [2, 1, 0]
+    # get_cached_result ignores TTLs
+    assert memory.get_cached_result("expired") == "c"
+
+    assert memory.claim_cache_refresh("missing") is False
+    assert memory.claim_cache_refresh("stale") is True
+    assert memory.claim_cache_refresh("stale") is False
+    # The lease ran out
+    assert memory.claim_cache_refresh("stale", lease_seconds=-1) is True
+    # Rewriting the entry ends the claim
+    memory.cache_result("stale", "b2")
+    assert memory.claim_cache_refresh("stale") is True
+
+
+def test_cache_freshness_by_age(memory):
+    for query in ("fresh", "stale", "expired"):
+        memory.cache_result(query, f"{query} result")
+    _backdate_cache(memory, "fresh", 'created_at', 1)
+    _backdate_cache(memory, "stale", 'created_at', 7)
+    _backdate_cache(memory, "expired", 'created_at', 30)
+
+    found = {q: memory.lookup_cache(q, soft_ttl_hours=6, hard_ttl_hours=24) for q in ("fresh", "stale", "expired")}
+    assert {q: f['freshness'] for q, f in found.items()} == {'fresh': 'fresh', 'stale': 'stale', 'expired': 'expired'}
+    assert [found[q]['result'] for q in ("fresh", "stale", "expired")] == ["fresh result", "stale result", None]
+    assert 6.9 < found['stale']['age_hours'] < 7.1
+
+    # A refresh claimed 5 minutes ago still holds a 10 minute lease...
+    assert memory.claim_cache_refresh("stale", lease_seconds=600) is True
+    _backdate_cache(memory, "stale", 'refresh_started_at', 5 / 60)
+    assert memory.claim_cache_refresh("stale", lease_seconds=600) is False
+    # ...one claimed 11 minutes ago has run out
+    _backdate_cache(memory, "stale", 'refresh_started_at', 11 / 60)
+    assert memory.claim_cache_refresh("stale", lease_seconds=600) is True
+    # The refreshed entry is fresh again and can be claimed once it goes stale
+    memory.cache_result("stale", "new result")
+    assert memory.lookup_cache("stale", soft_ttl_hours=6, hard_ttl_hours=24)['freshness'] == 'fresh'
+
+
+def test_query_demand(memory):
+    for query, agents in (("What is WASM?", ['research']), ("what is wasm?", []), ("What is WASM?", None)):
+        conv = memory.start_conversation(query)
+        if agents is not None:
+            memory.end_conversation(conv, agents)
+    memory.start_conversation("What is WASM?", user_provided_data="spec")
+    memory.start_conversation("What is WASM?", origin='cache_warmer')
+
+    # Grouped by cache key; runs on provided data and background runs are left out
+    demand = {d['cache_key']: d for d in memory.get_query_demand()}
+    assert list(demand) == ["what is wasm?"]
+    row = demand["what is wasm?"]
+    assert (row['query'], row['requests'], row['recent_requests'], row['hits'], row['misses']) == \
+        ("What is WASM?", 3, 3, 1, 1)
+
+
+def test_latencies_and_profiles(memory):
+    assert memory.get_latency_estimate('writer_node') is None
+    conv = memory.start_conversation("latency")
+    memory.set_task_type(conv, 'full_research')
+    for seconds in (1.0, 2.0, 3.0, 4.0):
+        memory.record_node_latency('writer_node', seconds, conversation_id=conv)
+    memory.record_node_latency('writer_node', 100.0, success=False)
+    # Percentiles of successful runs only
+    assert memory.get_latency_estimate('writer_node') == 4.0
+    assert memory.get_latency_estimate('writer_node', percentile=0.0) == 1.0
+    memory.end_conversation(conv, ['writer'])
+    assert memory.get_plan_history()[0]['latency_seconds'] == 10.0
+
+    memory.save_run_profile(conv, 2.0, 0.5, {'nodes': {}}, [{'function': 'f'}], b'old')
+    memory.save_run_profile(conv, 5.0, None, None, None, b'new')
+    memory.save_run_profile(None, 3.0)
+    slowest = memory.get_slowest_runs()
+    assert [r['wall_seconds'] for r in slowest] == [5.0, 3.0, 2.0]
+    assert (slowest[0]['user_query'], slowest[1]['user_query']) == ("latency", None)
+    assert (slowest[0]['breakdown'], slowest[0]['hotspots']) == ({}, [])
+    assert slowest[2]['hotspots'] == [{'function': 'f'}]
+    assert [r['wall_seconds'] for r in memory.get_slowest_runs(conversation_id=conv)] == [5.0, 2.0]
+    assert memory.get_run_profile(conv) == b'new'
+    assert memory.get_run_profile(9999) is None
+
+
+def test_statistics(memory):
+    for task_type, success in (('full_research', True), ('full_research', False), ('research_only', True)):
+        conv = memory.start_conversation(task_type)
+        memory.set_task_type(conv, task_type)
+        memory.end_conversation(conv, ['research'], success)
+    memory.save_research(conv, "q", "r")
+    memory.cache_result("q", "a")
+    memory.get_cached_result("q")
+
+    expected = {
+        'total_conversations': 3, 'successful_conversations': 2, 'total_research_queries': 1,
+        'total_analyses': 0, 'total_articles': 0, 'cached_queries': 1, 'total_cache_hits': 1,
+        'average_article_quality': None, 'top_task_types': {'full_research': 2, 'research_only': 1},
+    }
+    assert memory.get_statistics() == expected
+    for granularity in ('hour', 'day'):
+        rollup = memory.get_rollups(granularity, limit=1)
+        assert [(r['runs'], r['successes'], r['cache_hits']) for r in rollup] == [(3, 2, 1)]
+    memory.rebuild_statistics()
+    assert memory.get_statistics() == expected
+    assert [(r['runs'], r['successes'], r['cache_hits']) for r in memory.get_rollups('day')] == [(3, 2, 1)]
+    with pytest.raises(ValueError):
+        memory.get_rollups('week')
+
+
+def test_pruning(memory):
+    convs = [memory.start_conversation(f"topic {i}") for i in range(4)]
+    research = [memory.save_research(c, f"topic {i}", "r", sources=[f"https://e.com/{i}", "https://shared.com"])
+                for i, c in enumerate(convs)]
+    for c in convs:
+        memory.save_analysis(c, "a")
+        memory.save_article(c, "art")
+        memory.record_node_latency('writer_node', 1.0, conversation_id=c)
+        memory.save_run_profile(c, 1.0)
+
+    assert memory.prune_conversations() == 0
+    assert memory.prune_conversations(max_conversations=2) == 2
+    assert memory.prune_conversations(max_age_days=1) == 0
+    # Sources of pruned research are unlinked, orphaned ones removed and shared ones kept
+    assert memory.get_research_sources(research[0]) == []
+    assert memory.get_runs_for_url("https://e.com/0") == []
+    assert sorted(r['research_id'] for r in memory.get_runs_for_url("https://shared.com")) == research[2:]
+    # Dependent rows go with their conversation
+    stats = memory.get_statistics()
+    assert (stats['total_conversations'], stats['total_research_queries'], stats['total_analyses'],
+            stats['total_articles']) == (2, 2, 2, 2)
+    assert len(memory.get_unscored_articles()) == 2
+    assert len(memory.get_slowest_runs()) == 2
+    assert memory.prune_conversations(max_age_days=-1) == 2
@@ -0,0 +1,78 @@
+"""The bounded prompt the research agent sends each turn."""
+import pytest
+
+pytest.importorskip('langchain_core')
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+
+from agents.message_history import build_prompt_messages, estimate_tokens  # noqa: E402
+
+SYSTEM_PROMPT = "You are a research agent."
+
+
+def _hits(turn: int, count: int = 5, chars: int = 1500) -> str:
+    return "\n---\n".join(
+        f"Title: Result {turn}.{i}\nContent: {'rust borrow checker ' * (chars // 20)}\nURL: https://example.com/{turn}/{i}"
+        for i in range(count)
+    )
+
+
+def _history(rounds: int, searches_per_round: int = 2) -> list:
+    """A question followed by ``rounds`` tool-call rounds of full search results."""
+    messages = [HumanMessage(content="How does the Rust borrow checker compare to a GC in game engines?")]
+    for turn in range(rounds):
+        calls = [{'name': 'research_tool', 'args': {'query': f"query {turn}.{i}"}, 'id': f"call-{turn}-{i}"}
+                 for i in range(searches_per_round)]
+        messages.append(AIMessage(content="", tool_calls=calls))
+        messages += [ToolMessage(content=_hits(turn), tool_call_id=call['id']) for call in calls]
+    return messages
+
+
+def _assert_pairs_intact(messages: list):
+    """Every tool result follows the AI message that called it, and every call has its result."""
+    open_calls = set()
+    for m in messages:
+        if isinstance(m, ToolMessage):
+            assert m.tool_call_id in open_calls, f"result {m.tool_call_id} without its call"
+            open_calls.remove(m.tool_call_id)
+        else:
+            assert not open_calls, f"calls {open_calls} without results"
+            open_calls = {call['id'] for call in getattr(m, 'tool_calls', None) or []}
+    assert not open_calls
+
+
+def test_short_history_is_sent_unchanged():
+    history = _history(1)
+    sent = build_prompt_messages(history, SYSTEM_PROMPT, token_budget=100_000)
+    assert sent[1:] == history
+    assert isinstance(sent[0], SystemMessage)
+
+
+@pytest.mark.parametrize('budget', [6000, 3000, 1200])
+def test_long_history_stays_under_budget(budget):
+    history = _history(8)
+    assert estimate_tokens(history) > budget
+
+    sent = build_prompt_messages(history, SYSTEM_PROMPT, token_budget=budget)
+    assert estimate_tokens(sent) <= budget
+    # System prompt and question first, the latest round last
+    assert sent[0].content == SYSTEM_PROMPT
+    assert sent[1] is history[0]
+    latest = history[-3:]
+    assert [m.tool_call_id for m in sent[-2:]] == [m.tool_call_id for m in latest[1:]]
+    assert sent[-3].tool_calls == latest[0].tool_calls
+    _assert_pairs_intact(sent[2:])
+
+
+def test_latest_round_kept_in_full_while_it_fits():
+    history = _history(8)
+    sent = build_prompt_messages(history, SYSTEM_PROMPT, token_budget=6000)
+    assert sent[-3:] == history[-3:]
+    # Earlier results were digested rather than sent raw
+    assert all(m.content.startswith("[Digest of earlier search]") for m in sent[2:-3] if isinstance(m, ToolMessage))
+
+
+def test_system_messages_in_history_are_replaced():
+    history = [SystemMessage(content="stale prompt")] + _history(2)
+    sent = build_prompt_messages(history, SYSTEM_PROMPT, token_budget=100_000)
+    assert [m.content for m in sent if isinstance(m, SystemMessage)] == [SYSTEM_PROMPT]
@@ -0,0 +1,85 @@
+"""Plan choices made from synthetic run histories."""
+from plan_optimizer import choose_plan, evaluate, plan_stats
+
+FULL = ('research', 'analyzer', 'writer')
+NO_ANALYZER = ('research', 'writer')
+
+
+def _runs(plan, count, quality, latency, failures=0, task_type='full_research', **extra):
+    """``count`` runs of ``plan``, the first ``failures`` of them failed."""
+    return [{
+        'conversation_id': i,
+        'task_type': task_type,
+        'agents_used': list(plan),
+        'success': i >= failures,
+        'degraded': False,
+        'reused_research': False,
+        'latency_seconds': latency,
+        'quality_score': quality,
+        **extra,
+    } for i in range(count)]
+
+
+def test_plan_stats():
+    runs = _runs(FULL, 3, 0.8, 60, failures=1) + _runs(NO_ANALYZER, 2, 0.7, 30)
+    # Degraded runs and reused research did not do their plan's work
+    runs += _runs(NO_ANALYZER, 4, 0.1, 5, degraded=True) + _runs(FULL, 4, 0.1, 5, reused_research=True)
+    runs += _runs(FULL, 1, None, None)
+
+    stats = plan_stats(runs)
+    assert stats[FULL] == {
+        'runs': 4, 'scored_runs': 3, 'failure_rate': 0.25, 'latency_seconds': 60, 'quality_score': 0.8
+    }
+    assert (stats[NO_ANALYZER]['runs'], stats[NO_ANALYZER]['quality_score']) == (2, 0.7)
+
+
+def test_no_switch_below_min_runs():
+    stats = plan_stats(_runs(FULL, 10, 0.8, 60) + _runs(NO_ANALYZER, 4, 0.8, 30))
+    assert choose_plan('full_research', FULL, stats, {}, min_runs=5) == (FULL, None)
+    # Enough cheaper runs, but too few of the default plan to compare against
+    stats = plan_stats(_runs(FULL, 4, 0.8, 60) + _runs(NO_ANALYZER, 10, 0.8, 30))
+    assert choose_plan('full_research', FULL, stats, {}, min_runs=5) == (FULL, None)
+
+
+def test_drops_analyzer_only_when_quality_holds():
+    # Within the 5% tolerance
+    stats = plan_stats(_runs(FULL, 5, 0.80, 60) + _runs(NO_ANALYZER, 5, 0.77, 30))
+    plan, reason = choose_plan('full_research', FULL, stats, {}, min_runs=5)
+    assert plan == NO_ANALYZER
+    assert reason.startswith('full_research: research -> writer kept quality 0.77 (vs 0.80)')
+
+    worse = plan_stats(_runs(FULL, 5, 0.80, 60) + _runs(NO_ANALYZER, 5, 0.70, 30))
+    assert choose_plan('full_research', FULL, worse, {}, min_runs=5) == (FULL, None)
+
+
+def test_keeps_plan_that_fails_less_or_is_faster():
+    unreliable = plan_stats(_runs(FULL, 10, 0.8, 60) + _runs(NO_ANALYZER, 10, 0.8, 30, failures=2))
+    assert choose_plan('full_research', FULL, unreliable, {}, min_runs=5) == (FULL, None)
+    # Learned failure rates of agents both plans use do not count against the cheaper one
+    stats = plan_stats(_runs(FULL, 10, 0.8, 60) + _runs(NO_ANALYZER, 10, 0.8, 30))
+    assert choose_plan('full_research', FULL, stats, {'research': 0.2}, min_runs=5)[0] == NO_ANALYZER
+    slower = plan_stats(_runs(FULL, 10, 0.8, 30) + _runs(NO_ANALYZER, 10, 0.8, 60))
+    assert choose_plan('full_research', FULL, slower, {}, min_runs=5) == (FULL, None)
+    # Task types without equivalent plans are left alone
+    other = plan_stats(_runs(NO_ANALYZER, 10, 0.8, 30, task_type='quick_research'))
+    assert choose_plan('quick_research', NO_ANALYZER, other, {}, min_runs=5) == (NO_ANALYZER, None)
+
+
+def test_evaluate_checks_decisions_on_newer_runs():
+    train = _runs(FULL, 5, 0.8, 60) + _runs(NO_ANALYZER, 5, 0.8, 30)
+    holds = evaluate(train + _runs(FULL, 2, 0.8, 60) + _runs(NO_ANALYZER, 2, 0.79, 30),
+                     test_fraction=4 / 14, min_runs=5, agent_failure_rates={})
+    entry = holds['full_research']
+    assert (entry['default_plan'], entry['chosen_plan']) == ('research -> analyzer -> writer', 'research -> writer')
+    assert entry['holds_on_test_runs'] is True
+    assert entry['test']['research -> writer']['runs'] == 2
+
+    fails = evaluate(train + _runs(FULL, 2, 0.8, 60) + _runs(NO_ANALYZER, 2, 0.5, 30),
+                     test_fraction=4 / 14, min_runs=5, agent_failure_rates={})
+    assert fails['full_research']['holds_on_test_runs'] is False
+
+    # Too few runs to decide on: the default plan stays and nothing is checked
+    short = evaluate(train[:3] + train[5:8], test_fraction=0.5, min_runs=5, agent_failure_rates={})
+    assert short['full_research']['chosen_plan'] == 'research -> analyzer -> writer'
+    assert short['full_research']['holds_on_test_runs'] is None
+    assert short['analyze_provided']['holds_on_test_runs'] is None
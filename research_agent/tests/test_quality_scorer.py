@@ -0,0 +1,81 @@
+"""Heuristic article metrics and batch scoring."""
+import asyncio
+
+import pytest
+
+from database.in_memory import InMemoryBackend
+from quality_scorer import HeuristicEvaluator, score_backlog, score_batch
+
+SENTENCE = "Rust checks ownership at compile time so game engines avoid the pauses of a garbage collector."
+
+
+def _article(sections: int = 4, paragraphs: int = 3) -> str:
+    """A well-formed article: title, ``sections`` sections and a conclusion, 3-sentence paragraphs."""
+    paragraph = ' '.join([SENTENCE] * 3)
+    parts = ["# Rust Without a Garbage Collector"]
+    for i in range(sections):
+        parts.append(f"## Section {i + 1}")
+        parts += [paragraph] * paragraphs
+    parts += ["## Conclusion", paragraph]
+    return '\n\n'.join(parts)
+
+
+def test_well_formed_article_scores_high():
+    evaluator = HeuristicEvaluator()
+    metrics = evaluator.metrics(_article(), "rust garbage collector in game engines")
+    assert metrics == {'length': 1.0, 'structure': 1.0, 'readability': 1.0, 'paragraphs': 1.0, 'relevance': 1.0}
+    score = asyncio.run(evaluator.score({'article': _article(), 'user_query': "rust game engines"}))
+    assert score == pytest.approx(1.0)
+
+
+def test_weak_article_scores_lower():
+    evaluator = HeuristicEvaluator()
+    short = "Rust is fast. " * 10
+    metrics = evaluator.metrics(short, "kubernetes networking")
+    assert metrics['length'] == pytest.approx(30 / 600)
+    assert metrics['structure'] == 0
+    assert metrics['readability'] == pytest.approx(3 / 12)
+    assert metrics['relevance'] == 0
+    # One paragraph of ten sentences is too long
+    assert metrics['paragraphs'] == 0
+
+
+def test_failed_article_scores_zero():
+    evaluator = HeuristicEvaluator()
+    failed = {'article': "Writing failed: gemini circuit is open", 'user_query': "rust"}
+    assert asyncio.run(evaluator.score(failed)) == 0.0
+
+
+class Exploding:
+    """Evaluator that fails on one article."""
+
+    name = 'exploding'
+
+    def __init__(self, bad_id: int):
+        self.bad_id = bad_id
+
+    async def score(self, article):
+        if article['id'] == self.bad_id:
+            raise RuntimeError("judge timed out")
+        return 0.5
+
+
+def test_failing_evaluator_leaves_article_unscored():
+    articles = [{'id': i, 'article': _article(), 'user_query': "rust"} for i in (1, 2, 3)]
+    scores = asyncio.run(score_batch([HeuristicEvaluator(), Exploding(bad_id=2)], articles))
+    # The mean of both evaluators; article 2 is left out
+    assert scores == {1: 0.75, 3: 0.75}
+
+
+def test_score_backlog_retries_unscored_articles():
+    memory = InMemoryBackend()
+    conv = memory.start_conversation("rust game engines")
+    for _ in range(3):
+        memory.save_article(conv, _article())
+    ids = [a['id'] for a in memory.get_unscored_articles(10)]
+
+    assert asyncio.run(score_backlog(memory, [HeuristicEvaluator(), Exploding(bad_id=ids[1])], batch_size=2)) == 2
+    assert [a['id'] for a in memory.get_unscored_articles(10)] == [ids[1]]
+    # The next pass picks up what was left
+    assert asyncio.run(score_backlog(memory, [HeuristicEvaluator()], batch_size=2)) == 1
+    assert memory.get_unscored_articles(10) == []
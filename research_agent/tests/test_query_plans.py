@@ -0,0 +1,21 @@
+"""Memory queries keep using their indexes.
+
+Run from the research_agent directory:
+
+    python -m pytest tests
+"""
+import unittest
+
+from database.query_plans import PLAN_CHECKS, check_plan, scratch_manager
+
+
+class QueryPlanTest(unittest.TestCase):
+    def test_memory_queries_use_their_indexes(self):
+        with scratch_manager() as (manager, conn):
+            for check in PLAN_CHECKS:
+                with self.subTest(query=check[0]):
+                    self.assertEqual(check_plan(manager, conn, *check), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Jobs whose run failed are retried and then dead-lettered."""
+import asyncio
+
+from database.job_queue import DEAD, DONE, QUEUED, JobQueue
+from worker import run_failure, run_job
+
+FAILURE_PREFIXES = ('Research failed:', 'Analysis failed:', 'Writing failed:')
+
+
+class FakeApp:
+    """Stands in for the orchestrator: every run ends in ``final``."""
+
+    def __init__(self, final: dict):
+        self.final = final
+        self.runs = 0
+
+    async def ainvoke(self, state):
+        self.runs += 1
+        return {**state, **self.final}
+
+
+def _drain(queue: JobQueue, app: FakeApp, job_id: int, limit: int = 5):
+    """Claim and run the job until nothing is left to claim; returns its status after each run."""
+    statuses = []
+    for _ in range(limit):
+        job = queue.claim('worker-1')
+        if job is None:
+            break
+        asyncio.run(run_job(queue, 'worker-1', job, app, FAILURE_PREFIXES))
+        statuses.append(queue.get_job(job_id)['status'])
+    return statuses
+
+
+def test_failed_run_is_retried_then_dead_lettered(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), retry_backoff_seconds=0)
+    job_id = queue.enqueue({'user_query': 'rust async runtimes'}, max_attempts=3)
+    app = FakeApp({'research_result': 'Research failed: tavily circuit is open', 'final_article': None})
+
+    assert _drain(queue, app, job_id) == [QUEUED, QUEUED, DEAD]
+    assert app.runs == 3
+    assert queue.get_job(job_id)['error'] == 'Research failed: tavily circuit is open'
+
+
+def test_successful_run_completes(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), retry_backoff_seconds=0)
+    job_id = queue.enqueue({'user_query': 'rust async runtimes'}, max_attempts=3)
+    app = FakeApp({'research_result': 'Tokio leads', 'final_article': '# Async Rust'})
+
+    assert _drain(queue, app, job_id) == [DONE]
+    assert queue.get_job(job_id)['result']['final_article'] == '# Async Rust'
+
+
+def test_run_failure():
+    assert run_failure({'final_article': '# Article'}, FAILURE_PREFIXES) is None
+    assert run_failure({'final_article': 'Writing failed: timeout'}, FAILURE_PREFIXES) == 'Writing failed: timeout'
+    assert run_failure({'analysis': 'Analysis failed: x', 'final_article': '# Article'}, FAILURE_PREFIXES) \
+        == 'Analysis failed: x'
+    assert run_failure({'final_article': ''}, FAILURE_PREFIXES) == 'No article generated'
+    assert run_failure({'final_article': '# Old article', 'served_stale': True}, FAILURE_PREFIXES)
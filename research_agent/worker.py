@@ -0,0 +1,197 @@
+"""Run orchestrator jobs from the SQLite job queue in several processes.
+
+    python worker.py run --processes 4
+    python worker.py submit "Explain FastAPI benefits for building APIs" --wait
+    python worker.py status
+
+Each process runs its own event loop and its own copy of the compiled
+graphs, so a box's cores are used without any outside service. Ctrl+C or
+SIGTERM stops claiming new jobs; jobs in flight are finished first.
+
+The orchestrator's nodes catch their own errors, so a run that finishes
+can still have failed (a "... failed:" output, no article, or a stale
+fallback). Such runs are recorded as failures too, so they are retried with
+backoff and dead-lettered after max_attempts.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Optional, Tuple
+
+from database.job_queue import JobQueue
+from settings.logging_config import configure_logging, log_context
+from settings.config import worker_processes, job_lease_seconds, job_max_attempts, cassette_dir
+
+logger = logging.getLogger('worker')
+
+DB_PATH = 'memory/agent_memory.db'
+POLL_INTERVAL = 1.0
+# Parts of the final orchestrator state returned to producers
+RESULT_KEYS = ('conversation_id', 'task_type', 'completed_agents', 'research_result', 'analysis', 'final_article',
+               'served_from_cache', 'served_stale')
+
+
+def initial_state(payload: dict) -> dict:
+    """Fill in the orchestrator state keys a producer did not set."""
+    return {
+        'task_type': None,
+        'user_provided_data': None,
+        'research_result': None,
+        'analysis': None,
+        'final_article': None,
+        'agents_to_run': [],
+        'completed_agents': [],
+        **payload
+    }
+
+
+def run_failure(result: dict, failure_prefixes: Tuple[str, ...]) -> Optional[str]:
+    """Why a finished run failed, or None if it produced a fresh article."""
+    for key in ('research_result', 'analysis', 'final_article'):
+        output = result.get(key)
+        if output and output.startswith(failure_prefixes):
+            return output
+    if not result.get('final_article'):
+        return 'No article generated'
+    if result.get('served_stale'):
+        return 'An agent failed; only a stale fallback was served'
+    return None
+
+
+async def _heartbeat(queue: JobQueue, job_id: int, worker_id: str, run: asyncio.Task):
+    """Keep the lease alive; cancel the run if another worker took the job over."""
+    while not run.done():
+        await asyncio.sleep(queue.lease_seconds / 3)
+        if not await asyncio.to_thread(queue.heartbeat, job_id, worker_id):
+            logger.warning(f'{worker_id} lost the lease on job {job_id}; cancelling run')
+            run.cancel()
+            return
+
+
+async def run_job(queue: JobQueue, worker_id: str, job: dict, app, failure_prefixes: Tuple[str, ...]):
+    """Run one claimed job and record it as complete, or failed (retried or dead-lettered)."""
+    state = initial_state(job['payload'])
+    # The run task copies this context, so all of its records carry the job id
+    with log_context(job_id=job['id']):
+        if cassette_dir:
+            from agents.cassette import record_run
+            path = os.path.join(cassette_dir, f"job-{job['id']}.jsonl.gz")
+            run = asyncio.create_task(record_run(app, state, path))
+        else:
+            run = asyncio.create_task(app.ainvoke(state))
+    heartbeat = asyncio.create_task(_heartbeat(queue, job['id'], worker_id, run))
+    try:
+        result = await run
+        failure = run_failure(result, failure_prefixes)
+        if failure:
+            await asyncio.to_thread(queue.fail, job['id'], worker_id, failure)
+        else:
+            await asyncio.to_thread(
+                queue.complete, job['id'], worker_id, {k: result.get(k) for k in RESULT_KEYS}
+            )
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.exception(f'Job {job["id"]} failed')
+        await asyncio.to_thread(queue.fail, job['id'], worker_id, f'{type(e).__name__}: {e}')
+    finally:
+        heartbeat.cancel()
+
+
+async def _worker_loop(worker_id: str, stop):
+    # Imported here so each process builds its own graphs and clients
+    from orchestrator import app, FAILURE_PREFIXES
+
+    queue = JobQueue(DB_PATH, lease_seconds=job_lease_seconds)
+    logger.info(f'{worker_id} started')
+
+    while not stop.is_set():
+        job = await asyncio.to_thread(queue.claim, worker_id)
+        if job is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        await run_job(queue, worker_id, job, app, FAILURE_PREFIXES)
+
+    logger.info(f'{worker_id} stopped')
+
+
+def _run_process(index: int, stop):
+    # The parent coordinates shutdown; children only watch the stop event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    configure_logging()
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    asyncio.run(_worker_loop(worker_id, stop))
+
+
+def run(processes: int, shutdown_timeout: float):
+    stop = multiprocessing.Event()
+    # Make sure the schema is migrated once before workers start racing
+    JobQueue(DB_PATH, lease_seconds=job_lease_seconds)
+
+    workers = [
+        multiprocessing.Process(target=_run_process, args=(i, stop), name=f'worker-{i}')
+        for i in range(processes)
+    ]
+    for w in workers:
+        w.start()
+
+    def _shutdown(*_):
+        logger.info('Shutting down: finishing jobs in flight...')
+        stop.set()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    while not stop.wait(1):
+        if not any(w.is_alive() for w in workers):
+            logger.error('All worker processes exited')
+            break
+    for w in workers:
+        w.join(timeout=shutdown_timeout)
+        if w.is_alive():
+            logger.warning(f'{w.name} did not stop in {shutdown_timeout}s; terminating (its job will be retried)')
+            w.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Research agent job workers')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='Start worker processes')
+    run_parser.add_argument('--processes', type=int, default=worker_processes)
+    run_parser.add_argument('--shutdown-timeout', type=float, default=300,
+                            help='Seconds to wait for jobs in flight on shutdown')
+
+    submit_parser = sub.add_parser('submit', help='Enqueue a research query')
+    submit_parser.add_argument('query')
+    submit_parser.add_argument('--priority', type=int, default=0)
+    submit_parser.add_argument('--tenant', help='Tenant whose memory database the run uses')
+    submit_parser.add_argument('--wait', action='store_true', help='Wait for and print the result')
+
+    sub.add_parser('status', help='Show job counts per status')
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == 'run':
+        run(args.processes, args.shutdown_timeout)
+    elif args.command == 'submit':
+        queue = JobQueue(DB_PATH)
+        payload = {'user_query': args.query}
+        if args.tenant:
+            payload['tenant_id'] = args.tenant
+        job_id = queue.enqueue(payload, priority=args.priority, max_attempts=job_max_attempts)
+        print(f'Enqueued job {job_id}')
+        if args.wait:
+            print(json.dumps(queue.wait_for_result(job_id), indent=2))
+    else:
+        print(json.dumps(JobQueue(DB_PATH).counts(), indent=2))
+
+
+if __name__ == '__main__':
+    main()